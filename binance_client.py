@@ -5,39 +5,186 @@
 参考：https://github.com/binance/binance-futures-connector-python
 """
 
+import asyncio
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
-from binance.um_futures import UMFutures  # 官方推荐导入方式
-from config import DATA_DIR, RAW_DATA_FILENAME, SYMBOL, INTERVAL, KLINE_LIMIT, BINANCE_API_KEY, BINANCE_API_SECRET, get_filenames
+from binance.error import ClientError, ServerError
+from client_pool import get_client_pool
+from frame_storage import save_frame, load_frame
+from partitioned_store import write_dataset
+from kline_cache import get_kline_cache
+from kline_integrity import repair_frame
+from kline_parser import parse_klines, slice_columns, concat_columns, columns_to_frame, columns_to_klines
+from rate_limiter import get_rate_limiter, klines_weight
+from config import DATA_DIR, RAW_DATA_FILENAME, SYMBOL, INTERVAL, KLINE_LIMIT, get_filenames, \
+    KLINES_MAX_LIMIT, BACKFILL_MAX_WORKERS, BACKFILL_MAX_RETRIES, INCREMENTAL_FETCH, TIMEFRAME_OPTIONS, \
+    RATE_LIMIT_MAX_RETRIES, SYMBOLS, SYMBOL_FETCH_MAX_WORKERS, RESAMPLE_BASE_INTERVAL, CSV_EXPORT_STAGES, \
+    interval_to_milliseconds
+
+
+class BackfillError(Exception):
+    """
+    分页回补中有时间窗口在重试后仍然失败
+    属性:
+        failed_windows: 失败的时间窗口 [(window_start_ms, window_end_ms), ...]，按时间升序
+        partial: 其余窗口的回补结果 (格式与正常返回值相同)
+    """
+
+    def __init__(self, failed_windows, partial):
+        self.failed_windows = sorted(failed_windows)
+        self.partial = partial
+        super().__init__(f"有 {len(self.failed_windows)} 个时间窗口获取失败: {self.failed_windows}")
+
+    def contiguous(self):
+        """partial 中第一个失败窗口之前的部分 (之后可以从失败窗口处继续回补，不会留下缺口)"""
+        first_failed = self.failed_windows[0][0]
+        if isinstance(self.partial, pd.DataFrame):
+            return self.partial[self.partial.index < pd.Timestamp(first_failed, unit='ms')]
+        return [kline for kline in self.partial if int(kline[0]) < first_failed]
+
 
 def get_binance_client():
     """
-    创建并返回币安API客户端实例
+    返回进程内共享的币安API客户端 (复用keep-alive连接，不再每次新建会话)
+    并发场景请使用 client_pool.get_client_pool().client() 借出独占的客户端
     官方文档：https://binance-connector.github.io/python-binance/index.html
     """
-    return UMFutures(
-        key=BINANCE_API_KEY,
-        secret=BINANCE_API_SECRET,
-        base_url="https://fapi.binance.com"  # 期货API基础地址
-    )
+    return get_client_pool().default_client
+
+
+def _rate_limited(weight, call):
+    """
+    按权重限流执行一次请求
+    - 请求前按权重从共享令牌桶扣减额度
+    - 请求后用响应头中的已用权重校正额度
+    - 收到 429/418 时按 Retry-After 暂停所有调用方后重试
+    参数:
+        call: 无参函数，返回 (数据, 限流响应头)
+    """
+    limiter = get_rate_limiter()
+    for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+        limiter.acquire(weight)
+        try:
+            data, usage = call()
+        except ClientError as e:
+            if e.status_code not in (418, 429) or attempt == RATE_LIMIT_MAX_RETRIES:
+                raise
+            retry_after = (e.header or {}).get('Retry-After', 60)
+            print(f"🚦 触发API限流 (HTTP {e.status_code})，暂停 {retry_after} 秒...")
+            limiter.penalize(retry_after)
+            continue
+        limiter.update_from_headers(usage)
+        return data
+
+
+def request_klines(client, **params):
+    """
+    经过权重限流的 klines 请求
+    返回:
+        list: 原始K线列表
+    """
+    def call():
+        response = client.klines(**params)
+        # show_limit_usage=True 时连接器返回 {'limit_usage': {...}, 'data': [...]}
+        if isinstance(response, dict) and 'data' in response:
+            return response['data'], response.get('limit_usage')
+        return response, None
+
+    return _rate_limited(klines_weight(params.get('limit')), call)
+
+
+def _raise_for_status(response):
+    """
+    HTTP 错误响应 → binance.error 中的异常 (与 client.klines 抛出的异常一致)
+    异常:
+        ClientError: 4xx，带币安错误码和响应头 (Retry-After)
+        ServerError: 5xx
+    """
+    status_code = response.status_code
+    if status_code < 400:
+        return
+    if status_code >= 500:
+        raise ServerError(status_code, response.text)
+    try:
+        error = response.json()
+        error_code, error_message = error['code'], error['msg']
+    except (ValueError, KeyError, TypeError):
+        error_code, error_message = None, response.text
+    raise ClientError(status_code, error_code, error_message, response.headers)
+
+
+def request_klines_raw(client, **params):
+    """
+    经过权重限流的 klines 请求，直接返回响应的原始JSON字节 (交给 kline_parser 解析，跳过 json.loads)
+    说明：K线是公开接口无需签名，这里复用客户端的 keep-alive 会话；
+          错误响应按连接器的规则转换为 ClientError/ServerError (限流重试依赖 ClientError 的状态码)
+    """
+    def call():
+        response = client.session.get(f"{client.base_url}/fapi/v1/klines", params=params, timeout=client.timeout)
+        _raise_for_status(response)
+        return response.content, response.headers
+
+    return _rate_limited(klines_weight(params.get('limit')), call)
+
+def fetch_klines_range(client, symbol, interval, start_ms, end_ms, cache=None):
+    """
+    获取 open_time 在 [start_ms, end_ms] 内的K线 (范围不超过1500根)
+    - 完全收盘的K线页优先读磁盘缓存，未命中时请求整页并写入缓存
+    - 仍在形成中的尾部数据始终直接请求
+    返回:
+        dict: kline_parser 列字典，按 open_time 升序
+    """
+    cache = cache or get_kline_cache()
+    step = interval_to_milliseconds(interval)
+    now_ms = int(time.time() * 1000)
+    parts = []
+    live_start = start_ms
+
+    if cache is not None:
+        span = cache.page_span(interval)
+        page = cache.page_start(interval, start_ms)
+        while page <= end_ms and cache.is_closed(interval, page, now_ms):
+            raw = cache.get(symbol, interval, page)
+            if raw is None:
+                raw = request_klines_raw(client, symbol=symbol, interval=interval, startTime=page,
+                                         endTime=page + span - 1, limit=cache.page_bars)
+                cache.put(symbol, interval, page, raw, now_ms)
+            parts.append(slice_columns(parse_klines(raw), start_ms, end_ms))
+            page += span
+        live_start = max(start_ms, page)
+
+    if live_start <= end_ms:
+        limit = min(KLINES_MAX_LIMIT, (end_ms - live_start) // step + 1)
+        parts.append(parse_klines(request_klines_raw(client, symbol=symbol, interval=interval,
+                                                     startTime=live_start, endTime=end_ms, limit=limit)))
+    return concat_columns(parts)
+
+
+def fetch_latest_klines(client, symbol, interval, limit):
+    """
+    获取最新 limit 根K线 (含未收盘K线)，等价于不带时间参数的 klines 请求，但已收盘部分走磁盘缓存
+    返回:
+        DataFrame: 与 process_klines_data 格式一致
+    """
+    now_ms = int(time.time() * 1000)
+    # (now - limit*step, now] 内恰好包含 limit 个K线开盘时间，与K线边界是否对齐无关
+    start_ms = now_ms - limit * interval_to_milliseconds(interval) + 1
+    return columns_to_frame(fetch_klines_range(client, symbol, interval, start_ms, now_ms))
+
 
 def fetch_historical_klines(client, symbol, interval):
     """
-    获取最新的K线数据
+    获取最新的K线数据 (已收盘部分走磁盘缓存)
     官方文档：https://binance-connector.github.io/python-binance/endpoints/market_data/get_klines.html
     """
     print(f"⏳ 开始获取 {symbol} 最新数据, 时间间隔: {interval}...")
 
     try:
-        # 设置请求参数 - 获取最新数据
-        params = {
-            'symbol': symbol,
-            'interval': interval,
-            'limit': KLINE_LIMIT  # 直接从配置中获取限制数量
-        }
-
-        # 发送API请求 - 使用官方推荐调用方式
-        response = client.klines(**params)
+        now_ms = int(time.time() * 1000)
+        start_ms = now_ms - KLINE_LIMIT * interval_to_milliseconds(interval) + 1
+        columns = fetch_klines_range(client, symbol, interval, start_ms, now_ms)
+        response = columns_to_klines(columns)
 
         # 如果没有数据，则返回空列表
         if not response:
@@ -48,16 +195,9 @@ def fetch_historical_klines(client, symbol, interval):
         return response
 
     except Exception as e:
+        # 限流 (429/418) 已在 request_klines 中按 Retry-After 处理
         print(f"⚠️ 请求失败: {e}")
-        # 如果是API限制错误，等待更长时间
-        if "API rate limit" in str(e):
-            print("🚦 遇到API限制，等待60秒...")
-            time.sleep(60)
-            # 重试一次
-            return client.klines(**params)
-        else:
-            time.sleep(1)  # 失败后等待1秒重试
-            return []
+        return []
 
 def process_klines_data(klines):
     """
@@ -101,75 +241,434 @@ def process_klines_data(klines):
 
     return df
 
-def save_raw_data(df, file_path):
-    """保存原始数据到CSV文件"""
-    # 创建副本以避免修改原始数据
-    df_copy = df.copy()
-
-    # 重置索引，将时间索引转换为列
-    df_copy.reset_index(inplace=True)
-
-    # 将时间格式化为字符串（UTC时间）
-    df_copy['open_time'] = df_copy['open_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-
-    df_copy.to_csv(file_path, encoding='utf-8-sig', index=False)  # utf-8-sig 支持Excel中文
-    print(f"💾 数据已保存至: {file_path}")
-
-def fetch_and_save_btcusdt_data(interval=None, limit=None, timeframe_name=None):
+def save_raw_data(df, file_path, csv_export=None, symbol=None, interval=None):
     """
-    主函数：获取并保存BTCUSDT K线数据
+    保存原始数据 (存储格式见 config.STORAGE_FORMAT，时间索引以 int64 时间戳保存)
     参数:
-        interval: K线间隔 (如 '15m', '1h', '4h', '1d')
-        limit: 获取数据条数
-        timeframe_name: 时间周期名称 (如 '15分钟线', '日线')
+        file_path: 逻辑路径 (get_filenames 返回的 .csv 文件名)
+        csv_export: 是否同时导出CSV (默认取决于 config.CSV_EXPORT_STAGES 是否包含 'raw')
+        symbol/interval: 同时给出时，数据还会合并进分区数据集 raw/{symbol}/{interval}
+    返回:
+        Path: 实际保存的文件路径
+    """
+    if csv_export is None:
+        csv_export = 'raw' in CSV_EXPORT_STAGES
+    saved_path = save_frame(df, file_path, csv_export=csv_export)
+    print(f"💾 数据已保存至: {saved_path}")
+    if symbol and interval:
+        write_dataset('raw', df, symbol, interval)
+    return saved_path
+
+def fetch_klines_frame(interval=None, limit=None, timeframe_name=None, incremental=None, symbol=None, client=None):
+    """
+    获取K线并返回原始数据层 DataFrame (不写文件，参数同 fetch_and_save_btcusdt_data)
+    返回:
+        DataFrame: 已检查并修复缺口/重复/乱序的K线
+        None: 没有获取到数据或请求失败
     """
     # 使用传入参数或默认值
+    use_symbol = symbol or SYMBOL
     use_interval = interval or INTERVAL
     use_limit = limit or KLINE_LIMIT
     use_timeframe_name = timeframe_name or "日线"
+    use_incremental = INCREMENTAL_FETCH if incremental is None else incremental
 
-    print(f"📊 获取 {use_timeframe_name} 数据 (间隔: {use_interval}, 数量: {use_limit})")
+    print(f"📊 获取 {use_symbol} {use_timeframe_name} 数据 (间隔: {use_interval}, 数量: {use_limit})")
 
     # 创建API客户端
-    client = get_binance_client()
+    client = client or get_binance_client()
 
     # 直接使用参数，不修改全局变量
     try:
-        # 设置请求参数
-        params = {
-            'symbol': SYMBOL,
-            'interval': use_interval,
-            'limit': use_limit
-        }
+        if use_incremental:
+            # 增量模式：只请求本地最后一根已收盘K线之后的数据
+            from kline_store import KlineStore
+            store = KlineStore(use_symbol, use_interval)
+            store.update(client=client, limit=use_limit)
+            # 只检查要返回的尾部；已记录的交易所缺口不再重复请求
+            store.verify(client=client, tail=use_limit)
+            df = store.load(tail=use_limit)
+            if df.empty:
+                print("ℹ️ 没有获取到数据")
+                return None
+        else:
+            # 已收盘部分读磁盘缓存，只请求仍在形成中的尾部
+            df = fetch_latest_klines(client, use_symbol, use_interval, use_limit)
 
-        # 发送API请求
-        response = client.klines(**params)
+            # 如果没有数据，则返回空列表
+            if df.empty:
+                print("ℹ️ 没有获取到数据")
+                return None
 
-        # 如果没有数据，则返回空列表
-        if not response:
-            print("ℹ️ 没有获取到数据")
-            return None
+            print(f"✅ 数据获取完成, 共 {len(df)} 条记录")
 
-        print(f"✅ 数据获取完成, 共 {len(response)} 条记录")
+            # 检查缺口/重复/乱序，只重新请求缺失的K线 (数据完整时只做一次向量化扫描)
+            df, _ = repair_frame(df, use_interval, use_symbol, client)
+        return df
+    except Exception as e:
+        print(f"⚠️ 请求失败: {e}")
+        return None
 
-        # 处理数据
-        df = process_klines_data(response)
 
-        # 生成文件名
-        if timeframe_name:
-            filenames = get_filenames(use_timeframe_name)
-            raw_data_path = DATA_DIR / filenames['raw']
-        else:
-            raw_data_path = DATA_DIR / RAW_DATA_FILENAME
+def fetch_and_save_btcusdt_data(interval=None, limit=None, timeframe_name=None, incremental=None,
+                                symbol=None, client=None):
+    """
+    主函数：获取并保存BTCUSDT (或指定交易对) K线数据
+    参数:
+        interval: K线间隔 (如 '15m', '1h', '4h', '1d')
+        limit: 获取数据条数
+        timeframe_name: 时间周期名称 (如 '15分钟线', '日线')
+        incremental: 是否使用增量存储 (默认读取 config.INCREMENTAL_FETCH)
+        symbol: 交易对 (默认 config.SYMBOL)
+        client: 可选的API客户端实例 (并发调用时传入从连接池借出的客户端)
+    """
+    df = fetch_klines_frame(interval, limit, timeframe_name, incremental, symbol, client)
+    if df is None:
+        return None
 
-        # 保存数据
-        save_raw_data(df, raw_data_path)
+    # 生成文件名
+    if timeframe_name or symbol:
+        filenames = get_filenames(timeframe_name or "日线", symbol)
+        raw_data_path = DATA_DIR / filenames['raw']
+    else:
+        raw_data_path = DATA_DIR / RAW_DATA_FILENAME
 
-        return raw_data_path
+    # 保存数据
+    try:
+        return save_raw_data(df, raw_data_path, symbol=symbol or SYMBOL, interval=interval or INTERVAL)
     except Exception as e:
-        print(f"⚠️ 请求失败: {e}")
+        print(f"⚠️ 保存失败: {e}")
+        return None
+
+
+def to_milliseconds(value):
+    """
+    将时间转换为UTC毫秒时间戳
+    参数:
+        value: 毫秒整数、datetime 或可被 pandas 解析的时间字符串 (按UTC处理)
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return int(ts.value // 1_000_000)
+
+
+def split_time_windows(start_ms, end_ms, interval, page_limit=KLINES_MAX_LIMIT, align=False):
+    """
+    把 [start_ms, end_ms] 切分为多个时间窗口，每个窗口最多包含 page_limit 根K线
+    参数:
+        align: 按 page_limit 根K线的整数倍对齐窗口边界 (与磁盘缓存页一致，首尾窗口可能不满一页)
+    返回:
+        list: [(window_start_ms, window_end_ms), ...] 按时间升序
+    """
+    step = interval_to_milliseconds(interval)
+    span = step * page_limit
+    windows = []
+    window_start = start_ms
+    while window_start <= end_ms:
+        next_start = (window_start // span + 1) * span if align else window_start + span
+        window_end = min(next_start - 1, end_ms)
+        windows.append((window_start, window_end))
+        window_start = next_start
+    return windows
+
+
+def fetch_klines_window(client, symbol, interval, start_ms, end_ms, limit=KLINES_MAX_LIMIT, columnar=False):
+    """
+    获取单个时间窗口内的K线数据，失败时按次数重试
+    参数:
+        columnar: True 时返回 kline_parser 列字典 (经磁盘缓存，见 fetch_klines_range)
+    """
+    params = {
+        'symbol': symbol,
+        'interval': interval,
+        'startTime': start_ms,
+        'endTime': end_ms,
+        'limit': limit
+    }
+    for attempt in range(1, BACKFILL_MAX_RETRIES + 1):
+        try:
+            if columnar:
+                return fetch_klines_range(client, symbol, interval, start_ms, end_ms)
+            return request_klines(client, **params)
+        except Exception as e:
+            print(f"⚠️ 窗口 {start_ms}-{end_ms} 第{attempt}次请求失败: {e}")
+            if attempt == BACKFILL_MAX_RETRIES:
+                raise
+            time.sleep(attempt)  # 逐步延长重试间隔
+
+
+def _fetch_windows(start, end, interval, symbol, max_workers, client, columnar):
+    """
+    并发请求 [start, end] 内的所有时间窗口
+    返回:
+        tuple: (按窗口时间升序排列的成功窗口的每页数据, 重试后仍失败的时间窗口列表)
+    """
+    start_ms = to_milliseconds(start)
+    end_ms = to_milliseconds(end)
+    if end_ms < start_ms:
+        raise ValueError("结束时间不能早于起始时间")
+
+    # 列式回补的窗口与缓存页对齐，每个完整窗口恰好对应一个缓存页
+    cache = get_kline_cache() if columnar else None
+    windows = split_time_windows(start_ms, end_ms, interval, cache.page_bars if cache else KLINES_MAX_LIMIT,
+                                 align=cache is not None)
+    workers = max(1, min(max_workers or BACKFILL_MAX_WORKERS, len(windows)))
+
+    def fetch_window(window_start, window_end):
+        if client is not None:
+            return fetch_klines_window(client, symbol, interval, window_start, window_end, columnar=columnar)
+        # 每个窗口从连接池借出独占的客户端，复用已建立的连接
+        with get_client_pool().client() as pooled_client:
+            return fetch_klines_window(pooled_client, symbol, interval, window_start, window_end,
+                                       columnar=columnar)
+
+    print(f"⏳ 开始回补 {symbol} {interval} 历史数据, 共 {len(windows)} 个时间窗口, 并发数 {workers}...")
+
+    pages = {}
+    failed_windows = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fetch_window, window_start, window_end): (window_start, window_end)
+            for window_start, window_end in windows
+        }
+        for future in as_completed(futures):
+            try:
+                pages[futures[future]] = future.result()
+            except Exception:
+                failed_windows.append(futures[future])
+
+    return [pages[window] for window in sorted(pages)], sorted(failed_windows)
+
+
+def backfill_klines(start, end, interval=None, symbol=None, max_workers=None, client=None):
+    """
+    分页并发回补历史K线数据
+    参数:
+        start: 起始时间 (毫秒、datetime 或时间字符串, UTC)
+        end: 结束时间 (毫秒、datetime 或时间字符串, UTC)
+        interval: K线间隔 (如 '1m', '15m')
+        symbol: 交易对
+        max_workers: 并发线程数上限
+        client: 可选的API客户端实例
+    返回:
+        list: 按 open_time 升序、去重后的原始K线列表 (与 client.klines 返回格式一致)
+    异常:
+        BackfillError: 有窗口重试后仍然失败 (其余窗口的结果在 partial 中)
+    """
+    pages, failed_windows = _fetch_windows(start, end, interval or INTERVAL, symbol or SYMBOL, max_workers, client,
+                                           columnar=False)
+
+    # 以 open_time 为键去重，重叠窗口中靠后的数据覆盖靠前的数据
+    klines_by_open_time = {}
+    for page in pages:
+        for kline in page or []:
+            klines_by_open_time[int(kline[0])] = kline
+
+    klines = [klines_by_open_time[open_time] for open_time in sorted(klines_by_open_time)]
+    if failed_windows:
+        raise BackfillError(failed_windows, klines)
+    print(f"✅ 历史数据回补完成, 共 {len(klines)} 条记录")
+    return klines
+
+
+def backfill_klines_frame(start, end, interval=None, symbol=None, max_workers=None, client=None):
+    """
+    分页并发回补历史K线，直接解析原始JSON字节为 DataFrame (大批量回补时比 backfill_klines + process_klines_data 快数倍)
+    已收盘的窗口读写磁盘缓存，重复回补同一段历史只需读本地文件
+    返回:
+        DataFrame: 与 process_klines_data 格式一致，按 open_time 升序、去重
+    异常:
+        BackfillError: 有窗口重试后仍然失败 (其余窗口的结果在 partial 中)
+    """
+    pages, failed_windows = _fetch_windows(start, end, interval or INTERVAL, symbol or SYMBOL, max_workers, client,
+                                           columnar=True)
+    df = columns_to_frame(concat_columns(pages))
+    if failed_windows:
+        raise BackfillError(failed_windows, df)
+    print(f"✅ 历史数据回补完成, 共 {len(df)} 条记录")
+    return df
+
+
+def fetch_and_save_history(start, end, interval=None, symbol=None, max_workers=None):
+    """
+    回补指定时间范围的历史K线并保存 (格式见 config.STORAGE_FORMAT)
+    返回:
+        Path: 保存的文件路径
+        None: 如果没有获取到数据
+    异常:
+        BackfillError: 有窗口获取失败 (不保存不完整的历史数据)
+    """
+    use_interval = interval or INTERVAL
+    use_symbol = symbol or SYMBOL
+
+    df = backfill_klines_frame(start, end, interval=use_interval, symbol=use_symbol, max_workers=max_workers)
+    if df.empty:
+        print("ℹ️ 没有获取到数据")
         return None
 
+    start_str = df.index[0].strftime('%Y%m%d')
+    end_str = df.index[-1].strftime('%Y%m%d')
+    history_path = DATA_DIR / f"{use_symbol}_{use_interval}历史数据_{start_str}_{end_str}.csv"
+    return save_raw_data(df, history_path, symbol=use_symbol, interval=use_interval)
+
+
+def fetch_and_save_symbols(symbols=None, interval=None, limit=None, timeframe_name=None, max_workers=None):
+    """
+    并发获取并保存多个交易对的K线数据 (每个线程从连接池借出独占的客户端)
+    返回:
+        dict: {交易对: 原始数据文件路径}，获取失败的交易对不包含在结果中
+    """
+    use_symbols = symbols or SYMBOLS
+    workers = min(max_workers or SYMBOL_FETCH_MAX_WORKERS, len(use_symbols))
+    print(f"⏳ 并发获取 {len(use_symbols)} 个交易对数据, 并发数 {workers}...")
+
+    def fetch_one(symbol):
+        with get_client_pool().client() as client:
+            return fetch_and_save_btcusdt_data(interval=interval, limit=limit, timeframe_name=timeframe_name,
+                                               symbol=symbol, client=client)
+
+    paths = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_one, symbol): symbol for symbol in use_symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                raw_data_path = future.result()
+            except Exception as e:
+                print(f"⚠️ {symbol} 获取失败: {e}")
+                continue
+            if raw_data_path:
+                paths[symbol] = raw_data_path
+    print(f"✅ 多交易对数据获取完成, 成功 {len(paths)}/{len(use_symbols)} 个")
+    return {symbol: paths[symbol] for symbol in use_symbols if symbol in paths}
+
+
+def get_all_timeframe_configs(include_aggressive=True):
+    """
+    汇总需要刷新的时间周期：config.TIMEFRAME_OPTIONS + 激进模式额外周期 (按interval去重)
+    返回:
+        list: [{'interval', 'name', 'limit', ...}, ...]
+    """
+    timeframes = {tf['interval']: tf for tf in TIMEFRAME_OPTIONS.values()}
+    if include_aggressive:
+        try:
+            from aggressive_config import AGGRESSIVE_MODE_ENABLED, AGGRESSIVE_TIMEFRAMES
+            if AGGRESSIVE_MODE_ENABLED:
+                for tf in AGGRESSIVE_TIMEFRAMES.values():
+                    timeframes.setdefault(tf['interval'], tf)
+        except ImportError:
+            pass
+    return list(timeframes.values())
+
+
+async def fetch_all_timeframes_async(symbol=None, include_aggressive=True, client=None):
+    """
+    异步并发获取所有时间周期的K线数据 (所有周期共享同一个客户端的HTTP连接池)
+    参数:
+        symbol: 交易对
+        include_aggressive: 是否包含激进模式中的额外周期 (如5分钟线)
+        client: 可选的API客户端实例，默认从进程内连接池借出
+    返回:
+        dict: {时间周期名称: DataFrame}，获取失败的周期不包含在结果中
+    """
+    if client is None:
+        async with get_client_pool().client_async() as pooled_client:
+            return await fetch_all_timeframes_async(symbol, include_aggressive, pooled_client)
+
+    use_symbol = symbol or SYMBOL
+    timeframes = get_all_timeframe_configs(include_aggressive)
+    loop = asyncio.get_running_loop()
+
+    async def fetch_one(tf, executor):
+        # 同步的HTTP请求放到线程中执行，事件循环负责并发调度
+        klines = await loop.run_in_executor(
+            executor, lambda: request_klines(client, symbol=use_symbol, interval=tf['interval'], limit=tf['limit'])
+        )
+        return tf['name'], process_klines_data(klines)
+
+    print(f"⏳ 并发获取 {use_symbol} {len(timeframes)} 个时间周期: {', '.join(tf['name'] for tf in timeframes)}")
+    # 线程数与周期数一致，保证所有请求同时发出 (默认线程池在低核数机器上会排队)
+    with ThreadPoolExecutor(max_workers=len(timeframes)) as executor:
+        results = await asyncio.gather(*(fetch_one(tf, executor) for tf in timeframes), return_exceptions=True)
+
+    frames = {}
+    for tf, result in zip(timeframes, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ {tf['name']} 获取失败: {result}")
+            continue
+        name, df = result
+        frames[name] = df
+    print(f"✅ 多周期数据获取完成, 成功 {len(frames)}/{len(timeframes)} 个")
+    return frames
+
+
+def fetch_all_timeframes(symbol=None, include_aggressive=True, client=None):
+    """fetch_all_timeframes_async 的同步入口"""
+    return asyncio.run(fetch_all_timeframes_async(symbol, include_aggressive, client))
+
+
+def fetch_all_timeframes_resampled(symbol=None, include_aggressive=True, base_interval=None):
+    """
+    只抓取一条基础周期K线，在本地合成其余所有时间周期 (各周期K线边界一致)
+    - 基础周期的已收盘部分走磁盘缓存，重复运行时通常只需请求最新一页
+    - 比基础周期更细或不能整除的周期 (如激进模式的5分钟线) 仍单独请求
+    返回:
+        dict: {时间周期名称: DataFrame}
+    异常:
+        BackfillError: 基础周期回补有窗口失败 (不用有缺口的K线合成)
+    """
+    from kline_resampler import bucket_start, resample_frame
+
+    use_symbol = symbol or SYMBOL
+    use_base = base_interval or RESAMPLE_BASE_INTERVAL
+    base_step = interval_to_milliseconds(use_base)
+    timeframes = get_all_timeframe_configs(include_aggressive)
+    derived = [tf for tf in timeframes if interval_to_milliseconds(tf['interval']) % base_step == 0]
+    direct = [tf for tf in timeframes if tf not in derived]
+
+    now_ms = int(time.time() * 1000)
+    # 每个周期需要的最早一根K线的开盘时间，取最早者作为基础K线的起点
+    start_ms = min(
+        int(bucket_start(now_ms, tf['interval'])) - (tf['limit'] - 1) * interval_to_milliseconds(tf['interval'])
+        for tf in derived
+    ) if derived else now_ms
+
+    frames = {}
+    if derived:
+        print(f"⏳ 由 {use_symbol} {use_base} 合成: {', '.join(tf['name'] for tf in derived)}")
+        base_df = backfill_klines_frame(start_ms, now_ms, interval=use_base, symbol=use_symbol)
+        for tf in derived:
+            frames[tf['name']] = resample_frame(base_df, use_base, tf['interval']).tail(tf['limit'])
+    for tf in direct:
+        with get_client_pool().client() as client:
+            frames[tf['name']] = fetch_latest_klines(client, use_symbol, tf['interval'], tf['limit'])
+    print(f"✅ 多周期数据获取完成, 共 {len(frames)} 个")
+    return frames
+
+
+def fetch_and_save_all_timeframes(symbol=None, include_aggressive=True, resample=False):
+    """
+    并发获取所有时间周期并分别保存原始数据
+    参数:
+        resample: True 时只抓取基础周期并在本地合成其余周期 (见 fetch_all_timeframes_resampled)
+    返回:
+        dict: {时间周期名称: 文件路径}
+    """
+    if resample:
+        frames = fetch_all_timeframes_resampled(symbol, include_aggressive)
+    else:
+        frames = fetch_all_timeframes(symbol, include_aggressive)
+    intervals = {tf['name']: tf['interval'] for tf in get_all_timeframe_configs(include_aggressive)}
+    paths = {}
+    for name, df in frames.items():
+        paths[name] = save_raw_data(df, DATA_DIR / get_filenames(name, symbol)['raw'],
+                                    symbol=symbol or SYMBOL, interval=intervals.get(name))
+    return paths
+
+
 def fetch_and_save_btcusdt_daily():
     """
     向后兼容函数：获取并保存BTCUSDT日线数据
@@ -187,7 +686,7 @@ if __name__ == "__main__":
         print(f"\n测试成功! 文件保存位置: {file_path}")
 
         # 显示数据预览
-        df = pd.read_csv(file_path)
+        df = load_frame(file_path)
         print("\n数据预览:")
         print(df[['开盘价', '最高价', '最低价', '收盘价', '成交量']].tail(5))
 
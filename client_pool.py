@@ -0,0 +1,138 @@
+"""
+币安客户端连接池模块
+功能：在进程内复用 UMFutures 客户端及其 keep-alive HTTP 会话，避免每次请求都重新建立TCP/TLS连接
+用法：
+    with get_client_pool().client() as client:           # 同步路径
+        client.klines(...)
+    async with get_client_pool().client_async() as client:  # 异步路径
+        ...
+"""
+
+import asyncio
+import atexit
+import queue
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from requests.adapters import HTTPAdapter
+from binance.um_futures import UMFutures
+from config import BINANCE_API_KEY, BINANCE_API_SECRET, CLIENT_POOL_SIZE, HTTP_POOL_MAXSIZE, get_api_base_url
+
+
+def create_binance_client(connections=None):
+    """
+    创建一个带 keep-alive 连接池的客户端
+    参数:
+        connections: 该客户端HTTP会话可保持的最大连接数
+    """
+    client = UMFutures(
+        key=BINANCE_API_KEY,
+        secret=BINANCE_API_SECRET,
+        base_url=get_api_base_url(),  # 期货API基础地址 (或本地模拟服务器)
+        show_limit_usage=True  # 返回 X-MBX-USED-WEIGHT 响应头，供限流器同步已用权重
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=connections or HTTP_POOL_MAXSIZE)
+    client.session.mount('https://', adapter)
+    client.session.mount('http://', adapter)
+    return client
+
+
+class BinanceClientPool:
+    """
+    固定大小的客户端池
+    - 客户端按需懒创建，最多 size 个，归还后被后续调用复用 (连接保持打开)
+    - 借出的客户端由调用方独占，可安全地在线程或协程中使用
+    - 支持 with 语句管理生命周期，退出时关闭所有HTTP会话
+    """
+
+    def __init__(self, size=None, connections_per_client=None, factory=None):
+        self.size = size or CLIENT_POOL_SIZE
+        self.connections_per_client = connections_per_client or HTTP_POOL_MAXSIZE
+        self._factory = factory or create_binance_client
+        self._idle = queue.LifoQueue()  # 后进先出：优先复用最近使用过、连接仍然活跃的客户端
+        self._created = []
+        self._lock = threading.Lock()
+        self._default_client = None
+        self.closed = False
+
+    def _create(self):
+        client = self._factory(self.connections_per_client)
+        self._created.append(client)
+        return client
+
+    def acquire(self, timeout=None):
+        """借出一个客户端，池已满且无空闲客户端时阻塞等待"""
+        if self.closed:
+            raise RuntimeError("客户端连接池已关闭")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._created) < self.size:
+                return self._create()
+        return self._idle.get(timeout=timeout)
+
+    def release(self, client):
+        """归还客户端"""
+        if self.closed:
+            client.session.close()
+            return
+        self._idle.put(client)
+
+    @contextmanager
+    def client(self, timeout=None):
+        """同步上下文：借出并自动归还客户端"""
+        client = self.acquire(timeout)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    @asynccontextmanager
+    async def client_async(self, timeout=None):
+        """异步上下文：在线程中等待空闲客户端，不阻塞事件循环"""
+        client = await asyncio.to_thread(self.acquire, timeout)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    @property
+    def default_client(self):
+        """长期共享的默认客户端 (供 get_binance_client 等向后兼容接口使用)"""
+        with self._lock:
+            if self._default_client is None:
+                self._default_client = self._factory(self.connections_per_client)
+            return self._default_client
+
+    def close(self):
+        """关闭池中所有客户端的HTTP会话"""
+        self.closed = True
+        with self._lock:
+            clients = list(self._created)
+            if self._default_client is not None:
+                clients.append(self._default_client)
+            self._created.clear()
+            self._default_client = None
+        for client in clients:
+            client.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool():
+    """获取进程内共享的客户端连接池 (进程退出时自动关闭)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = BinanceClientPool()
+            atexit.register(_pool.close)
+        return _pool
@@ -1,6 +1,6 @@
 """
 组合数据处理模块
-功能：合并原始数据和技术指标数据，生成包含完整信息的CSV文件
+功能：合并原始数据和技术指标数据，生成包含完整信息的组合数据 (列式存储，可选导出CSV)
 输出：包含日线原始数据和技术指标的合并数据集
 """
 
@@ -9,7 +9,39 @@ import os
 import sys
 from pathlib import Path
 from datetime import datetime
-from config import DATA_DIR, RAW_DATA_FILENAME, INDICATORS_FILENAME, COMBINED_FILENAME, SYMBOL, get_filenames
+from config import DATA_DIR, RAW_DATA_FILENAME, INDICATORS_FILENAME, COMBINED_FILENAME, SYMBOL, CSV_EXPORT_STAGES, \
+    get_filenames
+from frame_storage import save_frame, load_frame, frame_exists, find_frame
+from partitioned_store import write_dataset
+from result_cache import get_result_cache, result_key, frame_digest
+
+# 23列精简版的列结构 (MA89 不存在时使用 MA_LONG)；create_23_column_version 从组合数据中只取这些列
+TWENTY_THREE_COLUMNS = [
+    'open_time',           # 1. 时间戳
+    '开盘价',              # 2. 开盘价
+    '最高价',              # 3. 最高价
+    '最低价',              # 4. 最低价
+    '收盘价',              # 5. 收盘价
+    '成交量',              # 6. 成交量
+    'MA20',               # 7. MA20
+    'MA50',               # 8. MA50
+    'MA89',               # 9. MA89 (或MA_LONG)
+    'BB_Upper',           # 10. BB_Upper
+    'BB_Lower',           # 11. BB_Lower
+    'BB_Long_Upper',      # 12. BB_Long_Upper
+    'BB_Long_Lower',      # 13. BB_Long_Lower
+    'MACD_Hist',          # 14. MACD_Hist
+    'RSI',                # 15. RSI
+    'ATR',                # 16. ATR
+    'Fib_Ret_0.382',      # 17. Fib_Ret_0.382
+    'Fib_Ret_0.500',      # 18. Fib_Ret_0.500
+    'Fib_Ret_0.618',      # 19. Fib_Ret_0.618
+    'Fib_Support_Level',  # 20. Fib_Support_Level
+    'Fib_Resistance_Level', # 21. Fib_Resistance_Level
+    'Fib_Price_Position', # 22. Fib_Price_Position
+    'MACD_Long'           # 23. MACD_Long
+]
+
 
 def combine_data(raw_filename=None, indicators_filename=None, combined_filename=None, timeframe_name=None):
     """
@@ -29,12 +61,12 @@ def combine_data(raw_filename=None, indicators_filename=None, combined_filename=
 
     # 1. 确定文件路径
     raw_path = DATA_DIR / (raw_filename or RAW_DATA_FILENAME)
-    if not raw_path.exists():
+    if not frame_exists(raw_path):
         print(f"❌ 错误: 原始数据文件不存在 - {raw_path}")
         return None
 
     try:
-        raw_df = pd.read_csv(raw_path, encoding='utf-8-sig')
+        raw_df = load_frame(raw_path)
         print(f"✅ 成功加载原始数据, 共 {len(raw_df)} 条记录")
     except Exception as e:
         print(f"❌ 加载原始数据失败: {e}")
@@ -42,18 +74,55 @@ def combine_data(raw_filename=None, indicators_filename=None, combined_filename=
 
     # 2. 加载技术指标数据
     indicators_path = DATA_DIR / (indicators_filename or INDICATORS_FILENAME)
-    if not indicators_path.exists():
+    if not frame_exists(indicators_path):
         print(f"❌ 错误: 技术指标文件不存在 - {indicators_path}")
         return None
 
     try:
-        indicators_df = pd.read_csv(indicators_path, encoding='utf-8-sig')
+        indicators_df = load_frame(indicators_path)
         print(f"✅ 成功加载技术指标数据, 共 {len(indicators_df)} 条记录")
     except Exception as e:
         print(f"❌ 加载技术指标数据失败: {e}")
         return None
 
-    # 3. 数据预处理
+    # 3. 合并数据
+    combined_df = combine_frames(raw_df, indicators_df)
+    if combined_df is None:
+        return None
+
+    # 4. 保存结果
+    return save_combined_data(combined_df, DATA_DIR / (combined_filename or COMBINED_FILENAME), timeframe_name)
+
+
+def combine_frames(raw_df, indicators_df):
+    """
+    在内存中合并原始数据和技术指标数据 (不读写数据文件)
+    参数:
+        raw_df: 原始数据层 DataFrame
+        indicators_df: calculate_indicators_frame 返回的指标 DataFrame
+    返回:
+        DataFrame: 组合数据 (open_time 为普通列)；合并失败时返回 None
+    说明：两个输入都未变化时直接返回缓存的组合结果 (见 result_cache)
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return _combine_frames(raw_df, indicators_df)
+
+    key = result_key('combined', frame_digest(raw_df), frame_digest(indicators_df))
+    combined_df = cache.get_frame(key)
+    if combined_df is not None:
+        print("⚡ 输入数据未变化，复用缓存的组合数据")
+        return combined_df
+    combined_df = _combine_frames(raw_df, indicators_df)
+    if combined_df is not None:
+        cache.put_frame(key, combined_df)
+    return combined_df
+
+
+def _combine_frames(raw_df, indicators_df):
+    # 1. 数据预处理 (转换为以 open_time 为普通列的副本，不修改传入的 DataFrame)
+    raw_df = _time_index_to_column(raw_df)
+    indicators_df = _time_index_to_column(indicators_df)
     print("🔄 数据预处理中...")
 
     # 查找时间列（兼容不同列名）
@@ -73,7 +142,7 @@ def combine_data(raw_filename=None, indicators_filename=None, combined_filename=
         df.sort_values(time_col, inplace=True)
         df.reset_index(drop=True, inplace=True)
 
-    # 4. 合并数据
+    # 2. 合并数据
     print("🔀 合并数据中...")
 
     # 识别重复列（除了时间列）
@@ -133,15 +202,20 @@ def combine_data(raw_filename=None, indicators_filename=None, combined_filename=
         print(f"❌ 数据合并失败: {e}")
         return None
 
-    # 5. 保存结果
-    combined_path = DATA_DIR / (combined_filename or COMBINED_FILENAME)
+    return combined_df
 
-    try:
-        # 确保目录存在
-        combined_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # 保存为CSV（兼容中文Excel）
-        combined_df.to_csv(combined_path, encoding='utf-8-sig', index=False)
+def save_combined_data(combined_df, combined_path, timeframe_name=None, symbol=None, interval=None):
+    """
+    保存组合数据及23列精简版 (存储格式见 config.STORAGE_FORMAT，CSV导出见 config.CSV_EXPORT_STAGES)
+    参数:
+        symbol/interval: 同时给出时，组合数据还会合并进分区数据集 combined/{symbol}/{interval}
+    返回:
+        Path: 组合数据的实际保存路径；保存失败时返回 None
+    """
+    try:
+        # 列式存储供后续程序读取，按配置另外导出CSV（兼容中文Excel）
+        combined_path = save_frame(combined_df, combined_path, csv_export='combined' in CSV_EXPORT_STAGES)
 
         print(f"✅ 数据合并完成! 文件保存至: {combined_path}")
         print(f"📊 合并后数据维度: {len(combined_df)} 行 × {len(combined_df.columns)} 列")
@@ -149,11 +223,21 @@ def combine_data(raw_filename=None, indicators_filename=None, combined_filename=
         # 创建23列精简版本
         create_23_column_version(combined_df, combined_path, timeframe_name)
 
+        if symbol and interval:
+            write_dataset('combined', combined_df, symbol, interval)
         return combined_path
     except Exception as e:
         print(f"❌ 文件保存失败: {e}")
         return None
 
+
+def _time_index_to_column(df):
+    """列式存储的数据以 open_time 为索引，转换为普通列 (与旧版本CSV读取结果一致)，总是返回副本"""
+    if df.index.name is not None:
+        return df.reset_index()
+    return df.copy()
+
+
 def clean_and_validate_data(df):
     """
     清理和验证组合数据
@@ -231,12 +315,12 @@ def display_combined_data_preview(file_path, num_rows=5):
         file_path (Path): 数据文件路径
         num_rows (int): 显示的行数（首尾各显示num_rows行）
     """
-    if not file_path.exists():
+    if not frame_exists(file_path):
         print(f"❌ 文件不存在: {file_path}")
         return
 
     try:
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        df = _time_index_to_column(load_frame(file_path))
 
         print("\n" + "=" * 50)
         print(f"合并数据预览 ({file_path.name})")
@@ -275,8 +359,7 @@ def display_combined_data_preview(file_path, num_rows=5):
 
 def get_latest_combined_path():
     """获取最新的组合数据文件路径"""
-    combined_path = DATA_DIR / COMBINED_FILENAME
-    return combined_path if combined_path.exists() else None
+    return find_frame(DATA_DIR / COMBINED_FILENAME)
 
 if __name__ == "__main__":
     print("=" * 50)
@@ -292,7 +375,7 @@ if __name__ == "__main__":
             display_combined_data_preview(result_path)
 
             # 验证数据完整性
-            df = pd.read_csv(result_path, encoding='utf-8-sig')
+            df = load_frame(result_path)
             required_cols = ['开盘价', '收盘价', 'MA20', 'MA50', 'RSI']
             missing_cols = [col for col in required_cols if col not in df.columns]
 
@@ -310,36 +393,9 @@ def create_23_column_version(combined_df, combined_path, timeframe_name):
     try:
         print(f"\n📊 创建{timeframe_name or ''}23列精简版...")
 
-        # 定义23列结构
-        required_columns = [
-            'open_time',           # 1. 时间戳
-            '开盘价',              # 2. 开盘价
-            '最高价',              # 3. 最高价
-            '最低价',              # 4. 最低价
-            '收盘价',              # 5. 收盘价
-            '成交量',              # 6. 成交量
-            'MA20',               # 7. MA20
-            'MA50',               # 8. MA50
-            'MA89',               # 9. MA89 (或MA_LONG)
-            'BB_Upper',           # 10. BB_Upper
-            'BB_Lower',           # 11. BB_Lower
-            'BB_Long_Upper',      # 12. BB_Long_Upper
-            'BB_Long_Lower',      # 13. BB_Long_Lower
-            'MACD_Hist',          # 14. MACD_Hist
-            'RSI',                # 15. RSI
-            'ATR',                # 16. ATR
-            'Fib_Ret_0.382',      # 17. Fib_Ret_0.382
-            'Fib_Ret_0.500',      # 18. Fib_Ret_0.500
-            'Fib_Ret_0.618',      # 19. Fib_Ret_0.618
-            'Fib_Support_Level',  # 20. Fib_Support_Level
-            'Fib_Resistance_Level', # 21. Fib_Resistance_Level
-            'Fib_Price_Position', # 22. Fib_Price_Position
-            'MACD_Long'           # 23. MACD_Long
-        ]
-
         # 检查可用列并处理列名映射
         available_columns = []
-        for col in required_columns:
+        for col in TWENTY_THREE_COLUMNS:
             if col in combined_df.columns:
                 available_columns.append(col)
             elif col == 'MA89' and 'MA_LONG' in combined_df.columns:
@@ -371,13 +427,12 @@ def create_23_column_version(combined_df, combined_path, timeframe_name):
 
         # 生成23列文件名
         original_name = combined_path.stem
-        col23_filename = f"{original_name}_23col.csv"
-        col23_path = combined_path.parent / col23_filename
+        col23_path = combined_path.parent / f"{original_name}_23col.csv"
 
-        # 保存23列文件
-        df_23col.to_csv(col23_path, encoding='utf-8-sig', index=False)
+        # 保存23列文件 (与组合数据使用相同的存储格式和CSV导出设置)
+        col23_path = save_frame(df_23col, col23_path, csv_export='combined' in CSV_EXPORT_STAGES)
 
-        print(f"✅ 23列精简版已保存: {col23_filename}")
+        print(f"✅ 23列精简版已保存: {col23_path.name}")
         print(f"📊 文件大小: {col23_path.stat().st_size / 1024:.1f}KB")
         print(f"📊 列数: {len(combined_df.columns)} → {len(df_23col.columns)} (减少{len(combined_df.columns) - len(df_23col.columns)}列)")
 
@@ -25,6 +25,18 @@ BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / 'data'
 DATA_DIR.mkdir(exist_ok=True, parents=True)
 
+# K线增量存储目录 (按交易对和K线间隔持久化已收盘K线)
+KLINE_STORE_DIR = DATA_DIR / 'store'
+
+# K线响应缓存目录 (已收盘K线页的原始响应)
+KLINE_CACHE_DIR = DATA_DIR / 'cache'
+
+# 计算结果缓存目录 (指标/组合数据/报告，按输入内容哈希和参数缓存)
+RESULT_CACHE_DIR = DATA_DIR / 'results'
+
+# 分区数据集目录 (各阶段的规范数据: {数据集}/{交易对}/{K线间隔}/{年-月})
+DATASET_DIR = DATA_DIR / 'datasets'
+
 # 日志目录
 LOG_DIR = BASE_DIR / 'logs'
 LOG_DIR.mkdir(exist_ok=True)
@@ -39,6 +51,16 @@ BINANCE_API_SECRET = os.getenv('BINANCE_API_SECRET')
 # API基础地址
 BINANCE_API_URL = "https://fapi.binance.com"  # 期货API地址
 BINANCE_TESTNET_URL = "https://testnet.binancefuture.com"  # 测试网地址
+BINANCE_WS_URL = "wss://fstream.binance.com/ws"  # 期货WebSocket推送地址
+
+# 本地模拟服务器地址 (离线基准/回归测试)
+# 设置环境变量 BINANCE_MOCK_URL=http://127.0.0.1:8765 后，所有REST请求都发往 mock_binance_server.py
+BINANCE_MOCK_URL = os.getenv('BINANCE_MOCK_URL')
+USE_MOCK_SERVER = bool(BINANCE_MOCK_URL)
+
+# WebSocket推送重连配置 (秒，指数退避)
+STREAM_RECONNECT_DELAY = 1
+STREAM_MAX_RECONNECT_DELAY = 30
 
 # 交易对和K线类型配置
 SYMBOL = 'BTCUSDT'       # 交易对符号
@@ -46,6 +68,11 @@ INTERVAL = '1d'          # K线间隔 (默认日线)
 KLINE_LIMIT = 120        # 每次请求获取的K线数量 (默认120条数据)
 USE_TESTNET = False      # 是否使用测试网络
 
+# 多交易对流水线配置 (可用环境变量 SYMBOLS=BTCUSDT,ETHUSDT,SOLUSDT 覆盖)
+SYMBOLS = [s.strip().upper() for s in os.getenv('SYMBOLS', SYMBOL).split(',') if s.strip()]
+SYMBOL_FETCH_MAX_WORKERS = 8   # 并发抓取交易对的最大线程数
+PIPELINE_MAX_WORKERS = None    # 指标计算进程池大小，None 表示CPU核数
+
 # 时间周期配置 - 优化数据量到200条
 TIMEFRAME_OPTIONS = {
     '1': {'interval': '15m', 'name': '15分钟线', 'limit': 200, 'desc': '最近2.1天'},   # 200个15分钟 ≈ 2.1天
@@ -55,27 +82,134 @@ TIMEFRAME_OPTIONS = {
     '5': {'interval': '1w', 'name': '周线', 'limit': 200, 'desc': '最近200周'}         # 200周 ≈ 3.8年
 }
 
+# 各K线间隔对应的毫秒数 (用于按时间窗口分页请求)
+INTERVAL_MILLISECONDS = {
+    '1m': 60_000,
+    '3m': 3 * 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 60 * 60_000,
+    '2h': 2 * 60 * 60_000,
+    '4h': 4 * 60 * 60_000,
+    '6h': 6 * 60 * 60_000,
+    '8h': 8 * 60 * 60_000,
+    '12h': 12 * 60 * 60_000,
+    '1d': 24 * 60 * 60_000,
+    '3d': 3 * 24 * 60 * 60_000,
+    '1w': 7 * 24 * 60 * 60_000,
+}
+
+# 历史数据回补配置
+KLINES_MAX_LIMIT = 1500      # 币安单次klines请求最多返回的K线数量
+BACKFILL_MAX_WORKERS = 4     # 并发回补的最大线程数
+BACKFILL_MAX_RETRIES = 3     # 单个时间窗口的最大重试次数
+
+# 客户端连接池配置
+CLIENT_POOL_SIZE = 4       # 进程内最多同时借出的客户端数量
+HTTP_POOL_MAXSIZE = 10     # 每个客户端HTTP会话保持的keep-alive连接数
+
+# 请求权重限流配置 (币安U本位合约默认每分钟2400权重)
+BINANCE_WEIGHT_LIMIT_PER_MINUTE = 2400
+RATE_LIMIT_SAFETY_RATIO = 0.9       # 只使用90%的额度，给其他程序留余量
+RATE_LIMIT_MAX_RETRIES = 3          # 收到429/418后的最大重试次数
+# 设置为文件路径即可在多个进程间共享限流状态 (如 DATA_DIR / 'rate_limit_state.json')
+RATE_LIMIT_STATE_FILE = Path(os.getenv('RATE_LIMIT_STATE_FILE')) if os.getenv('RATE_LIMIT_STATE_FILE') else None
+
+# 增量更新模式：只请求本地存储中最后一根已收盘K线之后的数据
+INCREMENTAL_FETCH = True
+
+# 本地合成多周期时使用的基础K线间隔 (1h/4h/1d/1w 都由它聚合得到)
+RESAMPLE_BASE_INTERVAL = '15m'
+
+# K线磁盘缓存：完全收盘的K线页缓存到本地，重复请求直接读磁盘 (按LRU淘汰)
+KLINE_CACHE_ENABLED = True
+KLINE_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 缓存总大小上限 (512MB)
+
+# 流水线各阶段数据的存储格式: 'feather' / 'parquet' / 'pickle' / 'csv' (可用环境变量 STORAGE_FORMAT 覆盖)
+# feather 读写最快，parquet 文件更小；两者都需要 pyarrow，未安装时自动改用 pickle
+STORAGE_FORMAT = os.getenv('STORAGE_FORMAT', 'feather')
+# 额外导出 Excel 可打开的 CSV 的阶段 ('raw' / 'indicators' / 'combined')，组合数据默认导出供人工查看
+CSV_EXPORT_STAGES = {s.strip() for s in os.getenv('CSV_EXPORT_STAGES', 'combined').split(',') if s.strip()}
+
+# 计算结果缓存：输入K线和参数都没变时直接复用上次的指标/组合数据/报告 (RESULT_CACHE=0 关闭)
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE', '1') != '0'
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 缓存总大小上限 (256MB)
+
+# 参数扫描 (parameter_sweep) 每批参数组合的中间结果内存上限
+SWEEP_CHUNK_BYTES = 256 * 1024 * 1024  # 256MB
+
+# 技术指标计算后端: 'auto' (已安装 TA-Lib 时使用 TA-Lib，否则使用纯NumPy实现) / 'talib' / 'numpy'
+# (可用环境变量 INDICATOR_BACKEND 覆盖)
+INDICATOR_BACKEND = os.getenv('INDICATOR_BACKEND', 'auto')
+
+
+def get_api_base_url():
+    """返回当前应使用的REST基础地址：模拟服务器 > 测试网 > 正式网 (每次调用时读取环境变量)"""
+    mock_url = os.getenv('BINANCE_MOCK_URL')
+    if mock_url:
+        return mock_url
+    return BINANCE_TESTNET_URL if USE_TESTNET else BINANCE_API_URL
+
+
+def get_kline_store_dir():
+    """返回增量K线存储目录：连接模拟服务器时使用独立目录，避免模拟数据混入真实数据"""
+    return KLINE_STORE_DIR.with_name('store_mock') if os.getenv('BINANCE_MOCK_URL') else KLINE_STORE_DIR
+
+
+def get_kline_cache_dir():
+    """返回K线缓存目录 (连接模拟服务器时同样使用独立目录)"""
+    return KLINE_CACHE_DIR.with_name('cache_mock') if os.getenv('BINANCE_MOCK_URL') else KLINE_CACHE_DIR
+
+
+def get_result_cache_dir():
+    """返回计算结果缓存目录 (连接模拟服务器时同样使用独立目录)"""
+    return RESULT_CACHE_DIR.with_name('results_mock') if os.getenv('BINANCE_MOCK_URL') else RESULT_CACHE_DIR
+
+
+def get_dataset_dir():
+    """返回分区数据集目录 (连接模拟服务器时同样使用独立目录)"""
+    return DATASET_DIR.with_name('datasets_mock') if os.getenv('BINANCE_MOCK_URL') else DATASET_DIR
+
+
+def interval_to_milliseconds(interval):
+    """将K线间隔字符串 (如 '15m', '1h') 转换为毫秒数"""
+    if interval not in INTERVAL_MILLISECONDS:
+        raise ValueError(f"不支持的K线间隔: {interval}")
+    return INTERVAL_MILLISECONDS[interval]
+
 # --------------------------
 # 文件命名配置
 # --------------------------
 # 获取当前日期（可从环境变量覆盖）
 current_date = os.getenv('RUN_DATE', datetime.now().strftime("%Y%m%d"))
 
+# 各阶段的规范数据保存在分区数据集中 (DATASET_DIR)，data/ 下只保留每个交易对/周期最新一次的输出，
+# 不再每天生成一批带日期的文件；设置环境变量 DATE_STAMPED_FILES=1 可恢复带日期的文件名
+DATE_STAMPED_FILES = os.getenv('DATE_STAMPED_FILES', '0') == '1'
+_file_suffix = f"_{current_date}" if DATE_STAMPED_FILES else ''
+
 # 动态生成文件名的函数
-def get_filenames(timeframe_name):
-    """根据时间周期生成文件名"""
+def get_filenames(timeframe_name, symbol=None):
+    """根据时间周期 (和交易对，默认 SYMBOL) 生成文件名"""
+    symbol = symbol or SYMBOL
     return {
-        'raw': f"{SYMBOL}_{timeframe_name}原始数据_{current_date}.csv",
-        'indicators': f"{SYMBOL}_{timeframe_name}技术指标分析_{current_date}.csv",
-        'combined': f"{SYMBOL}_{timeframe_name}组合数据_{current_date}.csv",
-        'report': f"{SYMBOL}_{timeframe_name}交易分析报告_{current_date}.txt"
+        'raw': f"{symbol}_{timeframe_name}原始数据{_file_suffix}.csv",
+        'indicators': f"{symbol}_{timeframe_name}技术指标分析{_file_suffix}.csv",
+        'combined': f"{symbol}_{timeframe_name}组合数据{_file_suffix}.csv",
+        'report': f"{symbol}_{timeframe_name}交易分析报告{_file_suffix}.txt"
     }
 
+
+def get_summary_filename(timeframe_name):
+    """多交易对汇总文件名"""
+    return f"多币种_{timeframe_name}汇总{_file_suffix}.csv"
+
 # 默认文件名（向后兼容）
-RAW_DATA_FILENAME = f"{SYMBOL}_日线原始数据_{current_date}.csv"
-INDICATORS_FILENAME = f"{SYMBOL}_日线技术指标分析_{current_date}.csv"
-COMBINED_FILENAME = f"{SYMBOL}_日线组合数据_{current_date}.csv"
-REPORT_FILENAME = f"{SYMBOL}_日线交易分析报告_{current_date}.txt"
+RAW_DATA_FILENAME = f"{SYMBOL}_日线原始数据{_file_suffix}.csv"
+INDICATORS_FILENAME = f"{SYMBOL}_日线技术指标分析{_file_suffix}.csv"
+COMBINED_FILENAME = f"{SYMBOL}_日线组合数据{_file_suffix}.csv"
+REPORT_FILENAME = f"{SYMBOL}_日线交易分析报告{_file_suffix}.txt"
 
 # 日志文件名格式：app_20240717.log
 LOG_FILENAME = f"app_{current_date}.log"
@@ -291,7 +425,8 @@ LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 # --------------------------
 # 验证关键配置
 # --------------------------
-if not BINANCE_API_KEY or not BINANCE_API_SECRET:
+# 使用本地模拟服务器时不需要真实密钥 (K线等行情接口本身也不需要签名)
+if not USE_MOCK_SERVER and (not BINANCE_API_KEY or not BINANCE_API_SECRET):
     raise ValueError("未检测到币安API密钥! 请检查.env文件配置")
 
 # 测试输出配置信息（实际使用时可注释掉）
@@ -299,6 +434,7 @@ if __name__ == '__main__':
     print("\n=== 配置信息 ===")
     print(f"API密钥: {'已设置' if BINANCE_API_KEY else '未设置'}")
     print(f"使用测试网络: {'是' if USE_TESTNET else '否'}")
+    print(f"API地址: {get_api_base_url()}")
     print(f"交易对: {SYMBOL}")
     print(f"K线间隔: {INTERVAL}")
 
@@ -0,0 +1,196 @@
+"""
+流水线数据存储模块
+功能：各阶段 (原始数据/技术指标/组合数据) 的 DataFrame 以列式二进制格式保存和读取，
+      CSV 只作为可选的 Excel 导出
+说明：
+    - 调用方仍使用 get_filenames 返回的 .csv 文件名作为逻辑路径，
+      实际文件按存储格式替换后缀 (如 BTCUSDT_日线原始数据_20250722.feather)
+    - parquet/feather 按列保存带类型的数据：时间列为 int64 时间戳、数值列为 float，
+      读取时不需要任何文本解析，索引 (open_time) 也原样恢复
+    - 需要 pyarrow；未安装时自动改用 pandas 自带的 pickle 格式 (同样是带类型的二进制)
+    - 读取时兼容旧版本生成的 CSV 文件
+    - 信号列在二进制格式中保存为整数编码，导出 CSV 时才转换为中文标签 (见 signal_labels)
+    - submit_write/save_frame_async 在后台写入线程中保存，流水线各阶段可以直接传递
+      DataFrame，持久化不阻塞下一阶段
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+import pandas as pd
+from config import STORAGE_FORMAT
+from signal_labels import decode_signals
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# 支持的存储格式及文件后缀
+STORAGE_SUFFIXES = {
+    'feather': '.feather',
+    'parquet': '.parquet',
+    'pickle': '.pkl',
+    'csv': '.csv',
+}
+
+_fallback_warned = False
+
+
+def get_storage_format(fmt=None):
+    """返回实际使用的存储格式 (需要 pyarrow 的格式在未安装时退回 pickle)"""
+    global _fallback_warned
+    fmt = fmt or STORAGE_FORMAT
+    if fmt not in STORAGE_SUFFIXES:
+        raise ValueError(f"不支持的存储格式: {fmt} (可选: {', '.join(STORAGE_SUFFIXES)})")
+    if fmt in ('parquet', 'feather') and not PYARROW_AVAILABLE:
+        if not _fallback_warned:
+            print(f"⚠️ 未安装 pyarrow，{fmt} 存储改用 pickle (pip install pyarrow 可启用列式存储)")
+            _fallback_warned = True
+        return 'pickle'
+    return fmt
+
+
+def storage_path(path, fmt=None):
+    """逻辑路径 (.csv 文件名) 对应的实际存储路径"""
+    return Path(path).with_suffix(STORAGE_SUFFIXES[get_storage_format(fmt)])
+
+
+def find_frame(path):
+    """
+    查找逻辑路径对应的已保存文件
+    返回:
+        Path: 二进制格式中最近写入的一个 (切换存储格式后不会读到旧文件)；
+              没有二进制文件或存储格式为 csv 时才使用 CSV；都不存在时返回 None
+    """
+    path = Path(path)
+    existing = [path.with_suffix(suffix) for suffix in STORAGE_SUFFIXES.values()
+                if path.with_suffix(suffix).exists()]
+    binary = [candidate for candidate in existing if candidate.suffix != STORAGE_SUFFIXES['csv']]
+    # 导出的 CSV 可能被 Excel 编辑保存过，只要存在二进制文件就以二进制文件为准
+    if binary and get_storage_format() != 'csv':
+        existing = binary
+    if not existing:
+        return None
+    return max(existing, key=lambda candidate: candidate.stat().st_mtime_ns)
+
+
+def frame_exists(path):
+    """逻辑路径对应的数据是否已保存 (任意格式)"""
+    return find_frame(path) is not None
+
+
+def export_csv(df, path):
+    """导出 Excel 可直接打开的 CSV (utf-8-sig)，命名索引 (如 open_time) 作为第一列写出，信号列写出标签"""
+    path = Path(path).with_suffix('.csv')
+    df = decode_signals(df)
+    df.to_csv(path, encoding='utf-8-sig', index=df.index.name is not None)
+    return path
+
+
+def save_frame(df, path, csv_export=False, fmt=None):
+    """
+    保存 DataFrame
+    参数:
+        path: 逻辑路径 (后缀会被替换为存储格式的后缀)
+        csv_export: 是否同时导出 CSV
+        fmt: 存储格式 (默认 config.STORAGE_FORMAT)
+    返回:
+        Path: 实际保存的文件路径
+    """
+    use_format = get_storage_format(fmt)
+    target = storage_path(path, use_format)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if use_format == 'csv':
+        return export_csv(df, target)
+
+    tmp_path = target.with_name(f"{target.name}.tmp")
+    if use_format == 'pickle':
+        df.to_pickle(tmp_path)
+    else:
+        # preserve_index=None: 命名索引作为列保存并在读取时恢复，默认 RangeIndex 只记录元数据
+        table = pa.Table.from_pandas(df, preserve_index=None)
+        if use_format == 'parquet':
+            pq.write_table(table, tmp_path)
+        else:
+            feather.write_feather(table, tmp_path)
+    tmp_path.replace(target)
+
+    if csv_export:
+        export_csv(df, path)
+    return target
+
+
+def _present(columns, names):
+    """columns 中实际存在的列 (保持顺序，去掉重复)"""
+    names = set(names)
+    return [col for col in dict.fromkeys(columns) if col in names]
+
+
+def load_frame(path, columns=None):
+    """
+    读取 DataFrame (按实际存在的文件格式读取)
+    参数:
+        columns: 只读取这些列 (不存在的列忽略)；列式格式只读取这些列的数据，
+                 需要恢复时间索引时把 open_time 也列入
+    返回:
+        DataFrame: 列式格式保持保存时的索引和类型；旧版本 CSV 按原样读取 (open_time 为普通列)
+    异常:
+        FileNotFoundError: 任意格式的文件都不存在
+    """
+    found = find_frame(path)
+    if found is None:
+        raise FileNotFoundError(f"数据文件不存在: {path}")
+    suffix = found.suffix
+    if suffix == STORAGE_SUFFIXES['parquet']:
+        if columns is not None:
+            columns = _present(columns, pq.read_schema(found).names)
+        return pq.read_table(found, columns=columns).to_pandas()
+    if suffix == STORAGE_SUFFIXES['feather']:
+        if columns is not None:
+            columns = _present(columns, pa.ipc.open_file(found).schema.names)
+        return feather.read_table(found, columns=columns).to_pandas()
+    if suffix == STORAGE_SUFFIXES['pickle']:
+        df = pd.read_pickle(found)
+        return df if columns is None else df[_present(columns, df.columns)]
+    usecols = None if columns is None else set(columns).__contains__
+    return pd.read_csv(found, encoding='utf-8-sig', usecols=usecols)
+
+
+# ===== 后台写入 =====
+# 单个写入线程按提交顺序依次落盘，同一文件不会被并发写入
+_writer = None
+_writer_lock = threading.Lock()
+_pending = set()
+
+
+def submit_write(func, *args, **kwargs):
+    """
+    在后台写入线程中执行保存函数 (如 save_frame/save_report)
+    说明：提交后不要再原地修改传入的 DataFrame
+    返回:
+        Future: 结果为保存函数的返回值，保存失败时 result() 抛出原异常
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='frame-writer')
+        future = _writer.submit(func, *args, **kwargs)
+        _pending.add(future)
+    future.add_done_callback(_pending.discard)
+    return future
+
+
+def save_frame_async(df, path, csv_export=False, fmt=None):
+    """后台保存 DataFrame，返回 Future (结果为实际保存路径)"""
+    return submit_write(save_frame, df, path, csv_export=csv_export, fmt=fmt)
+
+
+def flush_writes(timeout=None):
+    """等待所有已提交的后台写入完成 (进程退出或读取刚保存的文件之前调用)"""
+    with _writer_lock:
+        pending = list(_pending)
+    wait(pending, timeout=timeout)
@@ -0,0 +1,347 @@
+"""
+技术指标计算后端模块
+功能：compute_ta_indicators 用到的指标函数 (MA、MACD、RSI、BBANDS、STOCH、OBV、ATR、ADX) 的两种实现，
+      TA-Lib 实现和纯NumPy向量化实现，函数名和参数与 TA-Lib 相同，可以互相替换
+说明：
+    - 后端由 config.INDICATOR_BACKEND 选择：'auto' 时已安装 TA-Lib 就用 TA-Lib，否则用纯NumPy实现
+      (TA-Lib 的C库是部署时最麻烦的依赖，没有它也能完整运行)
+    - 纯NumPy实现按 TA-Lib 的规则计算 (初值、预热期 NaN、TA_IS_ZERO 判断)：SMA/布林带由累积和相减得到窗口和，
+      EMA/Wilder 平滑用 parameter_sweep 的分块线性递推求解，STOCH 的窗口极值用滑动窗口视图，OBV 为累积和
+    - 与 TA-Lib 的差别只有浮点舍入 (相对误差约 1e-10 以内)
+    - 输入中的 NaN：TA-Lib 实现按 TA-Lib 的方式传播 (NaN 之后的递推结果全部为 NaN)；
+      纯NumPy实现不接受 NaN，任一输入含 NaN 时抛出 ValueError (调用前需清理缺失值)
+    - 纯NumPy实现只支持简单移动平均 (matype=0)，其他 matype 抛出 ValueError
+用法：python indicator_backend.py  (两个后端逐个函数交叉校验，并比较不同序列长度下的耗时)
+"""
+
+import time
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from parameter_sweep import SweepSeries, smooth, sweep_ma, sweep_macd, sweep_rsi
+
+try:
+    from config import INDICATOR_BACKEND
+except ImportError:
+    INDICATOR_BACKEND = 'auto'
+
+try:
+    import talib
+    TALIB_AVAILABLE = True
+except ImportError:
+    TALIB_AVAILABLE = False
+
+BACKENDS = ('auto', 'talib', 'numpy')
+
+
+class TalibBackend:
+    """TA-Lib 实现 (C库)"""
+
+    name = 'talib'
+
+    def __init__(self):
+        if not TALIB_AVAILABLE:
+            raise ImportError("未安装 TA-Lib，请使用纯NumPy后端 (INDICATOR_BACKEND=numpy)")
+
+    def MA(self, close, timeperiod=30, matype=0):
+        return talib.MA(close, timeperiod=timeperiod, matype=matype)
+
+    def MACD(self, close, fastperiod=12, slowperiod=26, signalperiod=9):
+        return talib.MACD(close, fastperiod=fastperiod, slowperiod=slowperiod, signalperiod=signalperiod)
+
+    def RSI(self, close, timeperiod=14):
+        return talib.RSI(close, timeperiod=timeperiod)
+
+    def BBANDS(self, close, timeperiod=5, nbdevup=2.0, nbdevdn=2.0, matype=0):
+        return talib.BBANDS(close, timeperiod=timeperiod, nbdevup=nbdevup, nbdevdn=nbdevdn, matype=matype)
+
+    def STOCH(self, high, low, close, fastk_period=5, slowk_period=3, slowk_matype=0, slowd_period=3,
+              slowd_matype=0):
+        return talib.STOCH(high, low, close, fastk_period=fastk_period, slowk_period=slowk_period,
+                           slowk_matype=slowk_matype, slowd_period=slowd_period, slowd_matype=slowd_matype)
+
+    def OBV(self, close, volume):
+        return talib.OBV(close, volume)
+
+    def ATR(self, high, low, close, timeperiod=14):
+        return talib.ATR(high, low, close, timeperiod=timeperiod)
+
+    def ADX(self, high, low, close, timeperiod=14):
+        return talib.ADX(high, low, close, timeperiod=timeperiod)
+
+
+def _float(values):
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if np.isnan(values).any():
+        raise ValueError("纯NumPy后端的输入中不能有 NaN")
+    return values
+
+
+def _check_matype(matype):
+    if matype != 0:
+        raise ValueError(f"纯NumPy后端只支持简单移动平均 (matype=0)，收到 matype={matype}")
+
+
+def _sma(values, period):
+    """不含 NaN 的序列的简单移动平均，长度不变，前 period-1 个为 NaN"""
+    return sweep_ma(values, [period])[0]
+
+
+def _true_range(high, low, close):
+    """真实波幅，第0根K线为 NaN"""
+    true_range = np.full(len(close), np.nan)
+    prev_close = close[:-1]
+    true_range[1:] = np.maximum(np.maximum(high[1:] - low[1:], np.abs(high[1:] - prev_close)),
+                                np.abs(low[1:] - prev_close))
+    return true_range
+
+
+def _wilder(values, period, start, seed, weight=None):
+    """
+    从 start 位置的初值开始做 Wilder 平滑 y = y × (period-1)/period + values × weight (weight 默认 1/period)
+    说明：values 中的 NaN 表示该K线没有新值，平滑结果保持上一根的值 (ADX 中 DX 无法计算时的处理)
+    """
+    n = len(values)
+    decay = np.array([(period - 1) / period])
+    weight = np.array([1.0 / period if weight is None else weight])
+    out = np.full(n, np.nan)
+    if start >= n:
+        return out
+    out[start] = value = seed
+    position = start + 1
+    gaps = np.flatnonzero(np.isnan(values[position:])) + position
+    for stop in list(gaps) + [n]:
+        if stop > position:
+            # 以上一根的值为初值，平滑 [position, stop) 这一段
+            segment = smooth(values[position - 1:stop], decay, weight, np.array([0]), np.array([value]))[0]
+            out[position:stop] = segment[1:]
+            value = segment[-1]
+        if stop < n:
+            out[stop] = value
+        position = stop + 1
+    return out
+
+
+class NumpyBackend:
+    """
+    纯NumPy向量化实现 (不依赖 TA-Lib)
+    说明：输入含 NaN 或 matype 不为 0 时抛出 ValueError (TalibBackend 对 NaN 按 TA-Lib 方式传播)
+    """
+
+    name = 'numpy'
+
+    def MA(self, close, timeperiod=30, matype=0):
+        _check_matype(matype)
+        return _sma(_float(close), timeperiod)
+
+    def MACD(self, close, fastperiod=12, slowperiod=26, signalperiod=9):
+        result = sweep_macd(_float(close), fastperiod, slowperiod, signalperiod, backend=self)
+        return result['macd'][0], result['signal'][0], result['hist'][0]
+
+    def RSI(self, close, timeperiod=14):
+        return sweep_rsi(_float(close), [timeperiod], backend=self)[0]
+
+    def BBANDS(self, close, timeperiod=5, nbdevup=2.0, nbdevdn=2.0, matype=0):
+        _check_matype(matype)
+        close = _float(close)
+        upper, middle, lower = (np.full(len(close), np.nan) for _ in range(3))
+        if 1 <= timeperiod <= len(close):
+            mean, stddev = SweepSeries(close).window_stats(timeperiod)
+            middle[timeperiod - 1:] = mean
+            upper[timeperiod - 1:] = mean + (stddev if nbdevup == 1.0 else stddev * nbdevup)
+            lower[timeperiod - 1:] = mean - (stddev if nbdevdn == 1.0 else stddev * nbdevdn)
+        return upper, middle, lower
+
+    def STOCH(self, high, low, close, fastk_period=5, slowk_period=3, slowk_matype=0, slowd_period=3,
+              slowd_matype=0):
+        _check_matype(slowk_matype)
+        _check_matype(slowd_matype)
+        high, low, close = _float(high), _float(low), _float(close)
+        n = len(close)
+        slowk, slowd = np.full(n, np.nan), np.full(n, np.nan)
+        lookback = (fastk_period - 1) + (slowk_period - 1) + (slowd_period - 1)
+        if n <= lookback:
+            return slowk, slowd
+
+        # 快速K: 收盘价在最近 fastk_period 根K线高低区间中的位置 (区间为0时为0)
+        highest = sliding_window_view(high, fastk_period).max(axis=1)
+        lowest = sliding_window_view(low, fastk_period).min(axis=1)
+        diff = (highest - lowest) / 100.0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fastk = np.where(diff != 0.0, (close[fastk_period - 1:] - lowest) / diff, 0.0)
+
+        # 慢K为快速K的 SMA，慢D为慢K的 SMA；两条线在慢D预热完成后同时输出
+        slowk_values = _sma(fastk, slowk_period)[slowk_period - 1:]
+        slowd_values = _sma(slowk_values, slowd_period)[slowd_period - 1:]
+        slowk[lookback:] = slowk_values[slowd_period - 1:]
+        slowd[lookback:] = slowd_values
+        return slowk, slowd
+
+    def OBV(self, close, volume):
+        close, volume = _float(close), _float(volume)
+        if not len(close):
+            return np.array([], dtype=np.float64)
+        # 首根K线的成交量为初值，之后收盘价上涨加成交量、下跌减成交量
+        steps = np.empty(len(close))
+        steps[0] = volume[0]
+        steps[1:] = np.sign(np.diff(close)) * volume[1:]
+        return np.cumsum(steps)
+
+    def ATR(self, high, low, close, timeperiod=14):
+        high, low, close = _float(high), _float(low), _float(close)
+        true_range = _true_range(high, low, close)
+        if timeperiod <= 1:
+            return true_range
+        if len(close) <= timeperiod:
+            return np.full(len(close), np.nan)
+        # 前 timeperiod 个真实波幅的平均作为初值
+        seed = true_range[1:timeperiod + 1].sum() / timeperiod
+        return _wilder(true_range, timeperiod, timeperiod, seed)
+
+    def ADX(self, high, low, close, timeperiod=14):
+        high, low, close = _float(high), _float(low), _float(close)
+        n, period = len(close), timeperiod
+        if n < 2 * period:
+            return np.full(n, np.nan)
+
+        # +DM/-DM (同一根K线只取其一) 与真实波幅
+        plus_dm, minus_dm = np.zeros(n), np.zeros(n)
+        diff_plus = high[1:] - high[:-1]
+        diff_minus = low[:-1] - low[1:]
+        minus_dm[1:] = np.where((diff_minus > 0) & (diff_plus < diff_minus), diff_minus, 0.0)
+        plus_dm[1:] = np.where((diff_plus > 0) & (diff_plus > diff_minus), diff_plus, 0.0)
+        true_range = _true_range(high, low, close)
+
+        # 前 period-1 根K线累加，之后 Wilder 平滑 (S = S - S/period + 新值)
+        smoothed = [_wilder(values, period, period - 1, values[1:period].sum(), weight=1.0)
+                    for values in (plus_dm, minus_dm, true_range)]
+        plus_sum, minus_sum, tr_sum = (values[period:] for values in smoothed)
+
+        # DX (真实波幅或 DI 之和为0时无法计算)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            minus_di = 100.0 * (minus_sum / tr_sum)
+            plus_di = 100.0 * (plus_sum / tr_sum)
+            total = minus_di + plus_di
+            dx = 100.0 * (np.abs(minus_di - plus_di) / total)
+        dx[(np.abs(tr_sum) < 0.00000001) | (np.abs(total) < 0.00000001)] = np.nan
+        dx_full = np.full(n, np.nan)
+        dx_full[period:] = dx
+
+        # 前 period 个 DX 的平均作为 ADX 初值 (无法计算的 DX 按0计)，之后 Wilder 平滑
+        seed = np.nan_to_num(dx[:period]).sum() / period
+        return _wilder(dx_full, period, 2 * period - 1, seed)
+
+
+_backends = {}
+_fallback_warned = False
+
+
+def get_indicator_backend(name=None):
+    """
+    返回指标计算后端 (同一名称共用一个实例)
+    参数:
+        name: 'auto' / 'talib' / 'numpy'，默认 config.INDICATOR_BACKEND
+    说明：指定 'talib' 但未安装 TA-Lib 时退回纯NumPy实现
+    """
+    global _fallback_warned
+    name = name or INDICATOR_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"不支持的指标计算后端: {name} (可选: {', '.join(BACKENDS)})")
+    if name == 'auto':
+        name = 'talib' if TALIB_AVAILABLE else 'numpy'
+    elif name == 'talib' and not TALIB_AVAILABLE:
+        if not _fallback_warned:
+            print("⚠️ 未安装 TA-Lib，指标计算改用纯NumPy实现")
+            _fallback_warned = True
+        name = 'numpy'
+    if name not in _backends:
+        _backends[name] = TalibBackend() if name == 'talib' else NumpyBackend()
+    return _backends[name]
+
+
+# ===== 交叉校验与基准 =====
+# (函数名, 价格参数, 各组参数)
+CHECK_CASES = [
+    ('MA', 'c', [{'timeperiod': p} for p in (1, 3, 5, 20, 89, 200)]),
+    ('MACD', 'c', [{'fastperiod': 12, 'slowperiod': 26, 'signalperiod': 9},
+                   {'fastperiod': 5, 'slowperiod': 13, 'signalperiod': 5},
+                   {'fastperiod': 26, 'slowperiod': 12, 'signalperiod': 9}]),
+    ('RSI', 'c', [{'timeperiod': p} for p in (2, 7, 14, 30)]),
+    ('BBANDS', 'c', [{'timeperiod': 12, 'nbdevup': 1.8, 'nbdevdn': 1.8},
+                     {'timeperiod': 20, 'nbdevup': 1.0, 'nbdevdn': 1.0},
+                     {'timeperiod': 50, 'nbdevup': 3.0, 'nbdevdn': 2.0}]),
+    ('STOCH', 'hlc', [{'fastk_period': 14, 'slowk_period': 3, 'slowd_period': 3},
+                      {'fastk_period': 7, 'slowk_period': 5, 'slowd_period': 2}]),
+    ('OBV', 'cv', [{}]),
+    ('ATR', 'hlc', [{'timeperiod': p} for p in (1, 8, 14, 21)]),
+    ('ADX', 'hlc', [{'timeperiod': p} for p in (2, 8, 14)]),
+]
+
+
+def _check_series(size, seed=0):
+    """校验用K线：随机游走，中间插入一段价格不变 (区间为0、涨跌为0) 的K线"""
+    from indicator_benchmark import synthetic_frame
+
+    df = synthetic_frame(size).reset_index()
+    if size > 60:
+        flat = slice(size // 3, size // 3 + 30)
+        for col in ('开盘价', '最高价', '最低价', '收盘价'):
+            df.loc[flat, col] = df.loc[flat.start, '收盘价']
+    return {'h': df['最高价'].to_numpy(dtype=np.float64), 'l': df['最低价'].to_numpy(dtype=np.float64),
+            'c': df['收盘价'].to_numpy(dtype=np.float64), 'v': df['成交量'].to_numpy(dtype=np.float64)}
+
+
+def _as_tuple(result):
+    return result if isinstance(result, tuple) else (result,)
+
+
+def cross_check(sizes=(10, 40, 300, 5_000), rtol=1e-9):
+    """
+    纯NumPy后端与 TA-Lib 逐个函数、逐组参数对比 (预热期 NaN 位置必须相同，数值相对误差不超过 rtol)
+    返回:
+        float: 最大相对误差
+    """
+    reference, candidate = TalibBackend(), NumpyBackend()
+    worst = 0.0
+    for size in sizes:
+        data = _check_series(size)
+        for func, inputs, cases in CHECK_CASES:
+            args = [data[key] for key in inputs]
+            for kwargs in cases:
+                expected = _as_tuple(getattr(reference, func)(*args, **kwargs))
+                actual = _as_tuple(getattr(candidate, func)(*args, **kwargs))
+                for want, got in zip(expected, actual):
+                    if not np.array_equal(np.isnan(want), np.isnan(got)):
+                        raise AssertionError(f"{func}{kwargs} ({size}根K线): 预热期不一致")
+                    valid = ~np.isnan(want)
+                    if valid.any():
+                        error = np.abs(got[valid] - want[valid]) / np.maximum(np.abs(want[valid]), 1.0)
+                        if error.max() > rtol:
+                            raise AssertionError(f"{func}{kwargs} ({size}根K线): 相对误差 {error.max():.1e}")
+                        worst = max(worst, float(error.max()))
+    return worst
+
+
+def benchmark(sizes=(300, 10_000, 100_000, 1_000_000), repeat=3):
+    """两个后端在不同序列长度下计算 compute_ta_indicators 用到的全部函数 (各取一组常用参数) 的耗时"""
+    print(f"{'K线数':>10} {'TA-Lib':>10} {'NumPy':>10} {'倍数':>8}")
+    for size in sizes:
+        data = _check_series(size)
+        timings = []
+        for backend in (TalibBackend(), NumpyBackend()):
+            best = float('inf')
+            for _ in range(repeat):
+                begin = time.perf_counter()
+                for func, inputs, cases in CHECK_CASES:
+                    getattr(backend, func)(*[data[key] for key in inputs], **cases[0])
+                best = min(best, time.perf_counter() - begin)
+            timings.append(best)
+        print(f"{size:>10,} {timings[0] * 1000:>8.1f}ms {timings[1] * 1000:>8.1f}ms {timings[1] / timings[0]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    print("纯NumPy后端 vs TA-Lib")
+    if not TALIB_AVAILABLE:
+        print("⚠️ 未安装 TA-Lib，无法交叉校验")
+    else:
+        print(f"✅ {len(CHECK_CASES)} 个函数全部一致 (最大相对误差 {cross_check():.1e})")
+        benchmark()
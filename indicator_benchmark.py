@@ -0,0 +1,305 @@
+"""
+指标计算基准模块
+功能：保存被向量化改写之前的逐行参考实现，校验新实现的结果完全一致并对比耗时
+      (斐波那契水平的逐行实现使用 SwingDetector 实时锚点，同时校验批量/实时波段检测一致)
+用法：python indicator_benchmark.py
+说明：逐行实现每行要做十几次 df.loc 单元格写入，斐波那契水平在1万根K线上实测约25~30秒 (视机器而定)；
+      超过 loop_max_rows 的规模 (默认的10万、100万根) 不实际运行逐行实现，输出中标注 (外推) 的逐行耗时
+      是按已测得的每行耗时线性外推的估计值，对应的加速倍数也是估计值
+"""
+
+import contextlib
+import io
+import time
+import numpy as np
+import pandas as pd
+from swing_detector import SwingDetector, confirm_bars_for
+
+
+# ===== 逐行参考实现 =====
+def fibonacci_levels_reference(df, lookback_period=50):
+    """
+    calculate_fibonacci_levels 的逐行实现 (仅用于校验和基准)
+    说明：锚点由 SwingDetector 逐根K线实时更新，同时校验批量计算与实时计算的结果一致
+    参数:
+        df: 数据框，包含高低价数据
+        lookback_period: 回看周期，用于确定波段高低点
+    返回:
+        df: 添加了斐波那契水平的数据框
+    """
+    # 斐波那契回调水平
+    fib_retracement_levels = [0.0, 0.236, 0.382, 0.5, 0.618, 0.786, 1.0]
+    # 斐波那契扩展水平 (移除1.618, 2.0, 2.618)
+    fib_extension_levels = [1.272, 1.414]
+
+    # 初始化斐波那契列
+    for level in fib_retracement_levels:
+        df[f'Fib_Ret_{level:.3f}'] = np.nan
+
+    for level in fib_extension_levels:
+        df[f'Fib_Ext_{level:.3f}'] = np.nan
+
+    # 添加趋势方向和关键点
+    df['Fib_Trend'] = 'neutral'
+    df['Fib_High'] = np.nan
+    df['Fib_Low'] = np.nan
+
+    detector = SwingDetector(confirm_bars_for(lookback_period))
+    for i in range(len(df)):
+        # 逐根更新已确认的波段高低点
+        window_high, window_low = detector.update(df['最高价'].iloc[i], df['最低价'].iloc[i])
+        current_price = df['收盘价'].iloc[i]
+
+        if pd.notna(window_high) and pd.notna(window_low) and window_high > window_low:
+            # 记录关键点
+            df.loc[df.index[i], 'Fib_High'] = window_high
+            df.loc[df.index[i], 'Fib_Low'] = window_low
+
+            # 判断趋势方向
+            price_range = window_high - window_low
+            price_position = (current_price - window_low) / price_range
+
+            if price_position > 0.6:
+                trend = 'uptrend'
+            elif price_position < 0.4:
+                trend = 'downtrend'
+            else:
+                trend = 'neutral'
+
+            df.loc[df.index[i], 'Fib_Trend'] = trend
+
+            # 计算斐波那契回调水平
+            for level in fib_retracement_levels:
+                if trend == 'uptrend':
+                    # 上升趋势：从低点向高点的回调
+                    fib_price = window_high - (window_high - window_low) * level
+                elif trend == 'downtrend':
+                    # 下降趋势：从高点向低点的回调
+                    fib_price = window_low + (window_high - window_low) * level
+                else:
+                    # 中性趋势：使用中点
+                    fib_price = window_low + (window_high - window_low) * level
+
+                df.loc[df.index[i], f'Fib_Ret_{level:.3f}'] = fib_price
+
+            # 计算斐波那契扩展水平
+            for level in fib_extension_levels:
+                if trend == 'uptrend':
+                    # 上升趋势扩展
+                    fib_price = window_high + (window_high - window_low) * (level - 1)
+                elif trend == 'downtrend':
+                    # 下降趋势扩展
+                    fib_price = window_low - (window_high - window_low) * (level - 1)
+                else:
+                    # 中性趋势扩展
+                    fib_price = window_high + (window_high - window_low) * (level - 1)
+
+                df.loc[df.index[i], f'Fib_Ext_{level:.3f}'] = fib_price
+
+    # 前向填充斐波那契水平（保持最近的有效值）
+    fib_columns = [col for col in df.columns if col.startswith('Fib_')]
+    for col in fib_columns:
+        if col not in ['Fib_Trend', 'Fib_High', 'Fib_Low']:
+            df[col] = df[col].ffill()  # 使用新的方法替代fillna(method='ffill')
+
+    # 填充趋势和关键点
+    df['Fib_Trend'] = df['Fib_Trend'].ffill()
+    df['Fib_High'] = df['Fib_High'].ffill()
+    df['Fib_Low'] = df['Fib_Low'].ffill()
+
+    return df
+
+
+def fibonacci_signals_reference(df):
+    """
+    add_fibonacci_signals 的原逐行实现 (仅用于校验和基准)
+    """
+    # 初始化信号列
+    df['Fib_Signal'] = 'neutral'
+    df['Fib_Support_Level'] = np.nan
+    df['Fib_Resistance_Level'] = np.nan
+    df['Fib_Price_Position'] = np.nan
+
+    # 关键斐波那契水平
+    key_retracement_levels = ['Fib_Ret_0.382', 'Fib_Ret_0.500', 'Fib_Ret_0.618']
+    key_extension_levels = ['Fib_Ext_1.272', 'Fib_Ext_1.414']
+
+    for i in range(len(df)):
+        current_price = df['收盘价'].iloc[i]
+        trend = df['Fib_Trend'].iloc[i]
+
+        if pd.notna(current_price) and trend != 'neutral':
+            # 找到最近的支撑和阻力水平
+            support_levels = []
+            resistance_levels = []
+
+            # 检查回调水平
+            for level_col in key_retracement_levels:
+                if level_col in df.columns:
+                    level_price = df[level_col].iloc[i]
+                    if pd.notna(level_price):
+                        if level_price < current_price:
+                            support_levels.append(level_price)
+                        elif level_price > current_price:
+                            resistance_levels.append(level_price)
+
+            # 检查扩展水平
+            for level_col in key_extension_levels:
+                if level_col in df.columns:
+                    level_price = df[level_col].iloc[i]
+                    if pd.notna(level_price):
+                        if trend == 'uptrend' and level_price > current_price:
+                            resistance_levels.append(level_price)
+                        elif trend == 'downtrend' and level_price < current_price:
+                            support_levels.append(level_price)
+
+            # 确定最近的支撑和阻力
+            if support_levels:
+                nearest_support = max(support_levels)  # 最近的支撑（最高的支撑位）
+                df.loc[df.index[i], 'Fib_Support_Level'] = nearest_support
+
+            if resistance_levels:
+                nearest_resistance = min(resistance_levels)  # 最近的阻力（最低的阻力位）
+                df.loc[df.index[i], 'Fib_Resistance_Level'] = nearest_resistance
+
+            # 计算价格在斐波那契区间的位置
+            fib_high = df['Fib_High'].iloc[i]
+            fib_low = df['Fib_Low'].iloc[i]
+            if pd.notna(fib_high) and pd.notna(fib_low) and fib_high != fib_low:
+                price_position = (current_price - fib_low) / (fib_high - fib_low)
+                df.loc[df.index[i], 'Fib_Price_Position'] = price_position
+
+                # 生成交易信号
+                tolerance = 0.02  # 2%的容差
+
+                # 检查是否接近关键斐波那契水平
+                if abs(price_position - 0.382) < tolerance:
+                    signal = 'fib_382_bounce' if trend == 'uptrend' else 'fib_382_reject'
+                elif abs(price_position - 0.5) < tolerance:
+                    signal = 'fib_50_bounce' if trend == 'uptrend' else 'fib_50_reject'
+                elif abs(price_position - 0.618) < tolerance:
+                    signal = 'fib_618_bounce' if trend == 'uptrend' else 'fib_618_reject'
+                elif price_position > 1.0:
+                    signal = 'fib_breakout_up'
+                elif price_position < 0.0:
+                    signal = 'fib_breakout_down'
+                elif 0.618 < price_position < 0.786:
+                    signal = 'fib_golden_zone'
+                else:
+                    signal = 'neutral'
+
+                # 增强信号检测 - 添加成交量确认
+                if signal != 'neutral' and 'Volume_Ratio' in df.columns:
+                    vol_ratio = df['Volume_Ratio'].iloc[i]
+                    if vol_ratio > 1.2:
+                        signal = signal + "_带量"
+                    elif vol_ratio < 0.8:
+                        signal = signal + "_缩量"
+
+                df.loc[df.index[i], 'Fib_Signal'] = signal
+
+    return df
+
+
+# ===== 基准 =====
+def synthetic_frame(size, interval='1h'):
+    """用模拟服务器的合成K线构建原始数据层 DataFrame"""
+    from config import interval_to_milliseconds
+    from kline_parser import klines_to_columns, columns_to_frame
+    from mock_binance_server import synthetic_klines
+
+    open_times = np.arange(size, dtype=np.int64) * interval_to_milliseconds(interval) + 1_600_000_000_000
+    return columns_to_frame(klines_to_columns(synthetic_klines(interval, open_times)))
+
+
+def _timed(func, df):
+    """在副本上运行 func (屏蔽过程日志)，返回 (耗时, 结果)"""
+    df = df.copy()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(df)
+        return time.perf_counter() - start, result
+
+
+def _benchmark(name, reference, vectorized, prepare=None, sizes=(10_000, 100_000, 1_000_000), loop_max_rows=10_000):
+    """
+    对比逐行参考实现与向量化实现
+    参数:
+        prepare: 生成输入 DataFrame 的函数 (参数为行数)，默认 synthetic_frame
+        loop_max_rows: 逐行实现实际运行的最大行数，更大的规模按每行耗时外推
+    """
+    from signal_labels import decode_signals
+
+    prepare = prepare or synthetic_frame
+    print(f"{name}: 逐行实现 vs 向量化实现")
+    per_row = None
+    for size in sizes:
+        df = prepare(size)
+        new_seconds, new_df = _timed(vectorized, df)
+        if size <= loop_max_rows:
+            # 逐行实现使用信号标签，输入和结果都按标签比较
+            old_seconds, old_df = _timed(reference, decode_signals(df))
+            pd.testing.assert_frame_equal(old_df, decode_signals(new_df))
+            per_row = old_seconds / size
+            old_text, check = f"{old_seconds:8.2f}秒", "结果一致"
+        elif per_row is not None:
+            old_seconds = per_row * size
+            old_text, check = f"约{old_seconds:6.0f}秒", "(外推)"
+        else:
+            print(f"● {size:>9,} 条: 向量化 {new_seconds:7.3f}秒")
+            continue
+        print(f"● {size:>9,} 条: 逐行 {old_text}  向量化 {new_seconds:7.3f}秒  "
+              f"加速 {old_seconds / new_seconds:7.0f}x  {check}")
+
+
+def benchmark_fibonacci_levels(sizes=(10_000, 100_000, 1_000_000), loop_max_rows=10_000):
+    """calculate_fibonacci_levels 基准"""
+    from ta_calculator import calculate_fibonacci_levels
+    _benchmark('斐波那契水平', fibonacci_levels_reference, calculate_fibonacci_levels,
+               sizes=sizes, loop_max_rows=loop_max_rows)
+
+
+def fibonacci_signal_input(size):
+    """add_fibonacci_signals 的输入：原始数据 + 斐波那契水平 + Volume_Ratio"""
+    from ta_calculator import calculate_fibonacci_levels
+
+    df = synthetic_frame(size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = calculate_fibonacci_levels(df)
+    df['Volume_Ratio'] = df['成交量'] / df['成交量'].rolling(window=20).mean()
+    return df
+
+
+def benchmark_fibonacci_signals(sizes=(10_000, 100_000, 1_000_000), loop_max_rows=10_000):
+    """add_fibonacci_signals 基准"""
+    from ta_calculator import add_fibonacci_signals
+    _benchmark('斐波那契信号', fibonacci_signals_reference, add_fibonacci_signals, prepare=fibonacci_signal_input,
+               sizes=sizes, loop_max_rows=loop_max_rows)
+
+
+def benchmark_swing_detector(sizes=(10_000, 100_000, 1_000_000), confirm_bars=25):
+    """波段检测：批量 swing_anchors 与逐根 SwingDetector.update 的耗时，并校验结果一致"""
+    from swing_detector import swing_anchors
+
+    print("波段检测: 逐根实时更新 vs 批量计算")
+    for size in sizes:
+        df = synthetic_frame(size)
+        high, low = df['最高价'].to_numpy(), df['最低价'].to_numpy()
+        start = time.perf_counter()
+        batch_high, batch_low = swing_anchors(high, low, confirm_bars)
+        batch_seconds = time.perf_counter() - start
+
+        detector = SwingDetector(confirm_bars)
+        start = time.perf_counter()
+        streamed = np.array([detector.update(h, l) for h, l in zip(high.tolist(), low.tolist())])
+        stream_seconds = time.perf_counter() - start
+        np.testing.assert_array_equal(streamed[:, 0], batch_high)
+        np.testing.assert_array_equal(streamed[:, 1], batch_low)
+        print(f"● {size:>9,} 条: 批量 {batch_seconds:7.3f}秒  逐根 {stream_seconds:7.3f}秒 "
+              f"({stream_seconds * 1e6 / size:.2f}微秒/根)  结果一致")
+
+
+if __name__ == "__main__":
+    benchmark_swing_detector()
+    benchmark_fibonacci_levels()
+    benchmark_fibonacci_signals()
@@ -0,0 +1,124 @@
+"""
+指标依赖图模块
+功能：把技术指标建模为声明了输入列和输出列的节点，调用方只列出需要的列，
+      只运行这些列所依赖的子图，多个指标共用的中间结果只计算一次
+说明：
+    - 节点按声明顺序执行和写入，完整计算时输出列的顺序与声明顺序一致
+    - 输出列名以 '_' 开头的是内部中间结果 (如波段锚点)，只供其他节点使用，不写入 DataFrame
+    - 既不由任何节点产生、也不在输入数据中的列视为当前参数下不存在的可选列
+      (如未定义长期MACD时的 MACD_Long)：作为输入时跳过，被请求时只提示不报错
+"""
+
+
+class IndicatorNode:
+    """
+    指标节点
+    参数:
+        name: 节点名
+        inputs: 输入列名列表 (原始数据列或其他节点的输出列)
+        outputs: 输出列名列表
+        compute: compute(data) → 输出值；data 为 {列名: 数组} 字典，包含全部已有的输入列。
+                 多个输出时返回与 outputs 同序的元组或 {列名: 数组} 字典 (字典中缺少的列视为不存在)
+    """
+
+    def __init__(self, name, inputs, outputs, compute):
+        self.name = name
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.compute = compute
+
+    def run(self, data):
+        """运行节点，返回 {输出列名: 值}"""
+        result = self.compute(data)
+        if isinstance(result, dict):
+            return result
+        if len(self.outputs) == 1:
+            return {self.outputs[0]: result}
+        return dict(zip(self.outputs, result))
+
+    def __repr__(self):
+        return f"IndicatorNode({self.name}: {', '.join(self.inputs)} → {', '.join(self.outputs)})"
+
+
+class IndicatorGraph:
+    """指标依赖图 (节点按添加顺序保存；同名输出列以后添加的节点为准)"""
+
+    def __init__(self):
+        self.nodes = []
+        self._producers = {}
+
+    def add(self, name, inputs, outputs, compute):
+        """添加节点，返回 IndicatorNode"""
+        node = IndicatorNode(name, inputs, outputs, compute)
+        self.nodes.append(node)
+        for col in node.outputs:
+            self._producers[col] = node
+        return node
+
+    def columns(self, exclude=()):
+        """
+        图中可计算的全部列 (不含内部中间结果)
+        参数:
+            exclude: 不计入的节点名
+        """
+        columns = []
+        for node in self.nodes:
+            if node.name in exclude:
+                continue
+            columns.extend(col for col in node.outputs if not col.startswith('_') and col not in columns)
+        return columns
+
+    def resolve(self, columns):
+        """
+        找出计算这些列所需的节点
+        返回:
+            tuple: (按声明顺序排列的节点列表, 不由任何节点产生的列)
+        """
+        required = set()
+        external = []
+        stack = list(columns)
+        while stack:
+            col = stack.pop()
+            node = self._producers.get(col)
+            if node is None:
+                if col not in external:
+                    external.append(col)
+            elif node not in required:
+                required.add(node)
+                stack.extend(node.inputs)
+        return [node for node in self.nodes if node in required], external
+
+    def compute(self, df, columns=None):
+        """
+        在 df 上计算列并原地写入
+        参数:
+            df: 含原始数据列的 DataFrame
+            columns: 需要的列，None 表示全部列；只写入被请求的列，依赖的中间结果不写入
+        返回:
+            DataFrame: df 本身
+        """
+        requested = self.columns() if columns is None else list(columns)
+        nodes, external = self.resolve(requested)
+
+        missing = [col for col in external
+                   if col in requested and col not in df.columns and col != df.index.name]
+        if missing:
+            print(f"ℹ️ 当前参数下没有这些列，已跳过: {', '.join(missing)}")
+
+        # 原始数据列只取一次数组，所有节点共用
+        data = {col: df[col].values for col in external if col in df.columns}
+        for node in nodes:
+            data.update(node.run(data))
+
+        wanted = set(requested)
+        for node in nodes:
+            for col in node.outputs:
+                if col in wanted and col in data and not col.startswith('_'):
+                    df[col] = data[col]
+        return df
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __repr__(self):
+        return f"IndicatorGraph({len(self.nodes)} 个节点, {len(self.columns())} 列)"
@@ -0,0 +1,152 @@
+"""
+K线响应磁盘缓存模块
+功能：把完全收盘的K线页 (按 page_bars 根对齐的时间窗口) 的原始响应缓存到磁盘，
+      键为 (交易对, K线间隔, 页起始时间)；仍在形成中的最新数据始终直接请求
+说明：
+    - 已收盘K线不会再变化，缓存永不过期，只按总大小做LRU淘汰 (命中时刷新文件修改时间)
+    - 时间窗口按页对齐，不同起止时间的请求也能复用同一批缓存页
+    - 写入使用临时文件 + 替换，多个进程同时读写同一缓存目录是安全的
+"""
+
+import os
+import threading
+import time
+from config import KLINES_MAX_LIMIT, KLINE_CACHE_ENABLED, KLINE_CACHE_MAX_BYTES, get_kline_cache_dir, \
+    interval_to_milliseconds
+
+
+class KlineCache:
+    """
+    按页缓存K线原始响应 (JSON字节)
+    参数:
+        cache_dir: 缓存目录
+        max_bytes: 缓存总大小上限，超过后淘汰最久未使用的页
+        page_bars: 每页K线数量 (不超过单次请求上限1500)
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None, page_bars=None):
+        self.cache_dir = cache_dir or get_kline_cache_dir()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or KLINE_CACHE_MAX_BYTES
+        self.page_bars = min(page_bars or KLINES_MAX_LIMIT, KLINES_MAX_LIMIT)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes = sum(path.stat().st_size for path in self._files())
+
+    # ===== 页与时间换算 =====
+    def page_span(self, interval):
+        """一页覆盖的毫秒数"""
+        return interval_to_milliseconds(interval) * self.page_bars
+
+    def page_start(self, interval, time_ms):
+        """time_ms 所在页的起始时间"""
+        span = self.page_span(interval)
+        return time_ms // span * span
+
+    def is_closed(self, interval, page_start, now_ms=None):
+        """页内所有K线是否都已收盘 (多留一根K线的余量，兼容周线等与页边界不对齐的K线)"""
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        return page_start + self.page_span(interval) + interval_to_milliseconds(interval) <= now_ms
+
+    def path(self, symbol, interval, page_start):
+        return self.cache_dir / f"{symbol}_{interval}_{self.page_bars}_{page_start}.json"
+
+    # ===== 读写 =====
+    def get(self, symbol, interval, page_start):
+        """
+        读取缓存页
+        返回:
+            bytes: 原始响应；未命中时返回 None
+        """
+        path = self.path(symbol, interval, page_start)
+        try:
+            raw = path.read_bytes()
+            os.utime(path)  # 刷新修改时间，作为LRU的最近使用时间
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return raw
+
+    def put(self, symbol, interval, page_start, raw, now_ms=None):
+        """写入缓存页 (未完全收盘的页不会写入)"""
+        if not self.is_closed(interval, page_start, now_ms):
+            return False
+        path = self.path(symbol, interval, page_start)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(raw)
+        old_size = path.stat().st_size if path.exists() else 0
+        tmp_path.replace(path)
+        with self._lock:
+            self._total_bytes += len(raw) - old_size
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+        return True
+
+    def _files(self):
+        return list(self.cache_dir.glob('*.json'))
+
+    def _evict(self):
+        """按最近使用时间从旧到新删除缓存页，直到总大小降到上限以内"""
+        entries = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # 已被其他进程删除
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._total_bytes = total
+
+    # ===== 统计与维护 =====
+    @property
+    def size_bytes(self):
+        return self._total_bytes
+
+    def clear(self):
+        """删除所有缓存页"""
+        for path in self._files():
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._total_bytes = 0
+
+    def __repr__(self):
+        return (f"KlineCache({self.cache_dir}, {self._total_bytes / 1024 / 1024:.1f}MB/"
+                f"{self.max_bytes / 1024 / 1024:.0f}MB, 命中 {self.hits}, 未命中 {self.misses})")
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_kline_cache():
+    """
+    获取当前缓存目录对应的共享缓存实例
+    返回:
+        KlineCache: 缓存未启用 (config.KLINE_CACHE_ENABLED=False) 时返回 None
+    """
+    if not KLINE_CACHE_ENABLED:
+        return None
+    cache_dir = get_kline_cache_dir()
+    with _caches_lock:
+        if cache_dir not in _caches:
+            _caches[cache_dir] = KlineCache(cache_dir)
+        return _caches[cache_dir]
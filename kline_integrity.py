@@ -0,0 +1,146 @@
+"""
+K线完整性检查与修复模块
+功能：在 open_time 列上向量化检查缺失K线 (缺口)、重复 open_time 和乱序行，
+      并只重新请求缺失的时间段拼接回去
+说明：
+    - scan_open_times 对整列做一次 np.diff，O(n)，数百万行也只需毫秒级
+    - scan_append 只检查新追加的行及其与已有数据的衔接处，适合每次追加时调用
+    - 币安历史中存在真实的停机缺口，重新请求后仍然缺失的时间段会保留在报告中，不会报错
+"""
+
+import numpy as np
+from config import SYMBOL, KLINES_MAX_LIMIT, interval_to_milliseconds
+from kline_parser import concat_columns, columns_to_frame
+
+
+class IntegrityReport:
+    """
+    完整性检查结果
+    属性:
+        gaps: [(首根缺失K线open_time, 末根缺失K线open_time), ...] 毫秒
+        duplicates: 重复的 open_time 行数
+        unordered: 与前一行相比时间倒退的行数
+        misaligned: open_time 不在K线边界上的行数 (时间偏移或混入了其他周期的数据)
+    """
+
+    def __init__(self, interval, rows, gaps=None, duplicates=0, unordered=0, misaligned=0):
+        self.interval = interval
+        self.rows = rows
+        self.gaps = gaps or []
+        self.duplicates = duplicates
+        self.unordered = unordered
+        self.misaligned = misaligned
+
+    @property
+    def missing_bars(self):
+        step = interval_to_milliseconds(self.interval)
+        return sum((end - start) // step + 1 for start, end in self.gaps)
+
+    @property
+    def ok(self):
+        return not (self.gaps or self.duplicates or self.unordered or self.misaligned)
+
+    def __str__(self):
+        if self.ok:
+            return f"✅ {self.interval} 数据完整 ({self.rows} 条)"
+        return (f"⚠️ {self.interval} 数据异常 ({self.rows} 条): 缺口 {len(self.gaps)} 处/缺失 {self.missing_bars} 根, "
+                f"重复 {self.duplicates} 行, 乱序 {self.unordered} 行, 未对齐 {self.misaligned} 行")
+
+
+def scan_open_times(open_times, interval, previous_open_time=None):
+    """
+    检查 open_time 序列 (毫秒) 的完整性
+    参数:
+        previous_open_time: 序列之前最后一根K线的 open_time，用于检查衔接处 (追加场景)
+    返回:
+        IntegrityReport
+    """
+    step = interval_to_milliseconds(interval)
+    open_times = np.asarray(open_times, dtype=np.int64)
+    rows = len(open_times)
+    if previous_open_time is not None:
+        open_times = np.r_[np.int64(previous_open_time), open_times]
+
+    diffs = np.diff(open_times)
+    duplicates = int(np.count_nonzero(diffs == 0))
+    unordered = int(np.count_nonzero(diffs < 0))
+    # 周线等周期不从纪元零点对齐，以第一根K线为基准判断是否在K线边界上
+    misaligned = int(np.count_nonzero((open_times - open_times[0]) % step)) if len(open_times) else 0
+
+    gaps = []
+    if unordered == 0:
+        gap_positions = np.flatnonzero(diffs > step)
+        gaps = [(int(open_times[i]) + step, int(open_times[i + 1]) - step) for i in gap_positions]
+    else:
+        # 乱序时按排序后的唯一时间判断缺口
+        unique_times = np.unique(open_times)
+        unique_diffs = np.diff(unique_times)
+        gap_positions = np.flatnonzero(unique_diffs > step)
+        gaps = [(int(unique_times[i]) + step, int(unique_times[i + 1]) - step) for i in gap_positions]
+
+    return IntegrityReport(interval, rows, gaps, duplicates, unordered, misaligned)
+
+
+def scan_frame(df, interval):
+    """检查原始数据层 DataFrame 的完整性"""
+    open_times = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    return scan_open_times(open_times, interval)
+
+
+def scan_append(last_open_time, new_open_times, interval):
+    """只检查新追加的K线 (以及与已有最后一根K线的衔接)，开销与追加行数成正比"""
+    return scan_open_times(new_open_times, interval, previous_open_time=last_open_time)
+
+
+def fetch_gap_columns(gaps, interval, symbol=None, client=None):
+    """
+    重新请求缺口内的K线
+    返回:
+        list: 每段缺口对应的 kline_parser 列字典 (币安也没有数据的缺口返回空列)
+    """
+    from binance_client import get_binance_client, fetch_klines_range, split_time_windows
+
+    client = client or get_binance_client()
+    symbol = symbol or SYMBOL
+    parts = []
+    for gap_start, gap_end in gaps:
+        for window_start, window_end in split_time_windows(gap_start, gap_end, interval, KLINES_MAX_LIMIT):
+            parts.append(fetch_klines_range(client, symbol, interval, window_start, window_end))
+    return parts
+
+
+def repair_columns(columns, interval, symbol=None, client=None, report=None):
+    """
+    修复列字典：排序、去重 (保留后出现的行)，并补齐缺口
+    返回:
+        tuple: (修复后的列字典, 修复后的 IntegrityReport)
+    """
+    report = report or scan_open_times(columns['open_time'], interval)
+    if report.ok:
+        return columns, report
+
+    parts = [columns]
+    if report.gaps:
+        print(f"🩹 重新请求 {len(report.gaps)} 处缺口 (共 {report.missing_bars} 根K线)...")
+        parts += fetch_gap_columns(report.gaps, interval, symbol, client)
+    fields = list(columns)
+    repaired = concat_columns([{field: part[field] for field in fields} for part in parts])
+    return repaired, scan_open_times(repaired['open_time'], interval)
+
+
+def repair_frame(df, interval, symbol=None, client=None):
+    """
+    检查并修复原始数据层 DataFrame
+    返回:
+        tuple: (修复后的 DataFrame, 修复后的 IntegrityReport)
+    """
+    from kline_resampler import frame_to_columns
+
+    report = scan_frame(df, interval)
+    if report.ok:
+        return df, report
+    print(report)
+    columns, report = repair_columns(frame_to_columns(df), interval, symbol, client, report)
+    if not report.ok:
+        print(f"{report} (币安端同样缺失的K线无法补齐)")
+    return columns_to_frame(columns), report
@@ -0,0 +1,283 @@
+"""
+K线内存映射存储模块
+功能：把已收盘K线保存为定长二进制记录 (open_time + 原始数据层的9个数值字段)，
+      通过 numpy.memmap 按时间随机访问，无需加载整个文件
+说明：
+    - 文件是稠密的：第 i 条记录固定对应 t0 + i*step，按时间定位只需 (t - t0) // step，O(1)
+    - 币安停机等造成的缺口写入占位记录 (open_time 正常，数值字段为 NaN)，保持稠密布局
+    - 范围读取返回 memmap 上的切片视图，不复制数据；字段视图可直接传给 TA-Lib/NumPy
+    - 追加时先写入记录、再更新文件头中的记录数，读取方只看文件头的记录数，
+      因此不会读到写了一半的记录；中断留下的多余字节在下次追加时截断
+文件格式 ({symbol}_{interval}.klines):
+    文件头 64 字节: magic, 版本, 记录长度, step(毫秒), t0(毫秒), 已提交记录数
+    记录 80 字节: open_time(int64) + 开高低收/成交量/成交额/成交笔数/主动买入量/主动买入额 (float64)
+"""
+
+import os
+import threading
+import time
+import numpy as np
+from config import SYMBOL, INTERVAL, get_kline_store_dir, interval_to_milliseconds
+from kline_parser import FRAME_COLUMNS, columns_to_frame
+
+try:
+    import fcntl  # 多进程追加时加文件锁 (Windows 上只做进程内加锁)
+except ImportError:
+    fcntl = None
+
+MAGIC = b'KLNMMAP\x00'
+VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<i8'),
+    ('record_size', '<i8'),
+    ('step', '<i8'),
+    ('t0', '<i8'),
+    ('count', '<i8'),
+    ('reserved', '<i8', (2,)),
+])
+HEADER_SIZE = HEADER_DTYPE.itemsize  # 64
+
+RECORD_DTYPE = np.dtype([('open_time', '<i8')] + [(field, '<f8') for field in FRAME_COLUMNS])
+RECORD_SIZE = RECORD_DTYPE.itemsize  # 80
+
+# 文件头中 count 字段的偏移，提交追加时只改写这8个字节
+_COUNT_OFFSET = HEADER_DTYPE.fields['count'][1]
+
+
+class KlineMmap:
+    """
+    单个 (symbol, interval) 的定长记录K线文件
+    参数:
+        path: 文件路径 (默认 {存储目录}/{symbol}_{interval}.klines)
+    """
+
+    def __init__(self, symbol=None, interval=None, path=None, store_dir=None):
+        self.symbol = symbol or SYMBOL
+        self.interval = interval or INTERVAL
+        self.step = interval_to_milliseconds(self.interval)
+        if path is None:
+            store_dir = store_dir or get_kline_store_dir()
+            store_dir.mkdir(parents=True, exist_ok=True)
+            path = store_dir / f"{self.symbol}_{self.interval}.klines"
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = None   # 当前映射 (只读)
+        self.t0 = None
+        self._count = 0
+        self.refresh()
+
+    # ===== 映射管理 =====
+    def _read_header(self):
+        with open(self.path, 'rb') as f:
+            raw = f.read(HEADER_SIZE)
+        if len(raw) < HEADER_SIZE:
+            raise ValueError(f"K线文件头不完整: {self.path}")
+        header = np.frombuffer(raw, dtype=HEADER_DTYPE)[0]
+        if header['magic'] != MAGIC.rstrip(b'\x00') or header['record_size'] != RECORD_SIZE:
+            raise ValueError(f"不是K线内存映射文件或版本不兼容: {self.path}")
+        if header['step'] != self.step:
+            raise ValueError(f"K线间隔不一致: 文件为 {header['step']}ms, 期望 {self.step}ms ({self.interval})")
+        return header
+
+    def refresh(self):
+        """重新读取文件头；有其他进程追加了新记录时扩大映射"""
+        if not os.path.exists(self.path):
+            self.t0, self._count, self._records = None, 0, None
+            return self
+        header = self._read_header()
+        count = int(header['count'])
+        if self._records is None or count != self._count:
+            self.t0 = int(header['t0'])
+            self._count = count
+            self._records = (np.memmap(self.path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+                             if count else np.empty(0, dtype=RECORD_DTYPE))
+        return self
+
+    @property
+    def records(self):
+        """全部已提交记录 (只读 memmap 结构化数组)"""
+        return self._records if self._records is not None else np.empty(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def end_time(self):
+        """下一条待追加记录的 open_time (毫秒)，空文件时为 None"""
+        return None if self.t0 is None else self.t0 + self._count * self.step
+
+    # ===== 按时间访问 =====
+    def index_of(self, time_ms):
+        """open_time 对应的记录下标 (O(1))；超出范围或不在K线边界上时返回 -1"""
+        if self.t0 is None:
+            return -1
+        offset = time_ms - self.t0
+        if offset < 0 or offset % self.step:
+            return -1
+        index = offset // self.step
+        return index if index < self._count else -1
+
+    def get(self, time_ms):
+        """
+        读取单根K线
+        返回:
+            np.void: 结构化记录 (缺口占位记录的数值字段为 NaN)；不存在时返回 None
+        """
+        index = self.index_of(time_ms)
+        return None if index < 0 else self._records[index]
+
+    def range(self, start_ms=None, end_ms=None):
+        """
+        读取 open_time 落在 [start_ms, end_ms] 内的记录
+        返回:
+            np.memmap: 结构化数组视图 (零拷贝)
+        """
+        if self._count == 0:
+            return self.records
+        lo = 0 if start_ms is None else min(max(-(-(start_ms - self.t0) // self.step), 0), self._count)
+        hi = self._count if end_ms is None else min(max((end_ms - self.t0) // self.step + 1, 0), self._count)
+        return self._records[lo:max(lo, hi)]
+
+    def columns(self, start_ms=None, end_ms=None):
+        """
+        范围读取的列字典 (字段名同 kline_parser)，每列都是 memmap 上的视图，不复制数据
+        说明：记录按行存放，单列视图的步长为记录长度；TA-Lib 等需要连续数组时只会复制用到的列
+        """
+        records = self.range(start_ms, end_ms)
+        return {field: records[field] for field in RECORD_DTYPE.names}
+
+    def frame(self, start_ms=None, end_ms=None, drop_missing=True):
+        """
+        范围读取的原始数据层 DataFrame (会复制数据)
+        参数:
+            drop_missing: 是否去掉缺口占位记录
+        """
+        columns = self.columns(start_ms, end_ms)
+        if drop_missing:
+            present = ~np.isnan(columns['close'])
+            columns = {field: values[present] for field, values in columns.items()}
+        return columns_to_frame(columns)
+
+    # ===== 追加 =====
+    def append(self, columns):
+        """
+        追加已收盘K线 (kline_parser 列字典，需按 open_time 升序)
+        说明：open_time 早于 end_time 的行已在文件中，直接跳过；中间缺失的K线写入 NaN 占位记录
+        返回:
+            int: 新增的记录数 (含占位记录)
+        """
+        open_times = np.asarray(columns['open_time'], dtype=np.int64)
+        if len(open_times) == 0:
+            return 0
+
+        with self._lock, open(self.path, 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    self._write_header(f, t0=int(open_times[0]))
+                self.refresh()
+
+                keep = open_times >= self.end_time
+                if not keep.any():
+                    return 0
+                new_times = open_times[keep]
+                if np.any((new_times - self.t0) % self.step):
+                    raise ValueError(f"open_time 不在 {self.interval} K线边界上 (t0={self.t0})")
+
+                # 按 (t - t0) / step 放到稠密数组中，缺失的位置保持 NaN
+                slots = (new_times - self.end_time) // self.step
+                block = np.empty(int(slots[-1]) + 1, dtype=RECORD_DTYPE)
+                block['open_time'] = self.end_time + np.arange(len(block), dtype=np.int64) * self.step
+                for field in FRAME_COLUMNS:
+                    block[field] = np.nan
+                    block[field][slots] = np.asarray(columns[field], dtype=np.float64)[keep]
+
+                # 先写记录，再提交记录数；截断上次中断留下的未提交字节
+                data_end = HEADER_SIZE + self._count * RECORD_SIZE
+                f.truncate(data_end)
+                f.seek(data_end)
+                f.write(block.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+                self._commit_count(f, self._count + len(block))
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+        self.refresh()
+        return len(block)
+
+    def append_frame(self, df):
+        """追加原始数据层 DataFrame 中的K线"""
+        from kline_resampler import frame_to_columns
+        return self.append(frame_to_columns(df.sort_index()))
+
+    def _write_header(self, f, t0):
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header['magic'] = MAGIC
+        header['version'] = VERSION
+        header['record_size'] = RECORD_SIZE
+        header['step'] = self.step
+        header['t0'] = t0
+        f.write(header.tobytes())
+        f.flush()
+
+    def _commit_count(self, f, count):
+        # 'a+b' 模式下 write 总是追加到末尾，改写文件头需要另开句柄
+        with open(self.path, 'r+b') as header_file:
+            header_file.seek(_COUNT_OFFSET)
+            header_file.write(np.int64(count).tobytes())
+            header_file.flush()
+            os.fsync(header_file.fileno())
+
+    def __repr__(self):
+        span = ''
+        if self._count:
+            span = f", {np.datetime64(self.t0, 'ms')} ~ {np.datetime64(self.end_time - self.step, 'ms')}"
+        return f"KlineMmap({self.symbol} {self.interval}, {self._count} 条{span})"
+
+
+def _benchmark(size=2_000_000, lookups=100_000):
+    """追加/随机查找/范围读取耗时"""
+    import tempfile
+    from pathlib import Path
+    from mock_binance_server import synthetic_klines
+    from kline_parser import klines_to_columns
+
+    step = 60_000
+    open_times = np.arange(size, dtype=np.int64) * step + 1_600_000_000_000
+    columns = klines_to_columns(synthetic_klines('1m', open_times))
+    path = Path(tempfile.mkdtemp()) / 'BENCH_1m.klines'
+    store = KlineMmap('BENCH', '1m', path=path)
+
+    start = time.perf_counter()
+    for chunk in range(0, size, 100_000):
+        store.append({field: values[chunk:chunk + 100_000] for field, values in columns.items()})
+    append_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    targets = open_times[rng.integers(0, size, lookups)]
+    start = time.perf_counter()
+    for target in targets:
+        store.get(int(target))
+    lookup_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    view = store.columns(int(open_times[size // 2]), int(open_times[size // 2 + 10_000]))
+    range_seconds = time.perf_counter() - start
+    assert np.shares_memory(view['close'], store.records)
+    assert np.array_equal(view['close'], columns['close'][size // 2:size // 2 + 10_001])
+
+    print(f"● 追加 {size:,} 条: {append_seconds:.3f}秒 ({path.stat().st_size / 1e6:.0f}MB)")
+    print(f"● 随机查找 {lookups:,} 次: {lookup_seconds * 1e6 / lookups:.2f}微秒/次")
+    print(f"● 范围读取 10,001 条: {range_seconds * 1e6:.1f}微秒 (零拷贝视图)")
+    path.unlink()
+
+
+if __name__ == "__main__":
+    print("K线内存映射存储基准")
+    _benchmark()
@@ -0,0 +1,182 @@
+"""
+K线快速解析模块
+功能：把 /fapi/v1/klines 返回的原始JSON字节直接解码为带类型的NumPy列
+      (int64 毫秒时间、float64 价格/成交量、int32 成交笔数)，最后才构建 DataFrame
+说明：K线JSON是固定12列的二维数组，把每行开头的 "[" 换成换行、去掉 "]"、引号和空白后就是一张CSV表，
+      由 pyarrow 的CSV读取器在字节层面一次解析为带类型的列，避免 json.loads 生成大量Python字符串和列表；
+      未安装 pyarrow 时改用 np.loadtxt (同样不为每个数值创建Python对象，但较慢)
+"""
+
+import time
+from io import BytesIO
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+# client.klines 单行的字段顺序
+KLINE_FIELDS = ['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time',
+                'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore']
+
+# 原始数据层的中文列名 (与 process_klines_data 一致)
+FRAME_COLUMNS = {
+    'open': '开盘价',
+    'high': '最高价',
+    'low': '最低价',
+    'close': '收盘价',
+    'volume': '成交量',
+    'quote_volume': '成交额',
+    'trades': '成交笔数',
+    'taker_buy_base': '主动买入量',
+    'taker_buy_quote': '主动买入额',
+}
+
+_FIELD_DTYPES = {'open_time': np.int64, 'close_time': np.int64, 'trades': np.int32}
+# "[[a,b],[c,d]]" → "\n\na,b,\nc,d"：行首的 "[" 变为换行 (空行会被跳过)，其余括号、引号和空白直接删除
+_ROW_TABLE = bytes.maketrans(b'[', b'\n')
+_STRIP_BYTES = b']" \n\r\t'
+
+
+def empty_columns():
+    """空的列字典 (字段与 parse_klines 返回值一致)"""
+    return {field: np.empty(0, dtype=_FIELD_DTYPES.get(field, np.float64))
+            for field in KLINE_FIELDS if field != 'ignore'}
+
+
+def parse_klines(raw):
+    """
+    把K线接口的原始JSON字节解析为列字典
+    参数:
+        raw: bytes/str，如 b'[[1753200000000,"118899.8",...,"0"],...]'
+    返回:
+        dict: {字段名: NumPy数组}，不包含 ignore 字段
+    """
+    if isinstance(raw, str):
+        raw = raw.encode('utf-8')
+    text = raw.translate(_ROW_TABLE, _STRIP_BYTES)
+    if not text.strip(b'\n'):
+        return empty_columns()
+    # 除最后一行外每行都以 "," 结尾：末尾补一个 "," 后每行都是12个字段 + 1个空字段
+    text += b','
+    try:
+        return _read_columns_arrow(text) if pa is not None else _read_columns_numpy(text)
+    except (ValueError, pa.ArrowInvalid if pa is not None else ValueError) as e:
+        raise ValueError(f"K线数据格式错误: {e}") from None
+
+
+def _read_columns_arrow(text):
+    fields = [field for field in KLINE_FIELDS if field != 'ignore']
+    types = {field: pa.from_numpy_dtype(_FIELD_DTYPES.get(field, np.float64)) for field in fields}
+    table = pa_csv.read_csv(
+        pa.py_buffer(text),
+        read_options=pa_csv.ReadOptions(column_names=KLINE_FIELDS + ['_end']),
+        parse_options=pa_csv.ParseOptions(quote_char=False),
+        convert_options=pa_csv.ConvertOptions(column_types=types, include_columns=fields, null_values=[]),
+    )
+    return {field: table.column(field).to_numpy() for field in fields}
+
+
+def _read_columns_numpy(text):
+    table = np.loadtxt(BytesIO(text), delimiter=',', usecols=range(len(KLINE_FIELDS)), dtype=np.float64, ndmin=2)
+    if text.count(b',') != table.size:
+        raise ValueError(f"每行应为 {len(KLINE_FIELDS)} 个数值")
+    # 毫秒时间戳 (< 2^53) 和成交笔数在 float64 中是精确的，可以无损转换为整数
+    return {field: table[:, i].astype(_FIELD_DTYPES.get(field, np.float64))
+            for i, field in enumerate(KLINE_FIELDS) if field != 'ignore'}
+
+
+def klines_to_columns(klines):
+    """把已解码的K线列表 (client.klines 返回值) 转换为列字典"""
+    if not klines:
+        return empty_columns()
+    table = np.array(klines, dtype=np.float64)
+    return {field: table[:, i].astype(_FIELD_DTYPES.get(field, np.float64))
+            for i, field in enumerate(KLINE_FIELDS) if field != 'ignore'}
+
+
+def slice_columns(columns, start_ms=None, end_ms=None):
+    """截取 open_time 落在 [start_ms, end_ms] 内的行 (columns 需按 open_time 升序)"""
+    open_times = columns['open_time']
+    lo = np.searchsorted(open_times, start_ms, side='left') if start_ms is not None else 0
+    hi = np.searchsorted(open_times, end_ms, side='right') if end_ms is not None else len(open_times)
+    return {field: values[lo:hi] for field, values in columns.items()}
+
+
+def columns_to_klines(columns):
+    """列字典 → client.klines 格式的K线列表 (供仍使用列表接口的调用方)"""
+    fields = [field for field in KLINE_FIELDS if field != 'ignore']
+    rows = zip(*(columns[field].tolist() for field in fields))
+    return [[*row, '0'] for row in rows]
+
+
+def concat_columns(parts):
+    """
+    合并多段列字典 (如分页回补的多个时间窗口)，按 open_time 升序排列并去重 (重复时保留后出现的一段)
+    """
+    parts = [part for part in parts if len(part['open_time'])]
+    if not parts:
+        return empty_columns()
+    columns = {field: np.concatenate([part[field] for part in parts]) for field in parts[0]}
+    open_times = columns['open_time']
+    if len(open_times) > 1 and np.all(open_times[1:] > open_times[:-1]):
+        return columns  # 已经有序且无重复，无需再复制
+    # 倒序后 np.unique 取到的是每个 open_time 最后出现的位置
+    reversed_times = open_times[::-1]
+    _, first_in_reversed = np.unique(reversed_times, return_index=True)
+    keep = len(open_times) - 1 - first_in_reversed
+    return {field: values[keep] for field, values in columns.items()}
+
+
+def columns_to_frame(columns):
+    """
+    用列字典构建原始数据层 DataFrame (格式与 process_klines_data 完全一致)
+    说明：成交笔数在原始数据层一直是浮点列，这里保持一致以免改变已保存CSV的格式
+    """
+    open_times = columns['open_time']
+    if len(open_times) > 1 and not np.all(open_times[1:] >= open_times[:-1]):
+        order = np.argsort(open_times, kind='stable')
+        columns = {field: values[order] for field, values in columns.items()}
+        open_times = columns['open_time']
+    index = pd.DatetimeIndex(pd.to_datetime(open_times, unit='ms'), name='open_time')
+    data = {name: columns[field].astype(np.float64, copy=False) for field, name in FRAME_COLUMNS.items()}
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def parse_klines_frame(raw):
+    """原始JSON字节 → 原始数据层 DataFrame"""
+    return columns_to_frame(parse_klines(raw))
+
+
+def _benchmark(sizes=(1_000, 100_000, 1_000_000), repeat=3):
+    """对比 json.loads + process_klines_data 与 parse_klines_frame 的耗时，并校验结果一致"""
+    import json
+    from binance_client import process_klines_data
+    from mock_binance_server import synthetic_klines
+
+    step = 60_000
+    for size in sizes:
+        open_times = np.arange(size, dtype=np.int64) * step + 1_600_000_000_000
+        raw = json.dumps(synthetic_klines('1m', open_times), separators=(',', ':')).encode('utf-8')
+
+        def best_of(func):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = func()
+                best = min(best, time.perf_counter() - start)
+            return best, result
+
+        old_seconds, old_df = best_of(lambda: process_klines_data(json.loads(raw)))
+        new_seconds, new_df = best_of(lambda: parse_klines_frame(raw))
+        pd.testing.assert_frame_equal(old_df, new_df, check_freq=False)
+        print(f"● {size:>9,} 条 ({len(raw) / 1e6:7.1f}MB): 原实现 {old_seconds:8.3f}秒  "
+              f"新解析器 {new_seconds:8.3f}秒  加速 {old_seconds / new_seconds:5.1f}x  结果一致")
+
+
+if __name__ == "__main__":
+    print("K线解析基准 (json.loads + process_klines_data vs parse_klines_frame)")
+    _benchmark()
@@ -0,0 +1,141 @@
+"""
+K线周期重采样模块
+功能：由一条基础周期K线 (如15m) 在本地合成任意更高周期 (1h/4h/1d/1w)，
+      一次抓取即可供所有时间周期使用，且各周期的K线边界完全一致
+说明：
+    - 按 int64 毫秒 open_time 向量化分桶，用 np.*.reduceat 一次聚合所有桶
+    - 开盘价取桶内第一根、收盘价取最后一根，最高/最低取极值，
+      成交量/成交额/成交笔数/主动买入量/主动买入额求和
+    - 周线与币安一致从周一 00:00 (UTC) 开始，其余周期从 UTC 零点对齐
+    - KlineResampler 保存最后一个未完成的桶，新的基础K线到达时只重算该桶
+"""
+
+import time
+import numpy as np
+from config import interval_to_milliseconds
+from kline_parser import FRAME_COLUMNS, concat_columns, columns_to_frame
+
+# 1970-01-01 是周四，币安周线从周一开始，需要偏移4天
+_INTERVAL_OFFSETS = {'1w': 4 * 24 * 60 * 60_000}
+
+_SUM_FIELDS = ['volume', 'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote']
+_BASE_FIELDS = ['open_time', *FRAME_COLUMNS]
+
+
+def frame_to_columns(df):
+    """原始数据层 DataFrame (process_klines_data 格式) → kline_parser 列字典"""
+    columns = {'open_time': df.index.values.astype('datetime64[ms]').astype(np.int64)}
+    for field, name in FRAME_COLUMNS.items():
+        columns[field] = df[name].to_numpy(dtype=np.float64)
+    return columns
+
+
+def bucket_start(open_times, interval):
+    """各 open_time 所属的目标周期K线开盘时间 (毫秒)"""
+    step = interval_to_milliseconds(interval)
+    offset = _INTERVAL_OFFSETS.get(interval, 0)
+    return (open_times - offset) // step * step + offset
+
+
+def resample_columns(columns, base_interval, target_interval):
+    """
+    把按 open_time 升序、无重复的基础周期列字典聚合为目标周期
+    返回:
+        tuple: (目标周期列字典, 每根K线包含的基础K线数量, 每根K线是否完整)
+        完整 = 包含了全部应有的基础K线；最后一根通常是仍在形成中的不完整K线
+    """
+    base_step = interval_to_milliseconds(base_interval)
+    target_step = interval_to_milliseconds(target_interval)
+    if target_step % base_step or target_step < base_step:
+        raise ValueError(f"无法由 {base_interval} 合成 {target_interval}: 目标周期必须是基础周期的整数倍")
+
+    open_times = np.asarray(columns['open_time'], dtype=np.int64)
+    if len(open_times) == 0:
+        empty = {field: values[:0] for field, values in columns.items()}
+        return empty, np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+
+    buckets = bucket_start(open_times, target_interval)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)]
+
+    result = {
+        'open_time': buckets[starts],
+        'open': columns['open'][starts],
+        'high': np.maximum.reduceat(columns['high'], starts),
+        'low': np.minimum.reduceat(columns['low'], starts),
+        'close': columns['close'][ends - 1],
+    }
+    for field in _SUM_FIELDS:
+        result[field] = np.add.reduceat(columns[field], starts)
+    result['close_time'] = result['open_time'] + target_step - 1
+
+    counts = ends - starts
+    complete = counts == target_step // base_step
+    return result, counts, complete
+
+
+def resample_frame(df, base_interval, target_interval, include_incomplete=True):
+    """
+    DataFrame 版本的 resample_columns
+    参数:
+        df: 原始数据层 DataFrame (基础周期)
+        include_incomplete: 是否保留不完整的K线 (如仍在形成中的最后一根)
+    返回:
+        DataFrame: 与 process_klines_data 格式一致的目标周期K线
+    """
+    result, _, complete = resample_columns(frame_to_columns(df), base_interval, target_interval)
+    if not include_incomplete:
+        result = {field: values[complete] for field, values in result.items()}
+    return columns_to_frame(result)
+
+
+class KlineResampler:
+    """
+    增量重采样器：持续接收基础周期K线，输出目标周期K线
+    - 已完成的目标K线只输出一次
+    - 最后一根未完成的目标K线随新数据更新，可通过 current 读取
+    """
+
+    def __init__(self, base_interval, target_interval):
+        self.base_interval = base_interval
+        self.target_interval = target_interval
+        self._pending = None        # 属于最后一个未完成桶的基础K线 (列字典)
+        self._last_emitted = None   # 最后一根已输出的目标K线开盘时间
+        self.current = None         # 最后一根未完成的目标K线 (列字典，长度为1)
+
+    def update(self, base_columns, now_ms=None):
+        """
+        追加新的基础K线 (列字典，可与已接收的数据重叠，重叠部分以新数据为准；可包含未收盘的基础K线)
+        参数:
+            now_ms: 当前时间 (毫秒)，用于判断最后一根目标K线是否已收盘
+        返回:
+            dict: 本次新完成的目标周期K线 (列字典)
+        """
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        base_columns = {field: base_columns[field] for field in _BASE_FIELDS}
+        merged = concat_columns([self._pending, base_columns] if self._pending is not None else [base_columns])
+        if self._last_emitted is not None:
+            # 已输出过的目标K线不再重复输出
+            keep = bucket_start(merged['open_time'], self.target_interval) > self._last_emitted
+            merged = {field: values[keep] for field, values in merged.items()}
+
+        result, _, complete = resample_columns(merged, self.base_interval, self.target_interval)
+        if len(result['open_time']) == 0:
+            return result
+
+        if complete[-1] and result['close_time'][-1] < now_ms:
+            finished, self._pending, self.current = result, None, None
+        else:
+            # 最后一个桶未完成：保留它的基础K线，其余桶视为已完成 (中间有缺口的桶也会输出)
+            in_last = bucket_start(merged['open_time'], self.target_interval) == result['open_time'][-1]
+            self._pending = {field: values[in_last] for field, values in merged.items()}
+            self.current = {field: values[-1:] for field, values in result.items()}
+            finished = {field: values[:-1] for field, values in result.items()}
+
+        if len(finished['open_time']):
+            self._last_emitted = int(finished['open_time'][-1])
+        return finished
+
+    def update_frame(self, base_df, now_ms=None):
+        """DataFrame 版本的 update，返回新完成的目标K线 DataFrame"""
+        return columns_to_frame(self.update(frame_to_columns(base_df), now_ms))
@@ -0,0 +1,294 @@
+"""
+K线增量存储模块
+功能：按 (交易对, K线间隔) 持久化已收盘K线，只向币安请求磁盘上最后一根已收盘K线之后的数据
+说明：已收盘K线追加写入 kline_mmap 的定长二进制文件 (读取尾部无需解析文本/日期)；
+      仍在形成中的最后一根K线保存在状态文件中，每次更新时整体替换；CSV 只作为导出格式 (export_csv)
+"""
+
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from config import SYMBOL, INTERVAL, KLINES_MAX_LIMIT, get_kline_store_dir, interval_to_milliseconds
+from kline_mmap import KlineMmap, RECORD_DTYPE
+from kline_parser import columns_to_frame, klines_to_columns
+
+
+class KlineStore:
+    """
+    单个 (symbol, interval) 的K线存储
+    文件:
+        {symbol}_{interval}.klines     已收盘K线 (KlineMmap 定长记录，只追加，交易所缺口为 NaN 占位)
+        {symbol}_{interval}_state.json 最后已收盘K线时间 + 未收盘K线 + 已确认的交易所缺口
+    说明：旧版本的 {symbol}_{interval}.csv 在首次打开时一次性迁移到 .klines 文件，原CSV保留不动
+    """
+
+    def __init__(self, symbol=None, interval=None, store_dir=None):
+        self.symbol = symbol or SYMBOL
+        self.interval = interval or INTERVAL
+        self.step_ms = interval_to_milliseconds(self.interval)
+        self.store_dir = store_dir or get_kline_store_dir()
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.store_dir / f"{self.symbol}_{self.interval}_state.json"
+        self.data = KlineMmap(self.symbol, self.interval, store_dir=self.store_dir)
+        self.data_path = self.data.path
+        self._migrate_csv()
+        self.state = self._load_state()
+
+    # ===== 状态管理 =====
+    def _load_state(self):
+        if self.state_path.exists() and self.data_path.exists():
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'last_closed_open_time': None, 'closed_count': 0, 'open_kline': None}
+
+    def _migrate_csv(self):
+        """旧版本把已收盘K线存为CSV：.klines 文件还不存在时读取一次并写入，之后不再解析CSV"""
+        legacy_path = self.store_dir / f"{self.symbol}_{self.interval}.csv"
+        if self.data_path.exists() or not legacy_path.exists() or not self.state_path.exists():
+            return
+        df = pd.read_csv(legacy_path, encoding='utf-8')
+        df['open_time'] = pd.to_datetime(df['open_time'])
+        df = df.drop_duplicates('open_time', keep='last').set_index('open_time').astype(float)
+        self.data.append_frame(df)
+        print(f"🗂️ {self.symbol} {self.interval} 已把 {len(df)} 条K线从 {legacy_path.name} 迁移到 {self.data_path.name}")
+
+    def _save_state(self):
+        # 先写临时文件再替换，避免中途中断留下损坏的状态文件
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        tmp_path.replace(self.state_path)
+
+    @property
+    def last_closed_open_time(self):
+        """磁盘上最后一根已收盘K线的 open_time (毫秒)，无数据时为 None"""
+        return self.state['last_closed_open_time']
+
+    def __len__(self):
+        return self.state['closed_count'] + (1 if self.state['open_kline'] else 0)
+
+    # ===== 数据更新 =====
+    def update(self, client=None, limit=None):
+        """
+        从币安拉取新K线并写入存储
+        参数:
+            client: 可选的API客户端实例
+            limit: 存储为空 (或不足limit条) 时初始化拉取的K线数量
+        返回:
+            int: 本次新追加的已收盘K线数量
+        """
+        # 延迟导入，避免与 binance_client 循环依赖
+        from binance_client import get_binance_client, backfill_klines, request_klines, BackfillError
+
+        client = client or get_binance_client()
+        use_limit = min(limit or KLINES_MAX_LIMIT, KLINES_MAX_LIMIT)
+        now_ms = int(time.time() * 1000)
+
+        if self.last_closed_open_time is None or self.state['closed_count'] + 1 < use_limit:
+            # 首次运行或历史不足：拉取最近 limit 条并重建存储
+            klines = request_klines(client, symbol=self.symbol, interval=self.interval, limit=use_limit)
+            self._reset()
+        else:
+            start_ms = self.last_closed_open_time + self.step_ms
+            missing_bars = (now_ms - start_ms) // self.step_ms + 1
+            if missing_bars > KLINES_MAX_LIMIT:
+                # 长时间未运行：改用分页回补
+                try:
+                    klines = backfill_klines(start_ms, now_ms, interval=self.interval, symbol=self.symbol,
+                                             client=client)
+                except BackfillError as e:
+                    # 只写入第一个失败窗口之前的部分，下次更新从失败窗口处继续 (不会被当作交易所缺口记录)
+                    print(f"⚠️ {self.symbol} {self.interval} 回补不完整: {e}")
+                    klines = e.contiguous()
+            else:
+                # 缺失的K线可能多于 limit 条：按缺失数量请求 (含正在形成的一根)，一次补齐到当前时间
+                klines = request_klines(client, symbol=self.symbol, interval=self.interval, startTime=start_ms,
+                                        limit=min(max(use_limit, missing_bars + 1), KLINES_MAX_LIMIT))
+
+        return self._apply(klines or [], now_ms, client=client)
+
+    def _reset(self):
+        self.data = None  # 先释放内存映射再删除文件
+        if self.data_path.exists():
+            self.data_path.unlink()
+        self.data = KlineMmap(self.symbol, self.interval, path=self.data_path)
+        self.state = {'last_closed_open_time': None, 'closed_count': 0, 'open_kline': None}
+
+    def ingest(self, klines, closed=None, verbose=False):
+        """
+        写入外部来源 (如WebSocket推送) 的K线，规则与 update 相同
+        参数:
+            klines: 与 client.klines 返回格式一致的K线列表
+            closed: True/False 强制指定是否已收盘；None 表示按 close_time 与当前时间判断
+        """
+        return self._apply(klines, int(time.time() * 1000), verbose, closed)
+
+    def _apply(self, klines, now_ms, verbose=True, force_closed=None, client=None):
+        """把新K线分为已收盘/未收盘两部分：已收盘的追加写入，未收盘的替换状态中的旧值"""
+        last_closed = self.last_closed_open_time
+        closed_by_time = {}
+        open_kline = self.state['open_kline'] if force_closed else None
+        for kline in klines:
+            open_time = int(kline[0])
+            if last_closed is not None and open_time <= last_closed:
+                continue  # 已经在磁盘上
+            is_closed = int(kline[6]) < now_ms if force_closed is None else force_closed
+            if is_closed:
+                closed_by_time[open_time] = kline  # 同一批次内重复的K线以后出现的为准
+            else:
+                open_kline = kline
+        closed = [closed_by_time[open_time] for open_time in sorted(closed_by_time)]
+        if closed:
+            closed = self._fill_gaps(closed, client)
+
+        # 已收盘的K线不能再作为未收盘K线保留
+        if open_kline and closed and int(open_kline[0]) <= int(closed[-1][0]):
+            open_kline = None
+
+        if closed:
+            # 中间仍缺失的K线 (已确认的交易所缺口) 由 KlineMmap 写入 NaN 占位记录
+            self.data.append(klines_to_columns(closed))
+            self.state['last_closed_open_time'] = int(closed[-1][0])
+            self.state['closed_count'] += len(closed)
+
+        self.state['open_kline'] = open_kline
+        self._save_state()
+
+        if verbose:
+            print(f"🗂️ {self.symbol} {self.interval} 增量更新: 新增 {len(closed)} 条已收盘K线, "
+                  f"未收盘K线: {'有' if open_kline else '无'}")
+        return len(closed)
+
+    # ===== 完整性检查 =====
+    def _fill_gaps(self, closed, client=None):
+        """追加前检查新K线与磁盘数据的衔接，缺失的K线通过REST补齐 (只检查新追加部分)"""
+        from kline_integrity import scan_append, fetch_gap_columns
+        from kline_parser import columns_to_klines
+
+        report = scan_append(self.last_closed_open_time, [int(k[0]) for k in closed], self.interval)
+        known = self._known_gaps()
+        gaps = [gap for gap in report.gaps if _gap_key(gap) not in known]
+        if not gaps:
+            return closed
+
+        print(f"🩹 {self.symbol} {self.interval} 追加时发现 {len(gaps)} 处缺口，重新请求缺失K线...")
+        filled = {int(k[0]): k for part in fetch_gap_columns(gaps, self.interval, self.symbol, client)
+                  for k in columns_to_klines(part)}
+        filled.update({int(k[0]): k for k in closed})
+        merged = [filled[open_time] for open_time in sorted(filled)]
+        # 币安端同样缺失的K线 (如交易所停机) 记录下来，之后不再重复请求
+        remaining = scan_append(self.last_closed_open_time, [int(k[0]) for k in merged], self.interval).gaps
+        if remaining:
+            self._remember_gaps(remaining)
+        return merged
+
+    def _known_gaps(self):
+        """已确认币安端也缺失的缺口 {(起点, 终点)}"""
+        return {_gap_key(gap) for gap in self.state.get('known_gaps', [])}
+
+    def _remember_gaps(self, gaps):
+        """把缺口并入 known_gaps (按 (起点, 终点) 去重并排序，重复运行不会重复记录)"""
+        known = self._known_gaps() | {_gap_key(gap) for gap in gaps}
+        self.state['known_gaps'] = [list(gap) for gap in sorted(known)]
+
+    def verify(self, repair=True, client=None, tail=None):
+        """
+        对存储做完整性检查 (只读取 open_time/收盘价 两个字段)，发现未确认的缺口时可选重新请求并重写存储
+        参数:
+            tail: 只检查最后 tail 条记录，None 表示全部
+        返回:
+            IntegrityReport: 修复后 (或未修复时) 的检查结果
+        说明：定长稠密文件不会出现重复/乱序；已记录为交易所缺口的时间段不会重复请求
+        """
+        from kline_integrity import scan_open_times, fetch_gap_columns
+        from kline_parser import concat_columns
+
+        records = self.data.refresh().records
+        if tail is not None:
+            records = records[len(records) - min(tail, len(records)):]
+        report = scan_open_times(_present(records)['open_time'], self.interval)
+        known = self._known_gaps()
+        unknown_gaps = [gap for gap in report.gaps if _gap_key(gap) not in known]
+        if not repair or not unknown_gaps:
+            return report
+
+        print(f"🩹 {self.symbol} {self.interval} 发现 {len(unknown_gaps)} 处缺口，重新请求缺失K线...")
+        fields = RECORD_DTYPE.names
+        present = _present(self.data.records)
+        parts = [{field: present[field] for field in fields}]
+        parts += [{field: part[field] for field in fields}
+                  for part in fetch_gap_columns(unknown_gaps, self.interval, self.symbol, client)]
+        columns = concat_columns(parts)
+
+        # 写入临时文件后整体替换，中途中断不会损坏原文件
+        tmp_path = self.data_path.with_suffix('.tmp')
+        if tmp_path.exists():
+            tmp_path.unlink()
+        KlineMmap(self.symbol, self.interval, path=tmp_path).append(columns)
+        self.data = None
+        os.replace(tmp_path, self.data_path)
+        self.data = KlineMmap(self.symbol, self.interval, path=self.data_path)
+
+        # 币安端同样缺失的K线 (如交易所停机) 记录下来，之后不再重复请求
+        report = scan_open_times(columns['open_time'], self.interval)
+        self.state['closed_count'] = len(columns['open_time'])
+        self.state['known_gaps'] = []
+        self._remember_gaps(report.gaps)
+        self._save_state()
+        return report if tail is None else scan_open_times(columns['open_time'][-tail:], self.interval)
+
+    # ===== 数据读取 =====
+    def load(self, tail=None, include_open=True):
+        """
+        读取存储中的K线 (与 process_klines_data 返回格式一致)
+        参数:
+            tail: 只读取最后 tail 条 (含未收盘K线)，None 表示全部
+            include_open: 是否包含未收盘的最后一根K线
+        说明：tail 只读取文件末尾的记录，不解析整个历史；缺口占位记录不计入 tail
+        """
+        from binance_client import process_klines_data
+
+        open_kline = self.state['open_kline'] if include_open else None
+        records = self.data.refresh().records
+        if tail is None:
+            records = _present(records)
+        else:
+            closed_needed = max(0, tail - (1 if open_kline else 0))
+            window = closed_needed
+            while True:
+                # 缺口占位记录不计数：窗口内的真实K线不够时把窗口加倍
+                part = _present(records[-window:] if window else records[:0])
+                if len(part) >= closed_needed or window >= len(records):
+                    break
+                window *= 2
+            records = part[len(part) - min(len(part), closed_needed):]
+
+        df = columns_to_frame({field: records[field] for field in RECORD_DTYPE.names})
+        if open_kline:
+            df = pd.concat([df, process_klines_data([open_kline])])
+        return df
+
+    def export_csv(self, path=None, include_open=False):
+        """
+        把存储中的K线导出为CSV (只作为导出格式，存储本身不读写CSV)
+        参数:
+            path: 导出路径，默认 {存储目录}/{symbol}_{interval}_export.csv
+        返回:
+            Path: 实际写入的文件路径
+        """
+        from frame_storage import export_csv
+        path = path or self.store_dir / f"{self.symbol}_{self.interval}_export.csv"
+        return export_csv(self.load(include_open=include_open), path)
+
+
+def _present(records):
+    """去掉缺口占位记录 (数值字段为 NaN)"""
+    return records[~np.isnan(records['close'])]
+
+
+def _gap_key(gap):
+    """缺口 (起点, 终点) 转为可比较、可写入JSON的整数元组"""
+    start, end = gap
+    return int(start), int(end)
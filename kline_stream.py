@@ -0,0 +1,376 @@
+"""
+K线WebSocket实时接入模块
+功能：订阅币安 <symbol>@kline_<interval> 推送，把已收盘/未收盘K线写入原始数据层，断线自动重连并通过REST回补缺口
+附带：ReplayStreamServer —— 回放已记录K线的本地WebSocket服务器，用于离线测试和延迟基准
+依赖：websocket-client (随 binance-futures-connector 自动安装)
+"""
+
+import base64
+import hashlib
+import json
+import socketserver
+import struct
+import threading
+import time
+import pandas as pd
+import websocket
+from config import SYMBOL, INTERVAL, BINANCE_WS_URL, STREAM_RECONNECT_DELAY, STREAM_MAX_RECONNECT_DELAY, \
+    interval_to_milliseconds
+from kline_store import KlineStore
+
+
+# ===== 消息格式转换 =====
+def parse_kline_event(message):
+    """
+    解析K线推送消息
+    参数:
+        message: 原始JSON字符串 (单流或组合流格式均可)
+    返回:
+        tuple: (kline, is_closed, event_time_ms)，kline 与 client.klines 单行格式一致；非K线消息返回 None
+    """
+    event = json.loads(message)
+    if 'data' in event:  # 组合流: {"stream": ..., "data": {...}}
+        event = event['data']
+    if event.get('e') != 'kline':
+        return None
+    k = event['k']
+    kline = [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'], k['T'], k['q'], k['n'], k['V'], k['Q'], k.get('B', '0')]
+    return kline, bool(k['x']), event.get('E')
+
+
+def build_kline_event(kline, symbol, interval, is_closed, event_time=None):
+    """把一行K线 (client.klines 格式) 编码为币安K线推送消息"""
+    return json.dumps({
+        'e': 'kline',
+        'E': event_time if event_time is not None else int(time.time() * 1000),
+        's': symbol,
+        'k': {
+            't': int(kline[0]), 'T': int(kline[6]), 's': symbol, 'i': interval,
+            'o': str(kline[1]), 'c': str(kline[4]), 'h': str(kline[2]), 'l': str(kline[3]),
+            'v': str(kline[5]), 'n': int(float(kline[8])), 'x': is_closed,
+            'q': str(kline[7]), 'V': str(kline[9]), 'Q': str(kline[10]), 'B': '0'
+        }
+    })
+
+
+def frame_to_klines(df, interval):
+    """
+    把原始数据 DataFrame (process_klines_data 格式，或从原始数据CSV读取的表) 还原为 client.klines 格式
+    """
+    step = interval_to_milliseconds(interval)
+    if 'open_time' in df.columns:
+        df = df.set_index(pd.to_datetime(df['open_time']))
+    open_times = df.index.values.astype('datetime64[ms]').astype('int64')
+    klines = []
+    for open_time, row in zip(open_times, df[['开盘价', '最高价', '最低价', '收盘价', '成交量', '成交额',
+                                              '成交笔数', '主动买入量', '主动买入额']].itertuples(index=False)):
+        o, h, l, c, v, q, n, bv, bq = row
+        klines.append([int(open_time), str(o), str(h), str(l), str(c), str(v), int(open_time) + step - 1,
+                       str(q), int(n), str(bv), str(bq), '0'])
+    return klines
+
+
+# ===== WebSocket消费者 =====
+class KlineStreamConsumer:
+    """
+    K线推送消费者
+    - 已收盘K线追加到 KlineStore，未收盘K线只保存在内存中 (每次推送替换)
+    - 连接 (重新) 建立后先通过REST补齐断线期间缺失的K线
+    - 收到的已收盘K线与存储之间出现缺口时，立即回补缺口
+    - on_bar(bar_df, is_closed) 回调在每条推送处理完后触发，bar_df 与 process_klines_data 格式一致
+    """
+
+    def __init__(self, symbol=None, interval=None, store=None, ws_url=None, client=None, on_bar=None,
+                 backfill_on_connect=True):
+        self.symbol = (symbol or SYMBOL).upper()
+        self.interval = interval or INTERVAL
+        self.step_ms = interval_to_milliseconds(self.interval)
+        self.store = store or KlineStore(self.symbol, self.interval)
+        self.url = f"{(ws_url or BINANCE_WS_URL).rstrip('/')}/{self.symbol.lower()}@kline_{self.interval}"
+        self.client = client
+        self.on_bar = on_bar
+        self.backfill_on_connect = backfill_on_connect
+        self.open_kline = None
+        self.latencies_ms = []  # 已收盘K线从推送事件时间到写入完成的延迟
+        self.reconnects = 0
+        self._app = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ===== 生命周期 =====
+    def start(self):
+        """在后台线程中运行"""
+        self._thread = threading.Thread(target=self.run_forever, name=f"kline-stream-{self.symbol}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._app is not None:
+            self._app.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_forever(self):
+        """阻塞运行，断线后按指数退避自动重连"""
+        delay = STREAM_RECONNECT_DELAY
+        while not self._stop.is_set():
+            self._app = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+            )
+            started = time.time()
+            self._app.run_forever(ping_interval=60, ping_timeout=10)
+            if self._stop.is_set():
+                break
+            # 连接稳定运行过一段时间则重置退避时间
+            if time.time() - started > STREAM_MAX_RECONNECT_DELAY:
+                delay = STREAM_RECONNECT_DELAY
+            self.reconnects += 1
+            print(f"🔌 {self.symbol} {self.interval} 推送连接断开，{delay}秒后重连...")
+            self._stop.wait(delay)
+            delay = min(delay * 2, STREAM_MAX_RECONNECT_DELAY)
+
+    # ===== 回调 =====
+    def _on_open(self, app):
+        print(f"📡 已订阅 {self.url}")
+        if self.backfill_on_connect and self.store.last_closed_open_time is not None:
+            self._backfill_gap()
+
+    def _on_error(self, app, error):
+        if not self._stop.is_set():
+            print(f"⚠️ 推送连接错误: {error}")
+
+    def _on_message(self, app, message):
+        parsed = parse_kline_event(message)
+        if parsed is None:
+            return
+        kline, is_closed, event_time = parsed
+        self.handle_kline(kline, is_closed, event_time)
+
+    # ===== 数据处理 =====
+    def handle_kline(self, kline, is_closed, event_time=None):
+        """处理一条K线推送 (也可直接调用以注入数据)"""
+        open_time = int(kline[0])
+        last_closed = self.store.last_closed_open_time
+
+        if is_closed:
+            if last_closed is not None and open_time <= last_closed:
+                return  # 重复推送
+            if last_closed is not None and open_time > last_closed + self.step_ms:
+                self._backfill_gap(until_ms=open_time - 1)
+            self.store.ingest([kline], closed=True)
+            if self.open_kline is not None and int(self.open_kline[0]) <= open_time:
+                self.open_kline = None
+            if event_time is not None:
+                self.latencies_ms.append(time.time() * 1000 - event_time)
+        else:
+            if last_closed is not None and open_time <= last_closed:
+                return
+            self.open_kline = kline
+
+        if self.on_bar is not None:
+            from binance_client import process_klines_data
+            self.on_bar(process_klines_data([kline]), is_closed)
+
+    def _backfill_gap(self, until_ms=None):
+        """通过REST补齐存储中最后一根已收盘K线之后缺失的K线"""
+        from binance_client import backfill_klines, BackfillError
+
+        start_ms = self.store.last_closed_open_time + self.step_ms
+        end_ms = until_ms if until_ms is not None else int(time.time() * 1000) - self.step_ms
+        if end_ms < start_ms:
+            return
+        try:
+            klines = backfill_klines(start_ms, end_ms, interval=self.interval, symbol=self.symbol, client=self.client)
+        except BackfillError as e:
+            # 先写入失败窗口之前的部分，其余缺口由之后的回补补齐
+            print(f"⚠️ 缺口回补不完整: {e}")
+            klines = e.contiguous()
+        except Exception as e:
+            print(f"⚠️ 缺口回补失败: {e}")
+            return
+        # 回补区间内的K线均已收盘
+        self.store.ingest([k for k in klines if int(k[0]) <= end_ms], closed=True, verbose=True)
+
+    def frame(self, tail=None):
+        """当前原始数据视图：存储中的已收盘K线 + 内存中的未收盘K线"""
+        from binance_client import process_klines_data
+
+        closed_tail = None if tail is None else max(0, tail - (1 if self.open_kline else 0))
+        df = self.store.load(tail=closed_tail, include_open=False)
+        if self.open_kline is not None:
+            df = pd.concat([df, process_klines_data([self.open_kline])])
+        return df
+
+
+# ===== 本地回放服务器 =====
+_WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def _encode_text_frame(text):
+    """编码服务器→客户端的WebSocket文本帧 (服务器帧不加掩码)"""
+    payload = text.encode('utf-8')
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x81, length)
+    elif length < 65536:
+        header = struct.pack('!BBH', 0x81, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x81, 127, length)
+    return header + payload
+
+
+class _ReplayHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        request = b''
+        while b'\r\n\r\n' not in request:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                return
+            request += chunk
+        headers = {}
+        for line in request.split(b'\r\n')[1:]:
+            if b':' in line:
+                key, value = line.split(b':', 1)
+                headers[key.strip().lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1(headers[b'sec-websocket-key'] + _WS_GUID.encode()).digest())
+        self.request.sendall(
+            b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+            b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n'
+        )
+        server.connections += 1
+
+        sent = 0
+        try:
+            while not server.stopped.is_set():
+                message = server.next_message()
+                if message is None:
+                    break
+                self.request.sendall(_encode_text_frame(message))
+                sent += 1
+                if server.disconnect_after and sent >= server.disconnect_after:
+                    break  # 模拟断线
+                if server.message_interval:
+                    time.sleep(server.message_interval)
+        except OSError:
+            pass
+        # 发送关闭帧
+        try:
+            self.request.sendall(struct.pack('!BB', 0x88, 0))
+        except OSError:
+            pass
+
+
+class ReplayStreamServer(socketserver.ThreadingTCPServer):
+    """
+    回放已记录K线的本地WebSocket服务器
+    参数:
+        klines: client.klines 格式的K线列表 (可用 frame_to_klines 从原始数据CSV生成)
+        updates_per_bar: 每根K线在收盘前推送的未收盘更新次数
+        message_interval: 两条推送之间的间隔秒数 (0 表示尽快发送)
+        disconnect_after: 每个连接发送多少条消息后主动断开 (用于测试重连)，None 表示不断开
+    用法:
+        with ReplayStreamServer(klines, symbol='BTCUSDT', interval='1h') as server:
+            consumer = KlineStreamConsumer(ws_url=server.url, ...)
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, klines, symbol=None, interval=None, updates_per_bar=3, message_interval=0.0,
+                 disconnect_after=None, host='127.0.0.1', port=0):
+        super().__init__((host, port), _ReplayHandler)
+        self.symbol = (symbol or SYMBOL).upper()
+        self.interval = interval or INTERVAL
+        self.message_interval = message_interval
+        self.disconnect_after = disconnect_after
+        self.connections = 0
+        self.stopped = threading.Event()
+        self._messages = self._build_messages(klines, updates_per_bar)
+        self._position = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _build_messages(self, klines, updates_per_bar):
+        """每根K线生成若干条未收盘更新 (逐步逼近最终OHLC) 和一条收盘消息"""
+        messages = []
+        for kline in klines:
+            for i in range(1, updates_per_bar + 1):
+                partial = list(kline)
+                partial[4] = kline[1] if i < updates_per_bar else kline[4]  # 最后一次更新已是收盘价
+                messages.append((partial, False))
+            messages.append((kline, True))
+        return messages
+
+    def next_message(self):
+        """取出下一条待发送消息 (事件时间为发送时刻，用于计算端到端延迟)"""
+        with self._lock:
+            if self._position >= len(self._messages):
+                return None
+            kline, is_closed = self._messages[self._position]
+            self._position += 1
+        return build_kline_event(kline, self.symbol, self.interval, is_closed)
+
+    @property
+    def finished(self):
+        return self._position >= len(self._messages)
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"ws://{host}:{port}/ws"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='kline-replay-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+if __name__ == "__main__":
+    # 离线回放基准：用 data/ 中已记录的1小时线原始数据测量K线收盘到写入完成的延迟
+    import tempfile
+    from pathlib import Path
+    from mock_binance_server import load_recorded_frame
+
+    print("=" * 50)
+    print("K线推送回放测试")
+    print("=" * 50)
+
+    raw_df = load_recorded_frame('1小时线')
+    if raw_df is None:
+        print("❌ 未找到已记录的1小时线原始数据")
+    else:
+        klines = frame_to_klines(raw_df, '1h')
+        store = KlineStore(SYMBOL, '1h', store_dir=Path(tempfile.mkdtemp()))
+        # 先写入前一半K线，另一半通过推送回放
+        half = len(klines) // 2
+        store.ingest(klines[:half], closed=True)
+
+        with ReplayStreamServer(klines[half:], SYMBOL, '1h', message_interval=0.002,
+                                disconnect_after=150) as server:
+            consumer = KlineStreamConsumer(SYMBOL, '1h', store=store, ws_url=server.url,
+                                           backfill_on_connect=False).start()
+            while not server.finished:
+                time.sleep(0.05)
+            time.sleep(0.2)
+            consumer.stop()
+
+        latencies = sorted(consumer.latencies_ms)
+        print(f"✅ 回放完成: 存储共 {len(store)} 条K线, 重连 {consumer.reconnects} 次")
+        if latencies:
+            print(f"⏱️ 收盘→写入延迟: 中位数 {latencies[len(latencies) // 2]:.2f}ms, "
+                  f"P99 {latencies[int(len(latencies) * 0.99)]:.2f}ms")
@@ -5,7 +5,6 @@
 """
 import os
 import sys
-import time
 from datetime import datetime
 from pathlib import Path
 
@@ -21,11 +20,13 @@ if str(current_dir) not in sys.path:
 
 # ===== 导入各模块 =====
 try:
-    from binance_client import fetch_and_save_btcusdt_data, fetch_and_save_btcusdt_daily
-    from ta_calculator import calculate_indicators
-    from combined_data_processor import combine_data  # 新增导入
-    from report_generator import generate_trading_report
-    from config import DATA_DIR, RAW_DATA_FILENAME, INDICATORS_FILENAME, REPORT_FILENAME, COMBINED_FILENAME, TIMEFRAME_OPTIONS, get_filenames
+    from binance_client import fetch_and_save_btcusdt_data, fetch_and_save_btcusdt_daily, fetch_klines_frame, \
+        save_raw_data
+    from ta_calculator import calculate_indicators, calculate_indicators_frame, save_indicators
+    from combined_data_processor import combine_data, combine_frames, save_combined_data  # 新增导入
+    from report_generator import generate_trading_report, create_report_from_frame, save_report
+    from frame_storage import frame_exists, submit_write
+    from config import DATA_DIR, RAW_DATA_FILENAME, INDICATORS_FILENAME, REPORT_FILENAME, COMBINED_FILENAME, TIMEFRAME_OPTIONS, SYMBOL, get_filenames
     from aggressive_config import AGGRESSIVE_MODE_ENABLED, AGGRESSIVE_MODE_WARNINGS, check_aggressive_mode_conditions  # 激进模式导入
 
     print("✅ 所有模块导入成功")
@@ -70,16 +71,18 @@ def select_timeframe():
 
 
 # ===== 主流程函数 =====
-def main_analysis_flow():
+def main_analysis_flow(timeframe_config=None):
     """
     主分析流程
+    参数:
+        timeframe_config: 时间周期配置 (TIMEFRAME_OPTIONS 中的一项)，None 表示交互式选择
     """
     print("\n" + "=" * 50)
     print(f"BTCUSDT K线分析流程启动 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 50)
 
     # 0. 选择时间周期
-    timeframe_config = select_timeframe()
+    timeframe_config = timeframe_config or select_timeframe()
     interval = timeframe_config['interval']
     limit = timeframe_config['limit']
     timeframe_name = timeframe_config['name']
@@ -95,70 +98,31 @@ def main_analysis_flow():
     # 2. 数据抓取
     log_step("STEP 1", f"开始抓取币安{timeframe_name}数据...")
     try:
-        raw_data_path = fetch_and_save_btcusdt_data(
-            interval=interval,
-            limit=limit,
-            timeframe_name=timeframe_name
-        )
-        log_step("STEP 1", f"数据抓取完成! 文件位置: {raw_data_path}")
+        raw_df = fetch_klines_frame(interval=interval, limit=limit, timeframe_name=timeframe_name)
+        if raw_df is None:
+            log_step("ERROR", "数据抓取失败!")
+            return
+        log_step("STEP 1", f"数据抓取完成! 共 {len(raw_df)} 条记录")
     except Exception as e:
         log_step("ERROR", f"数据抓取失败: {e}")
         return
 
-    # 3. 技术指标计算
-    log_step("STEP 2", f"开始计算{timeframe_name}技术指标...")
-    time.sleep(1)  # 短暂延迟确保文件写入完成
-    try:
-        indicators_path = calculate_indicators(
-            raw_filename=filenames['raw'],
-            indicators_filename=filenames['indicators'],
-            timeframe_name=timeframe_name
-        )
-        if indicators_path:
-            log_step("STEP 2", f"指标计算完成! 文件位置: {indicators_path}")
-        else:
-            log_step("ERROR", "指标计算失败!")
-            return
-    except Exception as e:
-        log_step("ERROR", f"指标计算失败: {e}")
+    # 3~5. 各阶段直接传递 DataFrame，结果在后台线程中保存，不再写入后重新读取
+    results = run_analysis_stages(raw_df, timeframe_name, filenames=filenames, interval=interval)
+    if results is None:
         return
 
-    # 4. 组合数据处理
-    log_step("STEP 3", f"开始组合{timeframe_name}原始数据和技术指标数据...")
-    time.sleep(1)
+    # 等待后台保存完成，取得实际文件路径
     try:
-        combined_path = combine_data(
-            raw_filename=filenames['raw'],
-            indicators_filename=filenames['indicators'],
-            combined_filename=filenames['combined'],
-            timeframe_name=timeframe_name
-        )
-        if combined_path:
-            log_step("STEP 3", f"数据组合完成! 文件位置: {combined_path}")
-        else:
-            log_step("ERROR", "数据组合失败!")
-            return
+        paths = {name: future.result() for name, future in results['writes'].items()}
     except Exception as e:
-        log_step("ERROR", f"数据组合失败: {e}")
+        log_step("ERROR", f"文件保存失败: {e}")
         return
-
-    # 5. 生成分析报告
-    log_step("STEP 4", f"开始生成{timeframe_name}交易分析报告...")
-    time.sleep(1)  # 短暂延迟确保文件写入完成
-    try:
-        report_path = generate_trading_report(
-            indicators_filename=filenames['indicators'],
-            report_filename=filenames['report'],
-            timeframe_name=timeframe_name
-        )
-        if report_path:
-            log_step("STEP 4", f"报告生成完成! 文件位置: {report_path}")
-        else:
-            log_step("ERROR", "报告生成失败!")
-            return
-    except Exception as e:
-        log_step("ERROR", f"报告生成失败: {e}")
+    if None in paths.values():
+        log_step("ERROR", "文件保存失败!")
         return
+    raw_data_path, indicators_path = paths['raw'], paths['indicators']
+    combined_path, report_path = paths['combined'], paths['report']
 
     # 6. 完成提示
     log_step("COMPLETE", f"{timeframe_name}分析流程成功完成!")
@@ -175,6 +139,72 @@ def main_analysis_flow():
     print("=" * 50)
 
 
+def run_analysis_stages(raw_df, timeframe_name, symbol=None, filenames=None, persist=True, interval=None):
+    """
+    在内存中依次执行 指标计算 → 数据组合 → 报告生成
+    参数:
+        raw_df: 原始数据层 DataFrame
+        filenames: get_filenames 返回的文件名 (默认按 timeframe_name/symbol 生成)
+        persist: 是否保存各阶段结果；保存在后台写入线程中进行，不阻塞下一阶段
+        interval: K线间隔；给出时各阶段结果同时合并进分区数据集
+    返回:
+        dict: {'indicators': DataFrame, 'combined': DataFrame, 'report': str,
+               'writes': {阶段名: Future (结果为保存路径)}}；任一阶段失败时返回 None
+    """
+    filenames = filenames or get_filenames(timeframe_name, symbol)
+    symbol = symbol or SYMBOL
+    writes = {}
+    if persist:
+        writes['raw'] = submit_write(save_raw_data, raw_df, DATA_DIR / filenames['raw'], symbol=symbol,
+                                     interval=interval)
+
+    # 技术指标计算
+    log_step("STEP 2", f"开始计算{timeframe_name}技术指标...")
+    try:
+        indicators_df = calculate_indicators_frame(raw_df, timeframe_name)
+    except Exception as e:
+        log_step("ERROR", f"指标计算失败: {e}")
+        return None
+    if indicators_df is None:
+        log_step("ERROR", "指标计算失败!")
+        return None
+    if persist:
+        writes['indicators'] = submit_write(save_indicators, indicators_df, DATA_DIR / filenames['indicators'],
+                                            symbol, interval)
+    log_step("STEP 2", f"指标计算完成! 共 {len(indicators_df.columns)} 列")
+
+    # 组合数据处理
+    log_step("STEP 3", f"开始组合{timeframe_name}原始数据和技术指标数据...")
+    try:
+        combined_df = combine_frames(raw_df, indicators_df)
+    except Exception as e:
+        log_step("ERROR", f"数据组合失败: {e}")
+        return None
+    if combined_df is None:
+        log_step("ERROR", "数据组合失败!")
+        return None
+    if persist:
+        writes['combined'] = submit_write(save_combined_data, combined_df, DATA_DIR / filenames['combined'],
+                                          timeframe_name, symbol, interval)
+    log_step("STEP 3", f"数据组合完成! {len(combined_df)} 行 × {len(combined_df.columns)} 列")
+
+    # 生成分析报告
+    log_step("STEP 4", f"开始生成{timeframe_name}交易分析报告...")
+    try:
+        report = create_report_from_frame(indicators_df, symbol)
+    except Exception as e:
+        log_step("ERROR", f"报告生成失败: {e}")
+        return None
+    if report is None:
+        log_step("ERROR", "报告生成失败!")
+        return None
+    if persist:
+        writes['report'] = submit_write(save_report, report, DATA_DIR / filenames['report'])
+    log_step("STEP 4", "报告生成完成!")
+
+    return {'indicators': indicators_df, 'combined': combined_df, 'report': report, 'writes': writes}
+
+
 def display_file_paths():
     """显示文件路径信息"""
     print("\n当前配置的文件路径:")
@@ -185,9 +215,9 @@ def display_file_paths():
 
     # 检查文件是否存在
     print("\n文件存在状态:")
-    raw_exists = "存在" if (DATA_DIR / RAW_DATA_FILENAME).exists() else "不存在"
-    indicators_exists = "存在" if (DATA_DIR / INDICATORS_FILENAME).exists() else "不存在"
-    combined_exists = "存在" if (DATA_DIR / COMBINED_FILENAME).exists() else "不存在"  # 新增检查
+    raw_exists = "存在" if frame_exists(DATA_DIR / RAW_DATA_FILENAME) else "不存在"
+    indicators_exists = "存在" if frame_exists(DATA_DIR / INDICATORS_FILENAME) else "不存在"
+    combined_exists = "存在" if frame_exists(DATA_DIR / COMBINED_FILENAME) else "不存在"  # 新增检查
     report_exists = "存在" if (DATA_DIR / REPORT_FILENAME).exists() else "不存在"
 
     print(f"● 原始数据: {raw_exists}")
@@ -0,0 +1,406 @@
+"""
+币安U本位合约REST模拟服务器
+功能：在本地提供 /fapi/v1/klines、/fapi/v1/time、/fapi/v1/exchangeInfo、/fapi/v1/ping，
+      数据来自已记录的原始数据或确定性的合成K线，可配置网络延迟、错误注入和限流响应头
+用途：离线运行完整分析流程做性能基准和回归测试，不消耗真实API额度
+用法：
+    python mock_binance_server.py --port 8765 --latency 0.05 --error-rate 0.02
+    BINANCE_MOCK_URL=http://127.0.0.1:8765 python main.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+from config import DATA_DIR, SYMBOL, TIMEFRAME_OPTIONS, BINANCE_WEIGHT_LIMIT_PER_MINUTE, KLINES_MAX_LIMIT, \
+    INTERVAL_MILLISECONDS, get_filenames, interval_to_milliseconds
+from rate_limiter import ENDPOINT_WEIGHTS, klines_weight
+
+
+# ===== 数据源 =====
+def load_recorded_frame(timeframe_name, data_dir=None, symbol=None):
+    """
+    读取数据目录中已记录的原始数据 (get_filenames(...)['raw']，按实际保存的存储格式读取)
+    说明：旧版本带日期的原始数据CSV ({symbol}_{周期名}原始数据_{日期}.csv) 仍作为兼容来源一并读取
+    返回:
+        DataFrame: 以 open_time 为索引，按时间排序，重复的K线以较新的文件为准；没有记录时返回 None
+    """
+    from frame_storage import find_frame, load_frame
+
+    data_dir = data_dir or DATA_DIR
+    symbol = symbol or SYMBOL
+    paths = sorted(data_dir.glob(f"{symbol}_{timeframe_name}原始数据_*.csv"))
+    latest = find_frame(data_dir / get_filenames(timeframe_name, symbol)['raw'])
+    if latest is not None and latest not in paths:
+        paths.append(latest)
+    if not paths:
+        return None
+
+    frames = []
+    for path in paths:
+        df = load_frame(path)
+        if 'open_time' in df.columns:  # CSV 中 open_time 是普通列
+            df = df.set_index(pd.DatetimeIndex(pd.to_datetime(df.pop('open_time')), name='open_time'))
+        frames.append(df)
+    df = pd.concat(frames)
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+
+def load_recorded_klines(data_dir=None, symbol=None):
+    """
+    读取数据目录中已记录的各周期原始数据 (见 load_recorded_frame)
+    返回:
+        dict: {(symbol, interval): klines}
+    """
+    from kline_stream import frame_to_klines
+
+    symbol = symbol or SYMBOL
+    recorded = {}
+    for config in TIMEFRAME_OPTIONS.values():
+        df = load_recorded_frame(config['name'], data_dir, symbol)
+        if df is not None:
+            recorded[(symbol, config['interval'])] = frame_to_klines(df, config['interval'])
+    return recorded
+
+
+def _uniform(open_times, seed, salt):
+    """按 open_time 生成 [0, 1) 均匀分布的确定性伪随机数 (splitmix64)"""
+    x = open_times.astype(np.uint64) + np.uint64((seed * 1_000_003 + salt) & 0xFFFFFFFF)
+    x = x * np.uint64(0x9E3779B97F4A7C15)
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def _synthetic_price(times_ms, seed, base_price):
+    """由时间确定的价格曲线：多个周期叠加 + 小幅噪声，任意时间窗口请求结果一致"""
+    t = times_ms.astype(np.float64)
+    day = 86_400_000.0
+    log_price = (0.15 * np.sin(2 * np.pi * t / (90 * day))
+                 + 0.05 * np.sin(2 * np.pi * t / (7 * day) + 1.0)
+                 + 0.01 * np.sin(2 * np.pi * t / day + 2.0)
+                 + 0.002 * (_uniform(times_ms, seed, 0) - 0.5))
+    return base_price * np.exp(log_price)
+
+
+def synthetic_klines(interval, open_times, seed=0, base_price=100000.0):
+    """
+    生成合成K线 (client.klines 格式)
+    参数:
+        interval: K线间隔
+        open_times: 各K线开盘时间 (毫秒) 的整数数组
+    """
+    step = interval_to_milliseconds(interval)
+    open_times = np.asarray(open_times, dtype=np.int64)
+    scale = np.sqrt(step / 3_600_000)  # 波动和成交量随周期长度放大
+    opens = _synthetic_price(open_times, seed, base_price)
+    closes = _synthetic_price(open_times + step, seed, base_price)
+    highs = np.maximum(opens, closes) * (1 + 0.004 * scale * _uniform(open_times, seed, 1))
+    lows = np.minimum(opens, closes) * (1 - 0.004 * scale * _uniform(open_times, seed, 2))
+    volumes = 5000 * scale * scale * (0.5 + _uniform(open_times, seed, 3))
+    quote_volumes = volumes * (opens + closes) / 2
+    taker_ratio = 0.4 + 0.2 * _uniform(open_times, seed, 4)
+
+    klines = []
+    for i, open_time in enumerate(open_times.tolist()):
+        klines.append([open_time, f"{opens[i]:.1f}", f"{highs[i]:.1f}", f"{lows[i]:.1f}", f"{closes[i]:.1f}",
+                       f"{volumes[i]:.3f}", open_time + step - 1, f"{quote_volumes[i]:.4f}",
+                       int(volumes[i] * 15), f"{volumes[i] * taker_ratio[i]:.3f}",
+                       f"{quote_volumes[i] * taker_ratio[i]:.4f}", '0'])
+    return klines
+
+
+def select_klines(klines, start_ms=None, end_ms=None, limit=500):
+    """按币安语义从有序K线中截取：有 startTime 从起点向后取，否则取 endTime (或末尾) 之前最近的 limit 条"""
+    open_times = [k[0] for k in klines]
+    if start_ms is not None:
+        lo = np.searchsorted(open_times, start_ms, side='left')
+        hi = np.searchsorted(open_times, end_ms, side='right') if end_ms is not None else len(klines)
+        return klines[lo:min(hi, lo + limit)]
+    hi = np.searchsorted(open_times, end_ms, side='right') if end_ms is not None else len(klines)
+    return klines[max(0, hi - limit):hi]
+
+
+# ===== HTTP服务 =====
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 保持连接，与连接池的 keep-alive 行为一致
+
+    def log_message(self, format, *args):
+        pass  # 基准测试时不输出访问日志
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        route = server.routes.get(url.path)
+        if route is None:
+            self._send_json(404, {'code': -5000, 'msg': f'Path {url.path} not found'})
+            return
+
+        if url.path == '/fapi/v1/klines':
+            weight = klines_weight(int(params['limit']) if 'limit' in params else None)
+        else:
+            weight = ENDPOINT_WEIGHTS.get(url.path, 1)
+
+        server.simulate_latency()
+        error = server.next_error()
+        used_weight, retry_after = server.consume_weight(weight)
+        headers = {'X-MBX-USED-WEIGHT-1M': used_weight}
+
+        if retry_after is not None:
+            headers['Retry-After'] = retry_after
+            self._send_json(429, {'code': -1003, 'msg': 'Too many requests; current limit is exceeded.'}, headers)
+        elif error == 429:
+            headers['Retry-After'] = 1
+            self._send_json(429, {'code': -1003, 'msg': 'Too many requests (injected).'}, headers)
+        elif error is not None:
+            self._send_json(error, {'code': -1000, 'msg': 'An unknown error occurred (injected).'}, headers)
+        else:
+            try:
+                status, payload = route(params)
+            except (KeyError, ValueError) as e:
+                status, payload = 400, {'code': -1102, 'msg': f'Mandatory parameter missing or malformed: {e}'}
+            self._send_json(status, payload, headers)
+
+
+class MockBinanceServer(ThreadingHTTPServer):
+    """
+    本地模拟的币安U本位合约REST服务器
+    参数:
+        recorded: {(symbol, interval): klines}，None 表示自动读取数据目录中的原始数据
+        synthetic: 没有记录数据的 (symbol, interval) 是否返回合成K线
+        latency: 每个请求的固定延迟 (秒)
+        jitter: 在固定延迟上叠加的 [0, jitter) 随机延迟 (秒)
+        error_rate: 随机注入错误的概率 (0-1)
+        error_statuses: 注入错误时从中随机选择的HTTP状态码
+        weight_limit: 每分钟权重上限，超过后返回 429 和 Retry-After
+        seed: 随机数种子 (影响合成K线和错误注入)
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, recorded=None, synthetic=True, latency=0.0, jitter=0.0,
+                 error_rate=0.0, error_statuses=(500, 503, 429), weight_limit=None, seed=0):
+        super().__init__((host, port), _MockHandler)
+        self.recorded = load_recorded_klines() if recorded is None else recorded
+        self.synthetic = synthetic
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.weight_limit = weight_limit or BINANCE_WEIGHT_LIMIT_PER_MINUTE
+        self.seed = seed
+        self.routes = {
+            '/fapi/v1/ping': lambda params: (200, {}),
+            '/fapi/v1/time': lambda params: (200, {'serverTime': self.now_ms()}),
+            '/fapi/v1/exchangeInfo': self._exchange_info,
+            '/fapi/v1/klines': self._klines,
+        }
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._forced_errors = []
+        self._weight_minute = None
+        self._used_weight = 0
+        self.request_count = 0
+        self.error_count = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def now_ms(self):
+        return int(time.time() * 1000)
+
+    # ===== 故障与延迟模拟 =====
+    def simulate_latency(self):
+        delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def fail_next(self, count=1, status=500):
+        """让接下来的 count 个请求返回指定状态码 (用于确定性地测试重试逻辑)"""
+        with self._lock:
+            self._forced_errors.extend([status] * count)
+
+    def next_error(self):
+        with self._lock:
+            self.request_count += 1
+            if self._forced_errors:
+                status = self._forced_errors.pop(0)
+            elif self.error_rate and self._random.random() < self.error_rate:
+                status = self._random.choice(self.error_statuses)
+            else:
+                return None
+            self.error_count += 1
+            return status
+
+    def consume_weight(self, weight):
+        """
+        按分钟窗口累计已用权重
+        返回:
+            tuple: (当前已用权重, 超限时的 Retry-After 秒数或 None)
+        """
+        now = time.time()
+        minute = int(now // 60)
+        with self._lock:
+            if minute != self._weight_minute:
+                self._weight_minute = minute
+                self._used_weight = 0
+            if self._used_weight + weight > self.weight_limit:
+                return self._used_weight, max(1, int(60 - now % 60))
+            self._used_weight += weight
+            return self._used_weight, None
+
+    # ===== 接口实现 =====
+    def _exchange_info(self, params):
+        symbols = sorted({symbol for symbol, _ in self.recorded} | {SYMBOL})
+        return 200, {
+            'timezone': 'UTC',
+            'serverTime': self.now_ms(),
+            'rateLimits': [
+                {'rateLimitType': 'REQUEST_WEIGHT', 'interval': 'MINUTE', 'intervalNum': 1,
+                 'limit': self.weight_limit},
+            ],
+            'symbols': [{'symbol': symbol, 'pair': symbol, 'contractType': 'PERPETUAL', 'status': 'TRADING',
+                         'baseAsset': symbol[:-4], 'quoteAsset': symbol[-4:], 'pricePrecision': 2,
+                         'quantityPrecision': 3} for symbol in symbols],
+        }
+
+    def _klines(self, params):
+        symbol = params['symbol']
+        interval = params['interval']
+        if interval not in INTERVAL_MILLISECONDS:
+            return 400, {'code': -1120, 'msg': 'Invalid interval.'}
+        limit = min(int(params.get('limit', 500)), KLINES_MAX_LIMIT)
+        start_ms = int(params['startTime']) if 'startTime' in params else None
+        end_ms = int(params['endTime']) if 'endTime' in params else None
+
+        recorded = self.recorded.get((symbol, interval))
+        if recorded is not None:
+            return 200, select_klines(recorded, start_ms, end_ms, limit)
+        if not self.synthetic:
+            return 400, {'code': -1121, 'msg': 'Invalid symbol.'}
+
+        # 合成数据：只生成请求窗口内、且不晚于当前时间的K线
+        step = interval_to_milliseconds(interval)
+        latest = (min(end_ms, self.now_ms()) if end_ms is not None else self.now_ms()) // step * step
+        if start_ms is not None:
+            first = -(-start_ms // step) * step
+            last = min(latest, first + (limit - 1) * step)
+        else:
+            last = latest
+            first = last - (limit - 1) * step
+        if last < first:
+            return 200, []
+        # 不同交易对使用不同的种子和价格水平，避免多交易对测试得到完全相同的数据
+        symbol_seed = zlib.crc32(symbol.encode('utf-8'))
+        base_price = 10 ** (1 + symbol_seed % 5) * (1 + symbol_seed % 97 / 100)
+        return 200, synthetic_klines(interval, np.arange(first, last + 1, step), self.seed + symbol_seed, base_price)
+
+    # ===== 生命周期 =====
+    def start(self):
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def run_offline_benchmark(timeframe_keys=None, **server_kwargs):
+    """
+    启动模拟服务器并离线运行完整分析流程 (抓取 → 指标 → 组合 → 报告)，统计各周期耗时
+    参数:
+        timeframe_keys: TIMEFRAME_OPTIONS 的键列表，None 表示全部
+        server_kwargs: 传给 MockBinanceServer 的参数 (延迟、错误率等)
+    """
+    import os
+    import client_pool
+
+    with MockBinanceServer(**server_kwargs) as server:
+        os.environ['BINANCE_MOCK_URL'] = server.url
+        client_pool.get_client_pool().close()  # 让后续创建的客户端指向模拟服务器
+
+        from main import main_analysis_flow
+        timings = {}
+        for key in timeframe_keys or TIMEFRAME_OPTIONS.keys():
+            config = TIMEFRAME_OPTIONS[key]
+            start = time.perf_counter()
+            main_analysis_flow(config)
+            timings[config['name']] = time.perf_counter() - start
+
+        print("\n" + "=" * 50)
+        print(f"离线基准结果 (模拟服务器 {server.url}, 请求 {server.request_count} 次, 注入错误 {server.error_count} 次)")
+        for name, seconds in timings.items():
+            print(f"● {name}: {seconds:.2f} 秒")
+        print("=" * 50)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="币安U本位合约REST模拟服务器")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="每个请求的固定延迟 (秒)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="叠加的随机延迟上限 (秒)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="随机注入错误的概率 (0-1)")
+    parser.add_argument('--weight-limit', type=int, default=None, help="每分钟权重上限")
+    parser.add_argument('--synthetic-only', action='store_true', help="忽略已记录数据，只返回合成K线")
+    parser.add_argument('--benchmark', action='store_true', help="启动服务器后离线运行全部周期的分析流程")
+    args = parser.parse_args()
+
+    server_kwargs = {
+        'host': args.host,
+        'port': args.port,
+        'recorded': {} if args.synthetic_only else None,
+        'latency': args.latency,
+        'jitter': args.jitter,
+        'error_rate': args.error_rate,
+        'weight_limit': args.weight_limit,
+    }
+    if args.benchmark:
+        run_offline_benchmark(**server_kwargs)
+    else:
+        server = MockBinanceServer(**server_kwargs)
+        print(f"🧪 模拟服务器已启动: {server.url}")
+        print(f"   已记录数据: {', '.join(f'{s} {i} ({len(k)}条)' for (s, i), k in server.recorded.items()) or '无'}")
+        print(f"   使用方法: BINANCE_MOCK_URL={server.url} python main.py")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n模拟服务器已停止")
+        finally:
+            server.server_close()
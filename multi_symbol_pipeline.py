@@ -0,0 +1,164 @@
+"""
+多交易对分析流水线
+功能：并发抓取多个交易对的K线，再在进程池中为每个交易对执行 指标计算 → 数据组合 → 报告生成，最后输出汇总表
+说明：指标计算是CPU密集型任务，按交易对分配到多个进程，吞吐量随CPU核数近似线性增长
+用法：
+    python multi_symbol_pipeline.py --symbols BTCUSDT,ETHUSDT,SOLUSDT --timeframe 2
+"""
+
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from datetime import datetime
+import pandas as pd
+from config import DATA_DIR, SYMBOLS, TIMEFRAME_OPTIONS, PIPELINE_MAX_WORKERS, get_filenames, get_summary_filename
+from frame_storage import load_frame, frame_exists
+from signal_labels import signal_label
+
+# 汇总表中从最新一行指标数据里提取的列 (信号列转换为标签)
+SUMMARY_COLUMNS = ['收盘价', 'RSI', 'MACD_Hist', 'ATR', 'ADX', 'Fib_Trend', '综合信号']
+
+
+def analyze_symbol(symbol, timeframe_name, interval=None):
+    """
+    单个交易对的计算阶段 (在子进程中执行，原始数据需已保存)
+    说明：原始数据只读取一次，之后各阶段在内存中传递 DataFrame，结果在后台线程中保存；
+          给出 interval 时结果同时合并进分区数据集
+    返回:
+        dict: 交易对、各阶段输出文件、最新指标摘要、耗时；失败时包含 error 和该交易对的完整日志
+    """
+    from ta_calculator import calculate_indicators_frame, save_indicators
+    from combined_data_processor import combine_frames, save_combined_data
+    from report_generator import create_report_from_frame, save_report
+    from frame_storage import submit_write
+
+    filenames = get_filenames(timeframe_name, symbol)
+    result = {'symbol': symbol}
+    start = time.perf_counter()
+    log = io.StringIO()
+    writes = {}
+    # 各模块输出大量过程日志，多进程同时打印会互相穿插，这里收集起来只在失败时返回
+    with redirect_stdout(log):
+        raw_df = load_frame(DATA_DIR / filenames['raw'])
+        indicators_df = calculate_indicators_frame(raw_df, timeframe_name)
+        if indicators_df is not None:
+            writes['indicators'] = submit_write(save_indicators, indicators_df, DATA_DIR / filenames['indicators'],
+                                                symbol, interval)
+        combined_df = combine_frames(raw_df, indicators_df) if indicators_df is not None else None
+        if combined_df is not None:
+            writes['combined'] = submit_write(save_combined_data, combined_df, DATA_DIR / filenames['combined'],
+                                              timeframe_name, symbol, interval)
+        report = create_report_from_frame(indicators_df, symbol) if combined_df is not None else None
+        if report is not None:
+            writes['report'] = submit_write(save_report, report, DATA_DIR / filenames['report'])
+        paths = {name: future.result() for name, future in writes.items()}
+    result['seconds'] = round(time.perf_counter() - start, 3)
+
+    if report is None or None in paths.values():
+        result['error'] = ('指标计算失败' if indicators_df is None else '数据组合失败' if combined_df is None
+                           else '报告生成失败' if report is None else '文件保存失败')
+        result['log'] = log.getvalue()
+        return result
+
+    latest = indicators_df.iloc[-1]
+    result.update({
+        'open_time': str(indicators_df.index[-1]),
+        **{col: signal_label(col, latest[col]) for col in SUMMARY_COLUMNS if col in latest.index},
+        **{name: str(path) for name, path in paths.items()},
+    })
+    return result
+
+
+def run_multi_symbol_pipeline(symbols=None, timeframe_config=None, max_workers=None, fetch=True):
+    """
+    多交易对完整流程
+    参数:
+        symbols: 交易对列表 (默认 config.SYMBOLS)
+        timeframe_config: TIMEFRAME_OPTIONS 中的一项 (默认日线)
+        max_workers: 进程池大小 (默认 CPU 核数)
+        fetch: 是否先抓取数据；False 时直接使用当天已保存的原始数据
+    返回:
+        Path: 汇总文件路径；没有任何交易对成功时返回 None
+    """
+    use_symbols = symbols or SYMBOLS
+    timeframe_config = timeframe_config or TIMEFRAME_OPTIONS['4']
+    timeframe_name = timeframe_config['name']
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+    print("\n" + "=" * 50)
+    print(f"多交易对分析流程启动 - {timeframe_name}, 共 {len(use_symbols)} 个交易对")
+    print("=" * 50)
+
+    # 1. 并发抓取 (I/O密集，使用线程)
+    fetch_start = time.perf_counter()
+    if fetch:
+        from binance_client import fetch_and_save_symbols
+        raw_paths = fetch_and_save_symbols(use_symbols, timeframe_config['interval'], timeframe_config['limit'],
+                                           timeframe_name)
+        ready = list(raw_paths)
+    else:
+        ready = [s for s in use_symbols if frame_exists(DATA_DIR / get_filenames(timeframe_name, s)['raw'])]
+    fetch_seconds = time.perf_counter() - fetch_start
+
+    if not ready:
+        print("❌ 没有可用的原始数据")
+        return None
+
+    # 2. 指标/组合/报告 (CPU密集，按交易对分配到进程池)
+    workers = min(max_workers or PIPELINE_MAX_WORKERS or os.cpu_count() or 1, len(ready))
+    print(f"⚙️ 使用 {workers} 个进程计算 {len(ready)} 个交易对...")
+    compute_start = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(analyze_symbol, symbol, timeframe_name, timeframe_config['interval']): symbol for symbol in ready}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'symbol': symbol, 'error': str(e)}
+            results[symbol] = result
+            if 'error' in result:
+                print(f"⚠️ {symbol} 处理失败: {result['error']}")
+                if result.get('log'):
+                    print(result['log'])
+            else:
+                print(f"✅ {symbol} 完成 ({result['seconds']:.2f}秒): {result.get('综合信号', '')}")
+    compute_seconds = time.perf_counter() - compute_start
+
+    # 3. 汇总
+    rows = [results[symbol] for symbol in use_symbols if symbol in results]
+    summary = pd.DataFrame(rows).drop(columns=['log'], errors='ignore')
+    summary_path = DATA_DIR / get_summary_filename(timeframe_name)
+    summary.to_csv(summary_path, encoding='utf-8-sig', index=False)
+
+    succeeded = [row for row in rows if 'error' not in row]
+    print("\n" + "=" * 50)
+    print(f"多交易对{timeframe_name}汇总 ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})")
+    print(f"成功 {len(succeeded)}/{len(use_symbols)} 个 | 抓取 {fetch_seconds:.2f}秒 | "
+          f"计算 {compute_seconds:.2f}秒 ({workers}进程)")
+    for row in succeeded:
+        print(f"● {row['symbol']:<12} 收盘价 {row.get('收盘价', float('nan')):>12.4f}  "
+              f"RSI {row.get('RSI', float('nan')):>6.2f}  {row.get('综合信号', '')}")
+    print(f"汇总文件: {summary_path}")
+    print("=" * 50)
+    return summary_path if succeeded else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多交易对分析流水线")
+    parser.add_argument('--symbols', default=','.join(SYMBOLS), help="逗号分隔的交易对列表")
+    parser.add_argument('--timeframe', default='4', choices=sorted(TIMEFRAME_OPTIONS), help="时间周期编号 (同 main.py)")
+    parser.add_argument('--workers', type=int, default=None, help="进程池大小 (默认CPU核数)")
+    parser.add_argument('--no-fetch', action='store_true', help="跳过抓取，使用当天已保存的原始数据")
+    args = parser.parse_args()
+
+    run_multi_symbol_pipeline(
+        symbols=[s.strip().upper() for s in args.symbols.split(',') if s.strip()],
+        timeframe_config=TIMEFRAME_OPTIONS[args.timeframe],
+        max_workers=args.workers,
+        fetch=not args.no_fetch,
+    )
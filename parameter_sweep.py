@@ -0,0 +1,549 @@
+"""
+指标参数扫描模块
+功能：对同一段K线一次计算一整组参数 (如 MA 周期 5~200、布林带 周期×标准差倍数) 的指标，
+      每个指标族返回 (参数组数 × K线数) 的二维数组，用于调整 config.TIMEFRAME_INDICATOR_PARAMS 中的周期
+说明：
+    - 只随价格序列变化的中间结果 (累积和、平方累积和、涨跌幅) 在 SweepSeries 中只计算一次，所有参数组共用；
+      SMA/布林带由累积和相减得到任意周期的滑动窗口和，每组 O(K线数)
+    - EMA/MACD/RSI 的递推：指标后端为 TA-Lib 时逐个周期调用 TA-Lib (C 循环比矩阵乘法快得多)；
+      纯NumPy后端时按线性递推分块求解：块内部分和为一次批量矩阵乘法，块之间只传递块末的值，
+      所有参数组同时计算 (Python 循环次数为 K线数/64，与参数组数无关)
+    - 布林带在 TA-Lib 后端下同样逐个周期调用 TA-Lib，不同标准差倍数共用一次计算
+    - 重复的参数组合只计算一次 (如缩放后落到同一周期的候选值)
+    - 输出与 TA-Lib 一致 (初值规则相同，预热期为 NaN)；累积和相减带来约 1e-10 的相对误差
+    - 参数组分批计算，每批的中间数组不超过 config.SWEEP_CHUNK_BYTES；iter_sweep 逐批返回结果，总内存也有上限
+用法：python parameter_sweep.py  (与 TA-Lib 逐组计算的结果对比，并与逐组循环比较耗时)
+"""
+
+import itertools
+import time
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from config import SWEEP_CHUNK_BYTES
+except ImportError:
+    SWEEP_CHUNK_BYTES = 256 * 1024 * 1024
+
+# 参数字典中的周期参数 → indicator_periods 中对应的实际周期
+PARAM_PERIOD_KEYS = {
+    'MA_SHORT_TERM': 'ma_short',
+    'MA_MEDIUM_TERM': 'ma_medium',
+    'MA_LONG_TERM': 'ma_long',
+    'MACD_FAST': 'macd_fast',
+    'MACD_SLOW': 'macd_slow',
+    'MACD_SIGNAL': 'macd_signal',
+    'RSI_PERIOD': 'rsi_period',
+    'RSI_LONG': 'rsi_long',
+    'BB_PERIOD': 'bb_period',
+    'BB_STD_DEV': 'bb_std_dev',
+    'BB_LONG_PERIOD': 'bb_long_period',
+}
+
+
+class SweepSeries:
+    """
+    一段收盘价及其在各参数组之间共用的预计算结果 (首次使用时计算并缓存)
+    参数:
+        close: 收盘价数组 (不能含 NaN，可先用 ta_calculator.convert_data_types 清理)
+    说明：累积和基于减去均值后的价格，减小大数相减的舍入误差
+    """
+
+    def __init__(self, close):
+        close = np.ascontiguousarray(close, dtype=np.float64)
+        if np.isnan(close).any():
+            raise ValueError("收盘价中不能有 NaN")
+        self.close = close
+        self.offset = float(close.mean()) if len(close) else 0.0
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.close)
+
+    def _get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def cumsum(self):
+        """去均值收盘价的累积和 (首位补0)"""
+        return self._get('cumsum', lambda: _padded_cumsum(self.close - self.offset))
+
+    @property
+    def gains(self):
+        """按收盘价位置对齐的上涨幅度 (第0位为 NaN)"""
+        return self._get('gains', lambda: self._moves()[0])
+
+    @property
+    def losses(self):
+        """按收盘价位置对齐的下跌幅度 (第0位为 NaN)"""
+        return self._get('losses', lambda: self._moves()[1])
+
+    def _moves(self):
+        diff = np.concatenate(([np.nan], np.diff(self.close)))
+        return np.where(diff < 0, 0.0, diff), np.where(diff < 0, -diff, 0.0)
+
+    def window_stats(self, period):
+        """
+        某个周期的滑动窗口均值和标准差 (同 talib.BBANDS 的中轨和标准差：方差小于 1e-8 时标准差为 0)
+        返回:
+            tuple: (均值, 标准差)，从第 period 根K线开始，长度为 K线数 - period + 1
+        说明：全序列平方和的累积和在价格偏离均值较远时会吞掉窗口内的小方差，因此按块分段：
+              每块 (加上前面 period-1 根) 减去块首价格后各自求累积和，每个窗口都落在某一块内；
+              方差小到与舍入误差相当的窗口 (如价格不变的一段) 再按定义逐个窗口重算
+        """
+        close, windows = self.close, len(self.close) - period + 1
+        block = max(64, 4 * period)
+        length = block + period - 1
+        padded = np.concatenate((close, np.full(length, close[-1])))
+        rows = sliding_window_view(padded, length)[np.arange(0, windows, block)]
+        base = rows[:, :1]
+        deviation = rows - base
+        squares = deviation * deviation
+        cumsum = _padded_cumsum(deviation, axis=1)
+        cumsum_sq = _padded_cumsum(squares, axis=1)
+        mean = (cumsum[:, period:period + block] - cumsum[:, :block]) / period
+        variance = (cumsum_sq[:, period:period + block] - cumsum_sq[:, :block]) / period - mean * mean
+        # 块内平方累积和的上界 × 1e-12 (约为双精度舍入误差的几千倍)
+        tolerance = squares.max(axis=1, keepdims=True) * (length * 1e-12)
+        uncertain = np.flatnonzero((variance < tolerance).ravel()[:windows])
+        mean, variance = (mean + base).ravel()[:windows], variance.ravel()[:windows]
+        if len(uncertain):
+            exact = sliding_window_view(close, period)[uncertain]
+            variance[uncertain] = ((exact - exact.mean(axis=1, keepdims=True)) ** 2).mean(axis=1)
+        stddev = np.where(variance < 0.00000001, 0.0, np.sqrt(np.maximum(variance, 0.0)))
+        return mean, stddev
+
+    def window_mean(self, periods, ends):
+        """
+        各组以 ends 结尾、长度为 periods 的窗口均值
+        参数:
+            periods/ends: 等长整数数组；窗口超出数据范围的组为 NaN
+        """
+        return _window_sum(self.cumsum, periods, ends) / periods + self.offset
+
+
+def _padded_cumsum(values, axis=-1):
+    values = np.asarray(values, dtype=np.float64)
+    pad = [(0, 0)] * values.ndim
+    pad[axis] = (1, 0)
+    return np.pad(np.cumsum(values, axis=axis), pad)
+
+
+def _window_sum(cumsum, periods, ends):
+    """由 (首位补0的) 累积和求各组窗口和；cumsum 为一维 (各组共用) 或 (组数, K线数+1)"""
+    n = cumsum.shape[-1] - 1
+    valid = (ends < n) & (ends + 1 >= periods)
+    upper = np.where(valid, ends + 1, 0)
+    lower = np.where(valid, ends + 1 - periods, 0)
+    if cumsum.ndim == 1:
+        total = cumsum[upper] - cumsum[lower]
+    else:
+        rows = np.arange(len(periods))
+        total = cumsum[rows, upper] - cumsum[rows, lower]
+    return np.where(valid, total, np.nan)
+
+
+def _as_series(close):
+    return close if isinstance(close, SweepSeries) else SweepSeries(close)
+
+
+def _as_grid(*grids):
+    """参数网格 → 等长数组 (标量广播到所有组)"""
+    arrays = np.broadcast_arrays(*[np.atleast_1d(np.asarray(grid)) for grid in grids])
+    return [np.array(array) for array in arrays]
+
+
+def _distinct(*grids):
+    """
+    重复的参数组合只算一次
+    返回:
+        tuple: (各组合首次出现的组下标, 每组对应的首次出现组下标)
+    """
+    stacked = np.column_stack([np.asarray(grid, dtype=np.float64) for grid in grids])
+    _, first, inverse = np.unique(stacked, axis=0, return_index=True, return_inverse=True)
+    return np.sort(first), first[inverse.ravel()]
+
+
+def _fill_duplicates(outputs, source):
+    """把首次出现组的结果复制到重复的组"""
+    duplicates = np.flatnonzero(source != np.arange(len(source)))
+    if len(duplicates):
+        for out in outputs:
+            out[duplicates] = out[source[duplicates]]
+
+
+def _batches(rows, n_bars, arrays_per_row):
+    """把需要计算的组下标分批，每批的中间数组总大小不超过 SWEEP_CHUNK_BYTES"""
+    size = max(1, SWEEP_CHUNK_BYTES // max(1, n_bars * 8 * arrays_per_row))
+    return [rows[start:start + size] for start in range(0, len(rows), size)]
+
+
+def linear_recursion(inputs, decay, block=64):
+    """
+    各组同时求解 y[t] = decay * y[t-1] + inputs[t] (y[-1] = 0)
+    参数:
+        inputs: (组数, K线数)；decay: 各组系数 (0~1)
+    说明：按 block 根K线分块，块内的部分和是一次批量矩阵乘法 (inputs 块 × decay 幂次构成的下三角矩阵)，
+          再逐块把上一块末尾的值按 decay 的幂次传进来；Python 循环次数为 K线数/block
+    """
+    rows, n = inputs.shape
+    n_blocks = -(-n // block)
+    padded = np.zeros((rows, n_blocks * block))
+    padded[:, :n] = inputs
+    powers = decay[:, None] ** np.arange(block + 1)
+    lag = np.arange(block)[:, None] - np.arange(block)[None, :]
+    kernel = np.where(lag >= 0, powers[:, np.maximum(lag, 0)], 0.0)
+    partial = np.matmul(padded.reshape(rows, n_blocks, block), kernel.transpose(0, 2, 1))
+
+    carry = np.empty((rows, n_blocks))
+    prev = np.zeros(rows)
+    block_decay = powers[:, block]
+    for index in range(n_blocks):
+        carry[:, index] = prev
+        prev = partial[:, index, -1] + block_decay * prev
+    result = partial + powers[:, None, 1:] * carry[:, :, None]
+    return result.reshape(rows, -1)[:, :n]
+
+
+def smooth(values, decay, weight, starts, seeds):
+    """
+    从各组的初值位置开始平滑：y[start] = seed，之后 y[t] = decay * y[t-1] + weight * values[t]
+    参数:
+        values: 一维 (各组共用) 或 (组数, K线数)
+        decay/weight/starts/seeds: 各组的系数、初值位置和初值
+    返回:
+        ndarray: (组数, K线数)，初值之前为 NaN
+    """
+    n = values.shape[-1]
+    t = np.arange(n)[None, :]
+    starts, seeds = starts[:, None], seeds[:, None]
+    with np.errstate(invalid='ignore'):
+        inputs = np.where(t > starts, weight[:, None] * values, np.where(t == starts, seeds, 0.0))
+    result = linear_recursion(inputs, decay)
+    result[t < starts] = np.nan
+    return result
+
+
+def _talib_backend(backend):
+    """
+    逐个周期调用的 TA-Lib 后端
+    参数:
+        backend: 指标计算后端 (indicator_backend.get_indicator_backend)，默认按 config.INDICATOR_BACKEND 选择
+    返回:
+        TalibBackend 或 None (纯NumPy后端，各参数组一起分块求解)
+    """
+    if backend is None:
+        from indicator_backend import get_indicator_backend
+        backend = get_indicator_backend()
+    return backend if backend.name == 'talib' else None
+
+
+def _ema(values, periods, starts, seeds):
+    k = 2.0 / (periods + 1)
+    return smooth(values, 1.0 - k, k, starts, seeds)
+
+
+# ===== 各指标族 =====
+def sweep_ma(close, periods):
+    """
+    一组周期的简单移动平均 (同 talib.MA)
+    参数:
+        close: 收盘价数组或 SweepSeries
+        periods: 周期数组
+    返回:
+        ndarray: (周期数, K线数)
+    """
+    series = _as_series(close)
+    periods, = _as_grid(periods)
+    periods = periods.astype(np.int64)
+    rows, source = _distinct(periods)
+    cumsum, n = series.cumsum, len(series)
+    out = np.full((len(periods), n), np.nan)
+    for row in rows:
+        period = periods[row]
+        if 1 <= period <= n:
+            out[row, period - 1:] = (cumsum[period:] - cumsum[:n + 1 - period]) / period + series.offset
+    _fill_duplicates([out], source)
+    return out
+
+
+def sweep_ema(close, periods, backend=None):
+    """
+    一组周期的指数移动平均 (同 talib.EMA：以前 period 个值的 SMA 作为初值)
+    参数:
+        backend: 指标计算后端，默认按 config.INDICATOR_BACKEND 选择
+    返回:
+        ndarray: (周期数, K线数)
+    """
+    series = _as_series(close)
+    periods, = _as_grid(periods)
+    periods = periods.astype(np.int64)
+    rows, source = _distinct(periods)
+    talib_backend = _talib_backend(backend)
+    if talib_backend is not None:
+        # TA-Lib 的输出含预热期 NaN，每组整行写入，不需要先填 NaN；matype=1 为 EMA
+        out = np.empty((len(periods), len(series)))
+        for row in rows:
+            out[row] = talib_backend.MA(series.close, timeperiod=int(periods[row]), matype=1)
+    else:
+        out = np.full((len(periods), len(series)), np.nan)
+        for batch in _batches(rows, len(series), 4):
+            starts = periods[batch] - 1
+            out[batch] = _ema(series.close, periods[batch], starts, series.window_mean(periods[batch], starts))
+    _fill_duplicates([out], source)
+    return out
+
+
+def sweep_rsi(close, periods, backend=None):
+    """
+    一组周期的RSI (同 talib.RSI：前 period 个涨跌幅的平均作为初值，之后 Wilder 平滑)
+    参数:
+        backend: 指标计算后端，默认按 config.INDICATOR_BACKEND 选择
+    返回:
+        ndarray: (周期数, K线数)
+    """
+    series = _as_series(close)
+    periods, = _as_grid(periods)
+    periods = periods.astype(np.int64)
+    rows, source = _distinct(periods)
+    n = len(series)
+    talib_backend = _talib_backend(backend)
+    if talib_backend is not None:
+        out = np.empty((len(periods), n))
+        for row in rows:
+            out[row] = talib_backend.RSI(series.close, timeperiod=int(periods[row]))
+        _fill_duplicates([out], source)
+        return out
+
+    out = np.full((len(periods), n), np.nan)
+    gain_cumsum = series._get('gain_cumsum', lambda: _padded_cumsum(np.nan_to_num(series.gains)))
+    loss_cumsum = series._get('loss_cumsum', lambda: _padded_cumsum(np.nan_to_num(series.losses)))
+    for batch in _batches(rows, n, 8):
+        # 第 period 根K线处的初值 (前 period 个涨跌幅的平均，涨跌幅从第1根开始)
+        starts = periods[batch]
+        period = starts.astype(np.float64)
+        decay, weight = (period - 1) / period, 1.0 / period
+        gain = smooth(series.gains, decay, weight, starts, _window_sum(gain_cumsum, starts, starts) / period)
+        loss = smooth(series.losses, decay, weight, starts, _window_sum(loss_cumsum, starts, starts) / period)
+        total = gain + loss
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[batch] = np.where(np.abs(total) < 0.00000001, 0.0, 100.0 * (gain / total))
+    _fill_duplicates([out], source)
+    return out
+
+
+def sweep_bbands(close, periods, nbdev=2.0, backend=None):
+    """
+    一组 (周期, 标准差倍数) 的布林带 (同 talib.BBANDS，nbdevup = nbdevdn = nbdev)
+    参数:
+        periods/nbdev: 等长数组或标量 (标量广播到所有组)
+        backend: 指标计算后端，默认按 config.INDICATOR_BACKEND 选择
+    返回:
+        dict: {'upper'/'middle'/'lower': (参数组数, K线数)}
+    说明：中轨和标准差按周期计算一次，不同倍数共用
+    """
+    series = _as_series(close)
+    periods, nbdev = _as_grid(periods, nbdev)
+    periods, nbdev = periods.astype(np.int64), nbdev.astype(np.float64)
+    n = len(series)
+
+    outputs = {name: np.full((len(periods), n), np.nan) for name in ('upper', 'middle', 'lower')}
+    talib_backend = _talib_backend(backend)
+    for period in np.unique(periods):
+        if not 1 <= period <= n:
+            continue
+        if talib_backend is not None:
+            # 倍数为 1 时上轨 = 中轨 + 标准差
+            upper, middle, _ = talib_backend.BBANDS(series.close, timeperiod=int(period), nbdevup=1.0, nbdevdn=1.0)
+            middle, stddev = middle[period - 1:], upper[period - 1:] - middle[period - 1:]
+        else:
+            middle, stddev = series.window_stats(period)
+        for row in np.flatnonzero(periods == period):
+            width = stddev * nbdev[row]
+            outputs['middle'][row, period - 1:] = middle
+            outputs['upper'][row, period - 1:] = middle + width
+            outputs['lower'][row, period - 1:] = middle - width
+    return outputs
+
+
+def sweep_macd(close, fast, slow, signal, backend=None):
+    """
+    一组 (快线, 慢线, 信号线) 周期的MACD (同 talib.MACD)
+    参数:
+        fast/slow/signal: 等长数组或标量，可用 parameter_grid 生成全部组合
+        backend: 指标计算后端，默认按 config.INDICATOR_BACKEND 选择
+    返回:
+        dict: {'macd'/'signal'/'hist': (参数组数, K线数)}
+    说明：TA-Lib 方式 —— 快线、慢线都在第 slow 根K线开始，快线初值为此时最近 fast 根收盘价的平均；
+          信号线为 MACD 线的 EMA，三条线在信号线预热完成后同时输出
+    """
+    series = _as_series(close)
+    fast, slow, signal = [grid.astype(np.int64) for grid in _as_grid(fast, slow, signal)]
+    fast, slow = np.minimum(fast, slow), np.maximum(fast, slow)
+    rows, source = _distinct(fast, slow, signal)
+    n = len(series)
+
+    talib_backend = _talib_backend(backend)
+    if talib_backend is not None:
+        outputs = {name: np.empty((len(fast), n)) for name in ('macd', 'signal', 'hist')}
+        for row in rows:
+            lines = talib_backend.MACD(series.close, fastperiod=int(fast[row]), slowperiod=int(slow[row]),
+                                       signalperiod=int(signal[row]))
+            for name, line in zip(('macd', 'signal', 'hist'), lines):
+                outputs[name][row] = line
+        _fill_duplicates(outputs.values(), source)
+        return outputs
+
+    outputs = {name: np.full((len(fast), n), np.nan) for name in ('macd', 'signal', 'hist')}
+    for batch in _batches(rows, n, 12):
+        start = slow[batch] - 1
+        fast_ema = _ema(series.close, fast[batch], start, series.window_mean(fast[batch], start))
+        slow_ema = _ema(series.close, slow[batch], start, series.window_mean(slow[batch], start))
+        macd = fast_ema - slow_ema
+
+        # 信号线：以 MACD 线前 signal 个值的平均为初值
+        signal_start = start + signal[batch] - 1
+        macd_cumsum = _padded_cumsum(np.nan_to_num(macd), axis=1)
+        signal_seed = _window_sum(macd_cumsum, signal[batch], signal_start) / signal[batch]
+        signal_line = _ema(macd, signal[batch], signal_start, signal_seed)
+
+        macd[np.arange(n)[None, :] < signal_start[:, None]] = np.nan
+        outputs['macd'][batch] = macd
+        outputs['signal'][batch] = signal_line
+        outputs['hist'][batch] = macd - signal_line
+    _fill_duplicates(outputs.values(), source)
+    return outputs
+
+
+# ===== 参数网格 =====
+def parameter_grid(**axes):
+    """
+    参数的全部组合 (笛卡尔积)
+    例: parameter_grid(fast=range(5, 13), slow=range(13, 35), signal=[5, 9])
+    返回:
+        dict: {参数名: 等长数组}，可直接作为 sweep_* 的关键字参数
+    """
+    names = list(axes)
+    combos = list(itertools.product(*[list(values) for values in axes.values()]))
+    return {name: np.array([combo[i] for combo in combos]) for i, name in enumerate(names)}
+
+
+def scale_periods(values, factor, minimum):
+    """按激进模式的规则缩放周期：max(minimum, int(value × factor))，用于比较不同的缩放系数"""
+    return np.maximum(minimum, (np.asarray(values) * factor).astype(np.int64))
+
+
+def effective_periods(param, values, params=None):
+    """
+    参数字典中某个参数的候选值 → compute_ta_indicators 实际使用的周期 (含 indicator_periods 中的缩放规则)
+    参数:
+        param: 参数名，见 PARAM_PERIOD_KEYS (如 'MA_SHORT_TERM')
+        values: 候选值
+        params: 其余参数 (如 get_timeframe_params 的结果)
+    例: effective_periods('MA_SHORT_TERM', range(5, 40)) → MA 短期实际周期 (×0.7，不少于5)
+    """
+    from ta_calculator import indicator_periods
+
+    key = PARAM_PERIOD_KEYS[param]
+    return np.array([indicator_periods({**(params or {}), param: value})[key] for value in values])
+
+
+def iter_sweep(sweep, close, *grids, chunk_rows=None, **kwargs):
+    """
+    分批运行 sweep_* (所有批次共用同一个 SweepSeries 的预计算结果)，逐批返回，内存占用与参数组总数无关
+    参数:
+        sweep: sweep_ma / sweep_ema / sweep_rsi / sweep_bbands / sweep_macd
+        grids/kwargs: 传给 sweep 的参数网格 (等长数组或标量)
+        chunk_rows: 每批参数组数，默认按 SWEEP_CHUNK_BYTES 估算
+        backend: 指标计算后端 (关键字参数)，传给 sweep
+    返回:
+        generator: (slice, 该批结果)
+    例:
+        for rows, rsi in iter_sweep(sweep_rsi, close, range(5, 500)):
+            scores[rows] = evaluate(rsi)
+    """
+    series = _as_series(close)
+    options = {'backend': kwargs.pop('backend')} if 'backend' in kwargs else {}
+    names = list(kwargs)
+    arrays = _as_grid(*grids, *kwargs.values())
+    chunk_rows = chunk_rows or max(1, SWEEP_CHUNK_BYTES // max(1, len(series) * 8 * 12))
+    for start in range(0, len(arrays[0]), chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        batch = [array[rows] for array in arrays]
+        yield rows, sweep(series, *batch[:len(grids)], **dict(zip(names, batch[len(grids):])), **options)
+
+
+# ===== 基准与校验 =====
+def _best_time(func, repeat):
+    """多次运行取最短耗时，返回 (结果, 秒)"""
+    best = float('inf')
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - begin)
+    return result, best
+
+
+def _stack_lines(result):
+    """
+    扫描结果 / TA-Lib 逐组结果 → (线数, 参数组数, K线数)
+    参数:
+        result: 二维数组、各条线的字典，或 TA-Lib 逐组返回的 (各条线) 元组列表
+    """
+    if isinstance(result, dict):
+        return np.array(list(result.values()))
+    if isinstance(result, list):
+        return np.array(list(zip(*result)))
+    return result if result.ndim == 3 else result[None]
+
+
+def _benchmark(n_bars=100_000, repeat=3):
+    """
+    与 TA-Lib 逐组计算的结果对比并统计耗时
+    说明：对照为逐个参数组调用一次 TA-Lib，结果拼成与扫描相同的 (参数组数 × K线数) 数组 (布林带、MACD 三条线都保留)；
+          扫描分别用 TA-Lib 后端和纯NumPy后端各运行一次
+    """
+    import talib
+    from indicator_backend import NumpyBackend, TalibBackend
+    from indicator_benchmark import synthetic_frame
+
+    close = synthetic_frame(n_bars)['收盘价'].to_numpy(dtype=np.float64)
+    series = SweepSeries(close)
+    macd_grid = parameter_grid(fast=range(5, 13), slow=range(13, 35, 3), signal=[5, 9])
+    bb_grid = parameter_grid(periods=range(10, 60), nbdev=[1.8, 2.0, 2.5, 3.0])
+    cases = [
+        ('MA', lambda backend: sweep_ma(series, np.arange(3, 303)),
+         lambda: np.array([talib.MA(close, timeperiod=p) for p in range(3, 303)])),
+        ('EMA', lambda backend: sweep_ema(series, np.arange(3, 103), backend=backend),
+         lambda: np.array([talib.EMA(close, timeperiod=p) for p in range(3, 103)])),
+        ('RSI', lambda backend: sweep_rsi(series, np.arange(5, 105), backend=backend),
+         lambda: np.array([talib.RSI(close, timeperiod=p) for p in range(5, 105)])),
+        ('BBANDS', lambda backend: sweep_bbands(series, **bb_grid, backend=backend),
+         lambda: _stack_lines([talib.BBANDS(close, timeperiod=int(p), nbdevup=float(d), nbdevdn=float(d))
+                               for p, d in zip(bb_grid['periods'], bb_grid['nbdev'])])),
+        ('MACD', lambda backend: sweep_macd(series, **macd_grid, backend=backend),
+         lambda: _stack_lines([talib.MACD(close, fastperiod=int(f), slowperiod=int(s), signalperiod=int(g))
+                               for f, s, g in zip(macd_grid['fast'], macd_grid['slow'], macd_grid['signal'])])),
+    ]
+
+    print(f"参数扫描 vs TA-Lib 逐组循环 ({n_bars:,} 根K线，{repeat} 次取最短)")
+    for name, sweep, reference in cases:
+        expected, loop_seconds = _best_time(reference, repeat)
+        expected = _stack_lines(expected)
+        timings, worst = [], 0.0
+        for backend in (TalibBackend(), NumpyBackend()):
+            result, seconds = _best_time(lambda: sweep(backend), repeat)
+            result = _stack_lines(result)
+            assert np.array_equal(np.isnan(result), np.isnan(expected)), f"{name} 预热期不一致"
+            valid = ~np.isnan(expected)
+            error = np.abs(result[valid] - expected[valid]) / np.maximum(np.abs(expected[valid]), 1.0)
+            timings.append(seconds)
+            worst = max(worst, float(error.max()))
+        print(f"● {name}: {expected.shape[-2]} 组参数，TA-Lib 逐组循环 {loop_seconds:.2f}秒，"
+              f"扫描 {timings[0]:.2f}秒 (纯NumPy后端 {timings[1]:.2f}秒)，最大相对误差 {worst:.1e}")
+
+
+if __name__ == "__main__":
+    _benchmark()
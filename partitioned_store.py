@@ -0,0 +1,202 @@
+"""
+分区数据集模块
+功能：按 数据集/交易对/K线间隔/年-月 分区保存各阶段数据，每个分区只有一份规范数据，
+      并用 manifest.json 记录每个分区覆盖的时间范围
+说明：
+    - 目录结构: data/datasets/{raw|indicators|combined}/{symbol}/{interval}/{YYYY-MM}.feather
+    - 写入时按 open_time 所在月份拆分，与分区中已有数据合并 (同一根K线以新数据为准，
+      新数据中为空的值保留已有值，避免指标预热期的 NaN 覆盖之前算好的结果)
+    - 读取时先查 manifest，只打开与查询时间范围相交的分区
+    - 分区文件格式同 frame_storage (config.STORAGE_FORMAT)
+"""
+
+import json
+import threading
+import numpy as np
+import pandas as pd
+from config import get_dataset_dir
+from frame_storage import save_frame, load_frame, find_frame
+from signal_labels import encode_signals
+
+DATASETS = ('raw', 'indicators', 'combined')
+MANIFEST_NAME = 'manifest.json'
+
+_manifest_lock = threading.Lock()
+
+
+def _to_ms(value):
+    """datetime/字符串/毫秒时间戳 → 毫秒"""
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(pd.Timestamp(value).value // 1_000_000)
+
+
+class PartitionedDataset:
+    """
+    单个 (数据集, 交易对, K线间隔) 的分区存储
+    参数:
+        dataset: 'raw' / 'indicators' / 'combined'
+    """
+
+    def __init__(self, dataset, symbol, interval, root=None):
+        if dataset not in DATASETS:
+            raise ValueError(f"不支持的数据集: {dataset} (可选: {', '.join(DATASETS)})")
+        self.dataset = dataset
+        self.symbol = symbol
+        self.interval = interval
+        self.directory = (root or get_dataset_dir()) / dataset / symbol / interval
+        self.manifest_path = self.directory / MANIFEST_NAME
+
+    # ===== manifest =====
+    def manifest(self):
+        """
+        返回:
+            dict: {分区名(YYYY-MM): {'start': 首根open_time(毫秒), 'end': 末根open_time(毫秒), 'rows': 行数}}
+        """
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)['partitions']
+
+    def _save_manifest(self, partitions):
+        # 先写临时文件再替换，读取方不会看到写了一半的 manifest
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'dataset': self.dataset, 'symbol': self.symbol, 'interval': self.interval,
+                       'partitions': dict(sorted(partitions.items()))}, f, indent=1)
+        tmp_path.replace(self.manifest_path)
+
+    def ranges(self):
+        """
+        可用的连续时间范围 (相邻分区首尾相接时合并)
+        返回:
+            list: [(start_ms, end_ms), ...]
+        """
+        from config import interval_to_milliseconds
+
+        step = interval_to_milliseconds(self.interval)
+        merged = []
+        for entry in self.manifest().values():
+            if merged and entry['start'] <= merged[-1][1] + step:
+                merged[-1][1] = max(merged[-1][1], entry['end'])
+            else:
+                merged.append([entry['start'], entry['end']])
+        return [tuple(item) for item in merged]
+
+    def partitions_for(self, start=None, end=None):
+        """与 [start, end] 相交的分区名 (只根据 manifest 判断，不打开数据文件)"""
+        start_ms, end_ms = _to_ms(start), _to_ms(end)
+        return [key for key, entry in self.manifest().items()
+                if (start_ms is None or entry['end'] >= start_ms) and (end_ms is None or entry['start'] <= end_ms)]
+
+    def _partition_path(self, key):
+        return self.directory / f"{key}.csv"  # 逻辑路径，实际后缀由 frame_storage 决定
+
+    # ===== 写入 =====
+    def write(self, df):
+        """
+        把 DataFrame 按月份写入分区 (open_time 为索引或普通列均可)
+        返回:
+            list: 被更新的分区名
+        """
+        if 'open_time' in df.columns:
+            df = df.set_index('open_time')
+        if df.empty:
+            return []
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+        months = df.index.values.astype('datetime64[M]')  # 分区键: UTC 年-月
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with _manifest_lock:
+            partitions = self.manifest()
+            updated = []
+            for month, part in df.groupby(months, sort=True):
+                key = str(np.datetime64(month, 'M'))
+                path = self._partition_path(key)
+                if find_frame(path) is not None:
+                    part = _merge(load_frame(path), part)
+                save_frame(part, path)
+                part_times = part.index.values.astype('datetime64[ms]').astype(np.int64)
+                partitions[key] = {'start': int(part_times[0]), 'end': int(part_times[-1]), 'rows': len(part)}
+                updated.append(key)
+            self._save_manifest(partitions)
+        return updated
+
+    # ===== 读取 =====
+    def read(self, start=None, end=None):
+        """
+        读取 open_time 落在 [start, end] 内的数据 (只打开相交的分区)
+        参数:
+            start/end: datetime、字符串或毫秒时间戳，None 表示不限
+        返回:
+            DataFrame: 以 open_time 为索引，信号列为编码 (见 signal_labels)；没有数据时为空 DataFrame
+        """
+        keys = self.partitions_for(start, end)
+        if not keys:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='open_time'))
+        df = pd.concat([encode_signals(load_frame(self._partition_path(key))) for key in keys])
+        start_ms, end_ms = _to_ms(start), _to_ms(end)
+        if start_ms is not None or end_ms is not None:
+            open_times = df.index.values.astype('datetime64[ms]').astype(np.int64)
+            mask = np.ones(len(df), dtype=bool)
+            if start_ms is not None:
+                mask &= open_times >= start_ms
+            if end_ms is not None:
+                mask &= open_times <= end_ms
+            df = df[mask]
+        return df
+
+    def __repr__(self):
+        ranges = ', '.join(f"{np.datetime64(s, 'ms')}~{np.datetime64(e, 'ms')}" for s, e in self.ranges())
+        return f"PartitionedDataset({self.dataset}/{self.symbol}/{self.interval}: {ranges or '空'})"
+
+
+def _merge(existing, new):
+    """
+    合并分区已有数据和新数据：同一 open_time 以新数据为准，新数据中的空值用已有值补齐
+    说明：以标签保存的信号列 (旧版本分区、CSV 读出的数据) 先转换为编码，合并后类型一致
+    """
+    new = encode_signals(new[~new.index.duplicated(keep='last')])
+    existing = encode_signals(existing[~existing.index.duplicated(keep='last')])
+    merged = new.combine_first(existing)
+    columns = list(new.columns) + [col for col in existing.columns if col not in new.columns]
+    merged = merged[columns]
+    merged.index.name = new.index.name or existing.index.name
+    return merged
+
+
+def write_dataset(dataset, df, symbol, interval):
+    """把某个阶段的数据写入分区数据集 (供各阶段保存函数调用)"""
+    updated = PartitionedDataset(dataset, symbol, interval).write(df)
+    if updated:
+        print(f"🗂️ {dataset}/{symbol}/{interval} 已更新分区: {', '.join(updated)}")
+    return updated
+
+
+def read_dataset(dataset, symbol, interval, start=None, end=None):
+    """读取分区数据集中 [start, end] 范围内的数据"""
+    return PartitionedDataset(dataset, symbol, interval).read(start, end)
+
+
+def list_datasets(root=None):
+    """
+    列出所有分区数据集及其可用时间范围
+    返回:
+        list: [PartitionedDataset, ...]
+    """
+    root = root or get_dataset_dir()
+    result = []
+    for manifest_path in sorted(root.glob(f"*/*/*/{MANIFEST_NAME}")):
+        interval_dir = manifest_path.parent
+        dataset, symbol, interval = interval_dir.parent.parent.name, interval_dir.parent.name, interval_dir.name
+        if dataset in DATASETS:
+            result.append(PartitionedDataset(dataset, symbol, interval, root))
+    return result
+
+
+if __name__ == "__main__":
+    print("分区数据集")
+    for item in list_datasets():
+        print(f"● {item}")
@@ -0,0 +1,145 @@
+"""
+币安请求权重限流模块
+功能：按接口权重从令牌桶扣减额度，根据响应头 X-MBX-USED-WEIGHT-1M 与服务器同步已用权重
+说明：默认在进程内的多线程间共享；配置 RATE_LIMIT_STATE_FILE 后通过本地文件锁在多个进程间共享
+参考：https://developers.binance.com/docs/derivatives/usds-margined-futures/general-info#limits
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl  # 仅类Unix系统可用，用于跨进程文件锁
+except ImportError:
+    fcntl = None
+
+from config import BINANCE_WEIGHT_LIMIT_PER_MINUTE, RATE_LIMIT_SAFETY_RATIO, RATE_LIMIT_STATE_FILE
+
+# 固定权重的接口 (klines 的权重随 limit 变化，见 klines_weight)
+ENDPOINT_WEIGHTS = {
+    '/fapi/v1/time': 1,
+    '/fapi/v1/ping': 1,
+    '/fapi/v1/exchangeInfo': 1,
+}
+
+
+def klines_weight(limit):
+    """/fapi/v1/klines 的请求权重 (随 limit 分档)"""
+    limit = limit or 500  # 币安默认 limit=500
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class WeightRateLimiter:
+    """
+    基于请求权重的令牌桶限流器
+    - 容量为每分钟权重上限 × 安全系数，按秒匀速补充
+    - acquire() 在额度不足时只等待恰好补足所需的时间
+    - sync_used_weight() 用服务器返回的已用权重校正本地额度
+    - penalize() 在收到 429/418 时按 Retry-After 暂停所有调用方
+    """
+
+    def __init__(self, weight_limit=None, safety_ratio=None, state_file=None):
+        self.capacity = (weight_limit or BINANCE_WEIGHT_LIMIT_PER_MINUTE) * (safety_ratio or RATE_LIMIT_SAFETY_RATIO)
+        self.refill_per_second = self.capacity / 60.0
+        self.state_file = state_file
+        if self.state_file is not None and fcntl is None:
+            print("⚠️ 当前系统不支持文件锁，限流器仅在进程内生效")
+            self.state_file = None
+        self._lock = threading.Lock()
+        self._state = {'tokens': self.capacity, 'updated_at': time.time(), 'blocked_until': 0.0}
+
+    # ===== 状态存取 =====
+    @contextmanager
+    def _locked_state(self):
+        """获取状态的独占访问权：线程锁 + (可选) 跨进程文件锁"""
+        with self._lock:
+            if self.state_file is None:
+                yield self._state
+                return
+
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.state_file, 'a+', encoding='utf-8') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    content = f.read()
+                    state = json.loads(content) if content else dict(self._state)
+                    yield state
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(state, f)
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refill(self, state, now):
+        # 暂停期间不补充额度，从暂停结束时刻开始计算
+        start = max(state['updated_at'], state['blocked_until'])
+        elapsed = max(0.0, now - start)
+        state['tokens'] = min(self.capacity, state['tokens'] + elapsed * self.refill_per_second)
+        state['updated_at'] = max(now, start)
+
+    # ===== 对外接口 =====
+    def acquire(self, weight=1):
+        """
+        扣减 weight 个额度，额度不足时阻塞到补足为止
+        返回:
+            float: 本次调用累计等待的秒数
+        """
+        weight = min(weight, self.capacity)
+        waited = 0.0
+        while True:
+            with self._locked_state() as state:
+                now = time.time()
+                self._refill(state, now)
+                if now < state['blocked_until']:
+                    wait = state['blocked_until'] - now
+                elif state['tokens'] >= weight:
+                    state['tokens'] -= weight
+                    return waited
+                else:
+                    wait = (weight - state['tokens']) / self.refill_per_second
+            # 在锁外等待，避免阻塞其他线程/进程同步状态
+            time.sleep(wait)
+            waited += wait
+
+    def sync_used_weight(self, used_weight):
+        """根据服务器返回的当前分钟已用权重校正本地额度 (只会下调)"""
+        with self._locked_state() as state:
+            self._refill(state, time.time())
+            state['tokens'] = min(state['tokens'], self.capacity - float(used_weight))
+
+    def update_from_headers(self, headers):
+        """从响应头 (或连接器返回的 limit_usage 字典) 中读取已用权重"""
+        for key, value in (headers or {}).items():
+            if key.lower() == 'x-mbx-used-weight-1m':
+                self.sync_used_weight(value)
+                return
+
+    def penalize(self, retry_after=60):
+        """收到 429/418 后暂停所有调用方 retry_after 秒，并清空额度"""
+        with self._locked_state() as state:
+            now = time.time()
+            state['blocked_until'] = max(state['blocked_until'], now + float(retry_after))
+            state['tokens'] = 0.0
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """获取进程内共享的默认限流器"""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = WeightRateLimiter(state_file=RATE_LIMIT_STATE_FILE)
+        return _default_limiter
@@ -16,6 +16,9 @@ if current_dir not in sys.path:
 
 try:
     from config import DATA_DIR, INDICATORS_FILENAME, REPORT_FILENAME, SYMBOL, get_filenames
+    from frame_storage import load_frame, frame_exists
+    from result_cache import get_result_cache, result_key, frame_digest
+    from signal_labels import decode_signals, signal_label
 
     print("✅ 成功导入 config 模块")
 except ImportError as e:
@@ -27,15 +30,25 @@ except ImportError as e:
     SYMBOL = 'BTCUSDT'
     print("⚠️ 使用默认配置继续运行")
 
+# 报告用到的指标和信号列 (只需要报告时可用 calculate_indicators_frame(..., columns=REPORT_COLUMNS) 只计算这些列；
+# 流水线要保存完整的指标数据，仍计算全部列)
+REPORT_COLUMNS = [
+    'MA20', 'MA50', 'MACD', 'MACD_Signal', 'RSI', 'BB_Upper', 'BB_Lower', 'ATR',
+    'MA_Signal', 'MACD_Signal_Analysis', 'RSI_Signal', 'BB_Signal', '综合信号',
+]
+# 生成报告读取的全部列 (时间、价格和 REPORT_COLUMNS)；读取指标文件、计算缓存键时只用这些列
+REPORT_FRAME_COLUMNS = ['open_time', '日期', '开盘价', '最高价', '最低价', '收盘价', '成交量'] + REPORT_COLUMNS
+
 
 # ===== 报告生成函数 =====
-def generate_trading_report(indicators_filename=None, report_filename=None, timeframe_name=None):
+def generate_trading_report(indicators_filename=None, report_filename=None, timeframe_name=None, symbol=None):
     """
     主函数：生成交易分析报告
     参数:
         indicators_filename: 指标数据文件名
         report_filename: 报告文件名
         timeframe_name: 时间周期名称
+        symbol: 交易对 (默认 SYMBOL)
     """
     print("\n" + "=" * 50)
     print(f"开始生成交易分析报告 - {timeframe_name or '日线'}")
@@ -43,33 +56,23 @@ def generate_trading_report(indicators_filename=None, report_filename=None, time
 
     # 1. 加载技术指标数据
     indicators_path = DATA_DIR / (indicators_filename or INDICATORS_FILENAME)
-    if not indicators_path.exists():
+    if not frame_exists(indicators_path):
         print(f"❌ 错误: 技术指标文件不存在 - {indicators_path}")
         return None
 
     try:
-        # 读取CSV文件
-        df = pd.read_csv(indicators_path, encoding='utf-8-sig')
-
-        # 检查必要的列是否存在
-        required_columns = ['开盘价', '收盘价', 'MA20', 'MA50', 'RSI', 'MACD', '综合信号']
-        missing_cols = [col for col in required_columns if col not in df.columns]
-        if missing_cols:
-            print(f"❌ 错误: 数据文件缺少必要的列 - {missing_cols}")
-            return None
-
+        df = load_frame(indicators_path, columns=REPORT_FRAME_COLUMNS)
         print(f"✅ 成功加载技术指标数据, 共 {len(df)} 条记录")
     except Exception as e:
         print(f"❌ 加载数据失败: {e}")
         return None
 
-    # 2. 提取最新数据点
-    latest_data = df.iloc[-1]
-
-    # 3. 生成报告
-    report = create_analysis_report(df, latest_data)
+    # 2. 生成报告
+    report = create_report_from_frame(df, symbol)
+    if report is None:
+        return None
 
-    # 4. 保存报告
+    # 3. 保存报告
     report_path = DATA_DIR / (report_filename or REPORT_FILENAME)
     save_report(report, report_path)
 
@@ -78,13 +81,57 @@ def generate_trading_report(indicators_filename=None, report_filename=None, time
     return report_path
 
 
-def create_analysis_report(df, latest_data):
+def create_report_from_frame(indicators_df, symbol=None):
+    """
+    由技术指标 DataFrame 在内存中生成报告文本 (不读写报告文件)
+    说明：只使用 REPORT_FRAME_COLUMNS 中的列；这些列未变化时复用缓存的报告正文，只重新生成带当前时间的报告头；
+          编码的信号列在这里转换为中文标签，各报告段落按标签生成文字
+    返回:
+        str: 报告内容；缺少必要的列时返回 None
+    """
+    # 列式存储/内存中的指标数据以 open_time 为索引，转换为普通列供各报告段落使用
+    df = indicators_df.reset_index() if indicators_df.index.name is not None else indicators_df
+    df = df[[col for col in REPORT_FRAME_COLUMNS if col in df.columns]]
+
+    # 检查必要的列是否存在
+    required_columns = ['开盘价', '收盘价', 'MA20', 'MA50', 'RSI', 'MACD', '综合信号']
+    missing_cols = [col for col in required_columns if col not in df.columns]
+    if missing_cols:
+        print(f"❌ 错误: 数据缺少必要的列 - {missing_cols}")
+        return None
+
+    cache = get_result_cache()
+    key = result_key('report', frame_digest(df)) if cache is not None else None
+    body = cache.get_text(key) if key else None
+    if body is not None:
+        print("⚡ 指标数据未变化，复用缓存的报告正文")
+    else:
+        # 提取最新数据点并生成报告
+        df = decode_signals(df)
+        body = create_report_body(df, df.iloc[-1])
+        if key:
+            cache.put_text(key, body)
+    return create_report_header(symbol) + body
+
+
+def create_analysis_report(df, latest_data, symbol=None):
     """
     创建完整的分析报告
     """
-    # 报告头部信息
+    latest_data = pd.Series({col: signal_label(col, value) for col, value in latest_data.items()},
+                            name=latest_data.name)
+    return create_report_header(symbol) + create_report_body(decode_signals(df), latest_data)
+
+
+def create_report_header(symbol=None):
+    """报告头部信息 (交易对和生成时间)"""
     report_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    report = f"===== {SYMBOL} 技术分析报告 {report_date} =====\n\n"
+    return f"===== {symbol or SYMBOL} 技术分析报告 {report_date} =====\n\n"
+
+
+def create_report_body(df, latest_data):
+    """报告正文 (只由指标数据决定)"""
+    report = ""
 
     # 1. 价格概览
     report += price_overview_section(df, latest_data)
@@ -373,6 +420,8 @@ def data_description_section():
 def save_report(report_content, file_path):
     """
     保存报告到文本文件
+    返回:
+        Path: 报告文件路径
     """
     # 确保目录存在
     file_path.parent.mkdir(parents=True, exist_ok=True)
@@ -382,6 +431,7 @@ def save_report(report_content, file_path):
         f.write(report_content)
 
     print(f"💾 报告已保存: {file_path}")
+    return file_path
 
 
 def get_latest_report_path():
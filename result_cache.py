@@ -0,0 +1,209 @@
+"""
+计算结果缓存模块
+功能：按 "输入数据内容哈希 + 参数 + 代码版本" 缓存指标计算、数据组合、报告生成的结果，
+      输入和参数都没变时直接读取上次的结果，不再重新计算
+说明：
+    - 键只由内容决定 (不看文件名和修改时间)：同样的K线无论来自哪个文件、哪次抓取都会命中
+    - 参数使用激进模式缩放后的实际参数字典，切换模式或调整参数后自然不会命中旧结果
+    - 代码版本为本目录下所有 .py 源文件的哈希，修改任何计算代码后旧结果自动失效
+    - 缓存目录按总大小做LRU淘汰 (命中时刷新文件修改时间)，写入在后台写入线程中进行
+"""
+
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from config import RESULT_CACHE_ENABLED, RESULT_CACHE_MAX_BYTES, get_result_cache_dir
+from frame_storage import STORAGE_SUFFIXES, find_frame, load_frame, save_frame, submit_write
+
+
+def frame_digest(df):
+    """
+    DataFrame 内容哈希 (列名、类型、索引和全部数值)
+    说明：数值列直接对内存字节做哈希，字符串等对象列使用 pandas 的逐元素哈希
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([str(df.index.name), str(df.index.dtype)] +
+                             [[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode())
+    for values in [df.index] + [df[col] for col in df.columns]:
+        if values.dtype.kind in 'biufcmM':
+            digest.update(np.ascontiguousarray(values.to_numpy()).view(np.uint8))
+        else:
+            digest.update(pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy().view(np.uint8))
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def code_version():
+    """本目录下所有源文件的哈希 (进程内只计算一次)"""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(Path(__file__).resolve().parent.glob('*.py')):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def result_key(stage, *parts):
+    """
+    由阶段名和各输入 (内容哈希字符串、参数字典等) 生成缓存键
+    参数:
+        parts: 可 JSON 序列化的值，字典按键排序
+    """
+    payload = json.dumps([stage, code_version(), *parts], sort_keys=True, default=str)
+    return f"{stage}_{hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()}"
+
+
+class ResultCache:
+    """
+    计算结果缓存 (DataFrame 按 config.STORAGE_FORMAT 保存，报告文本保存为 .txt)
+    参数:
+        cache_dir: 缓存目录
+        max_bytes: 缓存总大小上限，超过后淘汰最久未使用的结果
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or get_result_cache_dir()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or RESULT_CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    # ===== 读取 =====
+    def _touch(self, path, hit):
+        if hit:
+            os.utime(path)  # 刷新修改时间，作为LRU的最近使用时间
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_frame(self, key):
+        """
+        读取缓存的 DataFrame
+        返回:
+            DataFrame: 未命中时返回 None
+        """
+        path = find_frame(self.cache_dir / f"{key}.csv")
+        if path is None:
+            self._touch(path, False)
+            return None
+        try:
+            df = load_frame(path)
+        except (FileNotFoundError, OSError):
+            self._touch(path, False)  # 读取前被其他进程淘汰
+            return None
+        self._touch(path, True)
+        return df
+
+    def get_text(self, key):
+        """读取缓存的文本，未命中时返回 None"""
+        path = self.cache_dir / f"{key}.txt"
+        try:
+            text = path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            self._touch(path, False)
+            return None
+        self._touch(path, True)
+        return text
+
+    # ===== 写入 =====
+    def put_frame(self, key, df):
+        """
+        在后台写入线程中保存 DataFrame (提交后不要再原地修改 df)
+        返回:
+            Future
+        """
+        return submit_write(self._store, lambda: save_frame(df, self.cache_dir / f"{key}.csv"))
+
+    def put_text(self, key, text):
+        """在后台写入线程中保存文本"""
+        path = self.cache_dir / f"{key}.txt"
+
+        def write():
+            tmp_path = path.with_name(f"{path.name}.tmp")
+            tmp_path.write_text(text, encoding='utf-8')
+            tmp_path.replace(path)
+            return path
+        return submit_write(self._store, write)
+
+    def _store(self, write):
+        path = write()
+        with self._lock:
+            self._total_bytes += path.stat().st_size
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+        return path
+
+    def _entries(self):
+        suffixes = set(STORAGE_SUFFIXES.values()) | {'.txt'}
+        entries = []
+        for path in self.cache_dir.iterdir():
+            if path.suffix not in suffixes:
+                continue  # 跳过写了一半的 .tmp 文件
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # 已被其他进程删除
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """按最近使用时间从旧到新删除缓存结果，直到总大小降到上限以内"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._total_bytes = total
+
+    # ===== 统计与维护 =====
+    @property
+    def size_bytes(self):
+        return self._total_bytes
+
+    def clear(self):
+        """删除所有缓存结果"""
+        for _, _, path in self._entries():
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._total_bytes = 0
+
+    def __repr__(self):
+        return (f"ResultCache({self.cache_dir}, {self._total_bytes / 1024 / 1024:.1f}MB/"
+                f"{self.max_bytes / 1024 / 1024:.0f}MB, 命中 {self.hits}, 未命中 {self.misses})")
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    获取当前缓存目录对应的共享缓存实例
+    返回:
+        ResultCache: 缓存未启用 (config.RESULT_CACHE_ENABLED=False) 时返回 None
+    """
+    if not RESULT_CACHE_ENABLED:
+        return None
+    cache_dir = get_result_cache_dir()
+    with _caches_lock:
+        if cache_dir not in _caches:
+            _caches[cache_dir] = ResultCache(cache_dir)
+        return _caches[cache_dir]
@@ -0,0 +1,116 @@
+"""
+信号标签注册表模块
+功能：分类信号列 (MA_Signal、RSI_Signal、综合信号、Fib_Signal 等) 以小整数编码 (int8) 保存，
+      本模块登记每列 编码 → 标签 的对应关系；规则直接在整数数组上计算，
+      只在导出CSV和生成报告时才转换为中文标签
+说明：
+    - 编码 0 为各列的默认值 (中性 / 空字符串 / neutral)
+    - decode_signals 只转换整数类型的信号列，已经是标签的列 (旧版本保存的数据) 原样保留；
+      encode_signals 反过来把旧数据中的标签转换为编码
+"""
+
+import numpy as np
+
+SIGNAL_DTYPE = np.int8
+
+# 斐波那契信号：编码 = 信号编码 × 3 + 成交量编码 (0 无后缀 / 1 带量 / 2 缩量)
+FIB_SIGNAL_NAMES = (
+    'neutral',
+    'fib_382_bounce', 'fib_382_reject',
+    'fib_50_bounce', 'fib_50_reject',
+    'fib_618_bounce', 'fib_618_reject',
+    'fib_breakout_up', 'fib_breakout_down',
+    'fib_golden_zone',
+)
+FIB_VOLUME_SUFFIXES = ('', '_带量', '_缩量')
+
+# 各信号列的标签 (按编码顺序)
+SIGNAL_LABELS = {
+    'MA_Fast_Signal': ('中性', '快速金叉', '快速死叉'),
+    'MA_Signal': ('中性', '金叉', '死叉'),
+    'MACD_Signal_Analysis': ('中性', '看涨', '看跌'),
+    'MACD_Zero_Cross': ('', '零轴上穿', '零轴下穿'),
+    'RSI_Signal': ('中性', '极度超买', '极度超卖', '强卖出', '强买入', '看涨区域', '看跌区域'),
+    'BB_Breakout_Strength': ('', '带量突破上轨', '带量突破下轨'),
+    'BB_Signal': ('中轨附近', '强力突破上轨', '强力突破下轨', '突破上轨', '突破下轨', '强势上轨区域', '弱势下轨区域'),
+    'Stoch_Signal': ('中性', '超买交叉', '超卖交叉', '看涨交叉', '看跌交叉'),
+    'Fib_Key_Zone': ('', '关键支撑区', '反转区', '强势区'),
+    '综合信号': ('中性', '看涨', '看跌', '强烈看涨', '强烈看跌', '极强看涨', '极强看跌',
+             '超强看涨', '超强看跌', '🔥超强看涨', '🔥超强看跌'),
+    'Fib_Trend': ('neutral', 'uptrend', 'downtrend'),
+    'Fib_Signal': tuple(name + suffix for name in FIB_SIGNAL_NAMES for suffix in FIB_VOLUME_SUFFIXES),
+}
+
+_label_arrays = {column: np.array(labels, dtype=object) for column, labels in SIGNAL_LABELS.items()}
+_codes = {column: {label: code for code, label in enumerate(labels)} for column, labels in SIGNAL_LABELS.items()}
+
+
+def signal_code(column, label):
+    """某列中某个标签的编码 (标签不存在时 KeyError)"""
+    return _codes[column][label]
+
+
+def signal_select(column, conditions, labels, default):
+    """
+    同 np.select(conditions, labels, default)，但输出编码数组
+    参数:
+        labels/default: 该列的标签
+    """
+    codes = [signal_code(column, label) for label in labels]
+    return np.select(conditions, codes, default=signal_code(column, default)).astype(SIGNAL_DTYPE)
+
+
+def signal_mask(df, column, *labels):
+    """
+    df[column] 属于这些标签的行 (同 df[column].isin(labels))
+    返回:
+        ndarray[bool]: df 中没有该列时全部为 False
+    """
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    table = np.zeros(len(SIGNAL_LABELS[column]), dtype=bool)
+    table[[signal_code(column, label) for label in labels]] = True
+    return table[df[column].to_numpy()]
+
+
+def signal_label(column, value):
+    """单个值的标签 (用于报告和汇总的单行数据)；不是信号列或已经是标签时原样返回"""
+    if column in SIGNAL_LABELS and isinstance(value, (int, np.integer)):
+        return SIGNAL_LABELS[column][value]
+    return value
+
+
+def _is_code_column(series):
+    return series.dtype.kind in 'iu'
+
+
+def decode_signals(df):
+    """
+    把编码的信号列转换为标签 (导出CSV、生成报告前调用)
+    返回:
+        DataFrame: 有需要转换的列时返回副本，否则返回 df 本身
+    """
+    columns = [col for col in SIGNAL_LABELS if col in df.columns and _is_code_column(df[col])]
+    if not columns:
+        return df
+    df = df.copy()
+    for col in columns:
+        df[col] = _label_arrays[col][df[col].to_numpy()]
+    return df
+
+
+def encode_signals(df):
+    """
+    把标签形式的信号列 (旧版本保存的数据) 转换为编码
+    说明：CSV 中的空字符串读出为 NaN，按空字符串处理；无法识别的标签按默认值 (编码 0)
+    返回:
+        DataFrame: 有需要转换的列时返回副本，否则返回 df 本身
+    """
+    columns = [col for col in SIGNAL_LABELS if col in df.columns and not _is_code_column(df[col])]
+    if not columns:
+        return df
+    df = df.copy()
+    for col in columns:
+        codes = df[col].fillna('').astype(object).map(_codes[col])
+        df[col] = codes.fillna(0).to_numpy().astype(SIGNAL_DTYPE)
+    return df
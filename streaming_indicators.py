@@ -0,0 +1,563 @@
+"""
+实时逐根指标计算模块
+功能：每个指标一个状态对象，新K线收盘时只做常数次运算更新状态，
+      输出与 compute_ta_indicators (TA-Lib 批量计算) 相同的列，不必每根K线都重算整段历史
+说明：
+    - 各状态对象按 TA-Lib 的计算顺序实现 (SMA 滚动求和、EMA 以 SMA 作初值、Wilder 平滑的 RSI/ATR/ADX、
+      BBANDS 的滚动平方和方差、STOCH 的单调队列极值、OBV)，与 TA-Lib 输出一致，预热期同样为 NaN
+    - 斐波那契锚点使用 swing_detector.SwingDetector，水平/信号公式与批量计算相同
+    - compute_ta_indicators 中 "数据量不少于周期时才计算" 的超长周期列 (MA_EXTRA_LONG 等)
+      在这里总是输出，数据不足时为 NaN
+用法：python streaming_indicators.py  (与 TA-Lib 批量结果交叉校验并统计每根K线的耗时)
+"""
+
+import math
+import time
+from collections import deque
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from swing_detector import RollingExtrema, SwingDetector, confirm_bars_for, \
+    FIB_RETRACEMENT_LEVELS, FIB_EXTENSION_LEVELS
+from ta_calculator import indicator_periods, get_timeframe_params
+from signal_labels import signal_code, FIB_VOLUME_SUFFIXES
+
+NAN = float('nan')
+
+
+def _is_zero(value):
+    """TA-Lib 的 TA_IS_ZERO 判断"""
+    return -0.00000001 < value < 0.00000001
+
+
+def _divide(numerator, denominator):
+    """与 NumPy 浮点除法一致的标量除法 (除以0得到 inf/NaN 而不是抛出异常)"""
+    if denominator == 0.0:
+        return NAN if numerator == 0.0 or numerator != numerator else math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+
+def _true_range(high, low, prev_close):
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+class SMAState:
+    """简单移动平均 (滚动求和，先加入新值求平均，再减去移出窗口的值)"""
+
+    def __init__(self, period):
+        self.period = period
+        self._window = deque()
+        self._total = 0.0
+
+    def update(self, value):
+        self._total += value
+        self._window.append(value)
+        if len(self._window) < self.period:
+            return NAN
+        result = self._total / self.period
+        self._total -= self._window.popleft()
+        return result
+
+
+class EMAState:
+    """指数移动平均 (TA-Lib 方式：以前 period 个值的 SMA 作为初值)"""
+
+    def __init__(self, period):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self._seed = []
+        self.value = NAN
+
+    def seed(self, values):
+        """用给定的 period 个值的平均作为初值 (MACD 快线需要用慢线预热结束时最近的 period 个值)"""
+        total = 0.0
+        for value in values:
+            total += value
+        self.value = total / self.period
+        self._seed = None
+        return self.value
+
+    def step(self, value):
+        """已有初值时的平滑"""
+        self.value = (value - self.value) * self.k + self.value
+        return self.value
+
+    def update(self, value):
+        if self._seed is None:
+            return self.step(value)
+        self._seed.append(value)
+        return self.seed(self._seed) if len(self._seed) == self.period else NAN
+
+
+class MACDState:
+    """
+    MACD (TA-Lib 方式：快线、慢线都在第 slow 根K线开始输出，快线的初值为此时最近 fast 根收盘价的平均；
+    信号线为 MACD 线的 EMA，三条线在信号线预热完成后同时输出)
+    """
+
+    def __init__(self, fast, slow, signal):
+        if slow < fast:
+            fast, slow = slow, fast
+        self.fast = EMAState(fast)
+        self.slow = EMAState(slow)
+        self.signal = EMAState(signal)
+        self._warmup = []
+
+    def update(self, close):
+        if self._warmup is not None:
+            self._warmup.append(close)
+            if len(self._warmup) < self.slow.period:
+                return NAN, NAN, NAN
+            self.slow.seed(self._warmup)
+            self.fast.seed(self._warmup[-self.fast.period:])
+            self._warmup = None
+        else:
+            self.fast.step(close)
+            self.slow.step(close)
+
+        macd = self.fast.value - self.slow.value
+        signal = self.signal.update(macd)
+        if signal != signal:  # 信号线尚未预热完成 (NaN)
+            return NAN, NAN, NAN
+        return macd, signal, macd - signal
+
+
+class RSIState:
+    """RSI (Wilder 平滑，前 period 个涨跌幅的平均作为初值)"""
+
+    def __init__(self, period):
+        self.period = period
+        self._prev = None
+        self._count = 0
+        self._gain = 0.0
+        self._loss = 0.0
+
+    def update(self, close):
+        if self._prev is None:
+            self._prev = close
+            return NAN
+        diff = close - self._prev
+        self._prev = close
+        self._count += 1
+        if self._count > self.period:
+            self._loss *= self.period - 1
+            self._gain *= self.period - 1
+        if diff < 0:
+            self._loss -= diff
+        else:
+            self._gain += diff
+        if self._count < self.period:
+            return NAN
+        self._loss /= self.period
+        self._gain /= self.period
+        total = self._gain + self._loss
+        return 0.0 if _is_zero(total) else 100.0 * (self._gain / total)
+
+
+class ATRState:
+    """ATR (真实波幅的 Wilder 平滑，前 period 个真实波幅的平均作为初值)"""
+
+    def __init__(self, period):
+        self.period = period
+        self._prev_close = None
+        self._ranges = []
+        self.value = NAN
+
+    def update(self, high, low, close):
+        if self._prev_close is None:
+            self._prev_close = close
+            return NAN
+        true_range = _true_range(high, low, self._prev_close)
+        self._prev_close = close
+        if self.period <= 1:
+            return true_range
+        if self._ranges is not None:
+            self._ranges.append(true_range)
+            if len(self._ranges) < self.period:
+                return NAN
+            total = 0.0
+            for value in self._ranges:
+                total += value
+            self.value = total / self.period
+            self._ranges = None
+            return self.value
+        self.value = (self.value * (self.period - 1) + true_range) / self.period
+        return self.value
+
+
+class ADXState:
+    """
+    ADX (TA-Lib 方式)：前 period-1 根K线累加 +DM/-DM/TR，之后 Wilder 平滑；
+    再累加 period 个 DX 的平均作为 ADX 初值，之后 Wilder 平滑
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self._index = -1
+        self._prev_high = self._prev_low = self._prev_close = NAN
+        self._plus_dm = self._minus_dm = self._tr = 0.0
+        self._sum_dx = 0.0
+        self.value = NAN
+
+    def update(self, high, low, close):
+        period = self.period
+        self._index += 1
+        index = self._index
+        if index == 0:
+            self._prev_high, self._prev_low, self._prev_close = high, low, close
+            return NAN
+
+        diff_plus = high - self._prev_high
+        diff_minus = self._prev_low - low
+        self._prev_high, self._prev_low = high, low
+        if index >= period:
+            self._minus_dm -= self._minus_dm / period
+            self._plus_dm -= self._plus_dm / period
+        if diff_minus > 0 and diff_plus < diff_minus:
+            self._minus_dm += diff_minus
+        elif diff_plus > 0 and diff_plus > diff_minus:
+            self._plus_dm += diff_plus
+        true_range = _true_range(high, low, self._prev_close)
+        self._tr = self._tr + true_range if index < period else self._tr - self._tr / period + true_range
+        self._prev_close = close
+        if index < period:
+            return NAN
+
+        dx = None
+        if not _is_zero(self._tr):
+            minus_di = 100.0 * (self._minus_dm / self._tr)
+            plus_di = 100.0 * (self._plus_dm / self._tr)
+            total = minus_di + plus_di
+            if not _is_zero(total):
+                dx = 100.0 * (abs(minus_di - plus_di) / total)
+
+        if index < 2 * period - 1:
+            self._sum_dx += dx or 0.0
+            return NAN
+        if index == 2 * period - 1:
+            self.value = (self._sum_dx + (dx or 0.0)) / period
+        elif dx is not None:
+            self.value = ((self.value * (period - 1)) + dx) / period
+        return self.value
+
+
+class BBandsState:
+    """布林带 (中轨为 SMA，标准差由滚动平方和计算: sqrt(E[x²] - 中轨²))"""
+
+    def __init__(self, period, nbdev):
+        self.period = period
+        self.nbdev = nbdev
+        self._middle = SMAState(period)
+        self._squares = deque()
+        self._total_squares = 0.0
+
+    def update(self, close):
+        middle = self._middle.update(close)
+        square = close * close
+        self._total_squares += square
+        self._squares.append(square)
+        if len(self._squares) < self.period:
+            return NAN, NAN, NAN
+        mean_square = self._total_squares / self.period
+        self._total_squares -= self._squares.popleft()
+        variance = mean_square - middle * middle
+        stddev = math.sqrt(variance) if variance >= 0.00000001 else 0.0
+        if self.nbdev == 1.0:
+            return middle + stddev, middle, middle - stddev
+        band = stddev * self.nbdev
+        return middle + band, middle, middle - band
+
+
+class StochState:
+    """随机指标 (快速K的窗口高低点用单调队列维护，慢K/慢D为 SMA)"""
+
+    def __init__(self, fastk, slowk, slowd):
+        self._high = RollingExtrema(fastk)
+        self._low = RollingExtrema(fastk)
+        self._slowk = SMAState(slowk)
+        self._slowd = SMAState(slowd)
+
+    def update(self, high, low, close):
+        highest, _ = self._high.push(high)
+        _, lowest = self._low.push(low)
+        if not self._high.full:
+            return NAN, NAN
+        diff = (highest - lowest) / 100.0
+        fastk = (close - lowest) / diff if diff != 0.0 else 0.0
+        slowk = self._slowk.update(fastk)
+        if slowk != slowk:
+            return NAN, NAN
+        slowd = self._slowd.update(slowk)
+        if slowd != slowd:
+            return NAN, NAN
+        return slowk, slowd
+
+
+class OBVState:
+    """能量潮 (首根K线的成交量作为初值)"""
+
+    def __init__(self):
+        self._prev_close = None
+        self.value = NAN
+
+    def update(self, close, volume):
+        if self._prev_close is None:
+            self.value = volume
+        elif close > self._prev_close:
+            self.value += volume
+        elif close < self._prev_close:
+            self.value -= volume
+        self._prev_close = close
+        return self.value
+
+
+class FibonacciState:
+    """
+    斐波那契水平与信号 (锚点无效时沿用最近一次的有效水平，与批量计算的前向填充一致)
+    说明：公式与 swing_detector.fibonacci_levels / ta_calculator.fibonacci_signal_columns 相同，
+          这里用标量运算逐根计算，避免对单个值调用 NumPy 的开销；Fib_Trend/Fib_Signal 输出编码 (见 signal_labels)
+    """
+
+    KEY_RETRACEMENTS = [(0.382, 1), (0.5, 3), (0.618, 5)]  # (水平, 信号编码)
+    TOLERANCE = 0.02
+    NEUTRAL = signal_code('Fib_Trend', 'neutral')
+    UPTREND = signal_code('Fib_Trend', 'uptrend')
+    DOWNTREND = signal_code('Fib_Trend', 'downtrend')
+
+    def __init__(self, lookback_period):
+        self.detector = SwingDetector(confirm_bars_for(lookback_period))
+        self._ret_names = [(level, f'Fib_Ret_{level:.3f}') for level in FIB_RETRACEMENT_LEVELS]
+        self._ext_names = [(level, f'Fib_Ext_{level:.3f}') for level in FIB_EXTENSION_LEVELS]
+        self._levels = {name: NAN for _, name in self._ret_names + self._ext_names}
+        self._anchors = (NAN, NAN)
+
+    def update(self, high, low, close, volume_ratio):
+        swing_high, swing_low = self.detector.update(high, low)
+        uptrend = downtrend = False
+        if swing_high > swing_low:
+            price_range = swing_high - swing_low
+            price_position = (close - swing_low) / price_range
+            uptrend = price_position > 0.6
+            downtrend = price_position < 0.4
+            levels = {}
+            for level, name in self._ret_names:
+                levels[name] = swing_high - price_range * level if uptrend else swing_low + price_range * level
+            for level, name in self._ext_names:
+                levels[name] = (swing_low - price_range * (level - 1) if downtrend
+                                else swing_high + price_range * (level - 1))
+            self._levels = levels
+            self._anchors = (swing_high, swing_low)
+        trend = self.UPTREND if uptrend else self.DOWNTREND if downtrend else self.NEUTRAL
+
+        row = dict(self._levels)
+        row['Fib_Trend'] = trend
+        fib_high, fib_low = row['Fib_High'], row['Fib_Low'] = self._anchors
+        row.update(self._signal(close, trend, row, fib_high, fib_low, volume_ratio))
+        return row
+
+    def _signal(self, current_price, trend, levels, fib_high, fib_low, volume_ratio):
+        result = {'Fib_Signal': signal_code('Fib_Signal', 'neutral'), 'Fib_Support_Level': NAN,
+                  'Fib_Resistance_Level': NAN, 'Fib_Price_Position': NAN}
+        if current_price != current_price or trend == self.NEUTRAL:
+            return result
+
+        # 找到最近的支撑和阻力水平
+        supports, resistances = [], []
+        for name in ('Fib_Ret_0.382', 'Fib_Ret_0.500', 'Fib_Ret_0.618'):
+            level_price = levels[name]
+            if level_price < current_price:
+                supports.append(level_price)
+            elif level_price > current_price:
+                resistances.append(level_price)
+        for name in ('Fib_Ext_1.272', 'Fib_Ext_1.414'):
+            level_price = levels[name]
+            if trend == self.UPTREND and level_price > current_price:
+                resistances.append(level_price)
+            elif trend == self.DOWNTREND and level_price < current_price:
+                supports.append(level_price)
+        if supports:
+            result['Fib_Support_Level'] = max(supports)
+        if resistances:
+            result['Fib_Resistance_Level'] = min(resistances)
+
+        # 价格在斐波那契区间的位置与信号
+        if not (fib_high == fib_high and fib_low == fib_low and fib_high != fib_low):
+            return result
+        price_position = (current_price - fib_low) / (fib_high - fib_low)
+        result['Fib_Price_Position'] = price_position
+        code = 0
+        for level, level_code in self.KEY_RETRACEMENTS:
+            if abs(price_position - level) < self.TOLERANCE:
+                code = level_code + (0 if trend == self.UPTREND else 1)
+                break
+        else:
+            if price_position > 1.0:
+                code = 7
+            elif price_position < 0.0:
+                code = 8
+            elif 0.618 < price_position < 0.786:
+                code = 9
+        if code:
+            suffix = 1 if volume_ratio > 1.2 else 2 if volume_ratio < 0.8 else 0
+            result['Fib_Signal'] = code * len(FIB_VOLUME_SUFFIXES) + suffix
+        return result
+
+
+class IndicatorEngine:
+    """
+    实时逐根指标计算
+    参数:
+        params: 指标参数字典 (同 compute_ta_indicators)；为 None 时按 timeframe_name 取参数
+    用法：
+        engine = IndicatorEngine(timeframe_name='1小时线')
+        engine.warm_up(history_df)          # 用历史K线预热状态
+        row = engine.update(bar)            # 每根新收盘K线: {列名: 值}
+    """
+
+    def __init__(self, params=None, timeframe_name=None):
+        if params is None:
+            params = get_timeframe_params(timeframe_name)
+        self.periods = periods = indicator_periods(params)
+
+        ma_short, ma_medium, ma_long = periods['ma_short'], periods['ma_medium'], periods['ma_long']
+        self._ma = {'MA3': SMAState(3), f'MA{ma_short}': SMAState(ma_short), f'MA{ma_medium}': SMAState(ma_medium)}
+        if ma_long != ma_medium:
+            self._ma[f'MA{ma_long}'] = SMAState(ma_long)
+        if periods['ma_extra_long']:
+            self._ma[f'MA{periods["ma_extra_long"]}'] = SMAState(periods['ma_extra_long'])
+        self._ma_aliases = {'MA20': f'MA{ma_short}', 'MA50': f'MA{ma_medium}'}
+        if ma_long > 50:
+            self._ma_aliases['MA_LONG'] = f'MA{ma_long}'
+
+        self._macd = {'MACD': MACDState(periods['macd_fast'], periods['macd_slow'], periods['macd_signal'])}
+        if periods['macd_long_fast'] and periods['macd_long_slow']:
+            self._macd['MACD_Long'] = MACDState(periods['macd_long_fast'], periods['macd_long_slow'],
+                                                periods['macd_long_signal'])
+
+        rsi_period = periods['rsi_period']
+        self._rsi = {'RSI': RSIState(rsi_period)}
+        for name, key in (('RSI_Secondary', 'rsi_secondary'), ('RSI_Long', 'rsi_long')):
+            if periods[key] and periods[key] != rsi_period:
+                self._rsi[name] = RSIState(periods[key])
+        extra_rsi = {'RSI_Extra_Long': RSIState(periods['rsi_extra_long'])} if periods['rsi_extra_long'] else {}
+
+        self._bb = BBandsState(periods['bb_period'], periods['bb_std_dev'])
+        self._volume_ma = SMAState(20)
+        self._bb_long = BBandsState(periods['bb_long_period'], periods['bb_std_dev']) \
+            if periods['bb_long_period'] else None
+        self._extra_rsi = extra_rsi
+        self._stoch = StochState(periods['stoch_fastk'], periods['stoch_slowk'], periods['stoch_slowd'])
+        self._obv = OBVState()
+        self._atr = ATRState(periods['atr_period'])
+        atr_long = periods['atr_long_period']
+        self._atr_long = ATRState(atr_long) if atr_long and atr_long != periods['atr_period'] else None
+        self._adx = ADXState(periods['adx_period'])
+        self._fib = FibonacciState(periods['fib_lookback'])
+        self.bars = 0
+
+    def update(self, bar):
+        """
+        加入一根已收盘K线
+        参数:
+            bar: 含 最高价/最低价/收盘价/成交量 的映射 (如 DataFrame 的一行)
+        返回:
+            dict: 指标列 → 值，列名和顺序同 compute_ta_indicators
+        """
+        high, low = float(bar['最高价']), float(bar['最低价'])
+        close, volume = float(bar['收盘价']), float(bar['成交量'])
+        self.bars += 1
+        row = {}
+
+        # 1. 移动平均线系统 (同名列只计算一次，别名列直接复用)
+        for name, state in self._ma.items():
+            row[name] = state.update(close)
+        for alias, source in self._ma_aliases.items():
+            row[alias] = row[source]
+
+        # 2. MACD
+        for prefix, state in self._macd.items():
+            row[prefix], row[f'{prefix}_Signal'], row[f'{prefix}_Hist'] = state.update(close)
+
+        # 3. RSI
+        for name, state in self._rsi.items():
+            row[name] = state.update(close)
+        for name, state in self._extra_rsi.items():
+            row[name] = state.update(close)
+
+        # 4. 布林带与成交量均线
+        row['BB_Upper'], row['BB_Middle'], row['BB_Lower'] = self._bb.update(close)
+        row['Volume_MA20'] = volume_ma = self._volume_ma.update(volume)
+        row['Volume_Ratio'] = _divide(volume, volume_ma)
+        if self._bb_long is not None:
+            row['BB_Long_Upper'], row['BB_Long_Middle'], row['BB_Long_Lower'] = self._bb_long.update(close)
+
+        # 5. 随机指标、OBV
+        row['Stoch_SlowK'], row['Stoch_SlowD'] = self._stoch.update(high, low, close)
+        row['OBV'] = self._obv.update(close, volume)
+
+        # 6. ATR / ADX
+        row['ATR'] = self._atr.update(high, low, close)
+        if self._atr_long is not None:
+            row['ATR_Long'] = self._atr_long.update(high, low, close)
+            row['ATR_Ratio'] = _divide(row['ATR'], row['ATR_Long'])
+        row['ADX'] = self._adx.update(high, low, close)
+
+        # 7. 斐波那契水平与信号
+        row.update(self._fib.update(high, low, close, row['Volume_Ratio']))
+
+        row['计算时间'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return row
+
+    def warm_up(self, df):
+        """
+        用历史K线依次更新状态
+        返回:
+            dict: 最后一根K线的指标 (df 为空时为 None)
+        """
+        row = None
+        for bar in df[['最高价', '最低价', '收盘价', '成交量']].to_dict('records'):
+            row = self.update(bar)
+        return row
+
+    def run(self, df):
+        """逐根计算整段K线，返回与 compute_ta_indicators 结构相同的 DataFrame (用于校验)"""
+        rows = [self.update(bar) for bar in df[['最高价', '最低价', '收盘价', '成交量']].to_dict('records')]
+        indicators = pd.DataFrame(rows, index=df.index)
+        return pd.concat([df, indicators], axis=1)
+
+
+def _cross_check(size=5000, timeframes=('15分钟线', '1小时线', '4小时线', '日线')):
+    """与 TA-Lib 批量计算逐列比对，并统计逐根更新的耗时"""
+    import contextlib
+    import io
+    from indicator_benchmark import synthetic_frame
+    from ta_calculator import compute_ta_indicators
+
+    df = synthetic_frame(size)
+    for timeframe_name in timeframes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            params = get_timeframe_params(timeframe_name)
+            batch = compute_ta_indicators(df.copy(), params)
+        engine = IndicatorEngine(params)
+        start = time.perf_counter()
+        streamed = engine.run(df)
+        per_bar = (time.perf_counter() - start) / size
+
+        worst = 0.0
+        for col in batch.columns.drop('计算时间'):
+            expected, actual = batch[col], streamed[col]
+            if expected.dtype.kind == 'f':
+                np.testing.assert_allclose(actual.to_numpy(dtype=np.float64), expected.to_numpy(), rtol=1e-9,
+                                           atol=1e-9, err_msg=col)
+                scale = np.nanmax(np.abs(expected.to_numpy())) or 1.0
+                worst = max(worst, float(np.nanmax(np.abs(actual.to_numpy(dtype=np.float64) - expected.to_numpy()),
+                                                   initial=0.0)) / scale)
+            else:
+                assert (actual.to_numpy() == expected.to_numpy()).all(), col
+        print(f"● {timeframe_name}: {len(batch.columns) - 1} 列一致 (最大相对误差 {worst:.1e})，"
+              f"逐根更新 {per_bar * 1e6:.1f}微秒/根")
+
+
+if __name__ == "__main__":
+    print("实时逐根指标 vs TA-Lib 批量计算")
+    _cross_check()
@@ -0,0 +1,159 @@
+"""
+波段高低点检测模块
+功能：用带确认K线的枢轴点 (pivot) 识别波段高点/低点，作为斐波那契水平的锚点
+说明：
+    - 第 j 根K线的最高价是 [j-k, j+k] 内的最高价时为波段高点，在第 j+k 根K线收盘时确认 (k 为确认K线数)；
+      每根K线只使用当时已经确认的波段点，不看未来数据，历史计算结果与实时逐根更新完全一致
+    - 窗口极值用单调队列维护，每根K线均摊 O(1)，整段序列 O(n)：
+      批量计算使用 pandas rolling (C 实现的单调队列)，实时更新使用 SwingDetector
+    - fibonacci_levels 由锚点和当前价格计算趋势方向与各斐波那契水平，标量和数组输入通用
+"""
+
+from collections import deque
+import numpy as np
+import pandas as pd
+from signal_labels import signal_select
+
+# 斐波那契回调水平
+FIB_RETRACEMENT_LEVELS = [0.0, 0.236, 0.382, 0.5, 0.618, 0.786, 1.0]
+# 斐波那契扩展水平 (移除1.618, 2.0, 2.618)
+FIB_EXTENSION_LEVELS = [1.272, 1.414]
+
+
+def confirm_bars_for(lookback_period):
+    """回看周期 → 确认K线数 (枢轴窗口 2k+1 与原居中窗口长度一致)"""
+    return max(1, lookback_period // 2)
+
+
+class RollingExtrema:
+    """
+    滑动窗口最大值/最小值 (单调队列)
+    说明：队列中保存 (序号, 值)，最大值队列单调递减、最小值队列单调递增，
+          每个值最多入队出队各一次，push 均摊 O(1)
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self._max = deque()
+        self._min = deque()
+
+    def push(self, value):
+        """加入一个新值，返回 (窗口最大值, 窗口最小值)"""
+        index = self.count
+        self.count += 1
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((index, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((index, value))
+        # 移出窗口之外的旧值
+        oldest = index - self.window
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+        return self._max[0][1], self._min[0][1]
+
+    @property
+    def full(self):
+        """窗口是否已填满"""
+        return self.count >= self.window
+
+
+class SwingDetector:
+    """
+    实时波段高低点检测 (每根已收盘K线调用一次 update)
+    参数:
+        confirm_bars: 确认K线数 k，波段点在其后第 k 根K线收盘时确认
+    属性:
+        swing_high/swing_low: 当前最近一个已确认的波段高点/低点价格 (尚未确认时为 NaN)
+    """
+
+    def __init__(self, confirm_bars):
+        self.confirm_bars = confirm_bars
+        self._high_window = RollingExtrema(2 * confirm_bars + 1)
+        self._low_window = RollingExtrema(2 * confirm_bars + 1)
+        self._recent = deque(maxlen=confirm_bars + 1)  # 最近 k+1 根K线的 (最高价, 最低价)
+        self.swing_high = np.nan
+        self.swing_low = np.nan
+
+    def update(self, high, low):
+        """
+        加入一根已收盘K线
+        返回:
+            tuple: (swing_high, swing_low)
+        """
+        window_high, _ = self._high_window.push(high)
+        _, window_low = self._low_window.push(low)
+        self._recent.append((high, low))
+        if self._high_window.full:
+            # 中心K线 (k 根之前) 是窗口极值时确认为波段点
+            center_high, center_low = self._recent[0]
+            if center_high == window_high:
+                self.swing_high = center_high
+            if center_low == window_low:
+                self.swing_low = center_low
+        return self.swing_high, self.swing_low
+
+    def levels(self, price):
+        """当前锚点下某个价格 (如未收盘K线的最新价) 对应的斐波那契水平，O(1)"""
+        return fibonacci_levels(self.swing_high, self.swing_low, price)
+
+
+def swing_anchors(high, low, confirm_bars):
+    """
+    批量计算每根K线收盘时已确认的最近波段高点/低点 (与逐根调用 SwingDetector.update 结果一致)
+    参数:
+        high/low: 最高价/最低价数组
+    返回:
+        tuple: (swing_high, swing_low) 数组，尚未出现已确认波段点的位置为 NaN
+    """
+    window = 2 * confirm_bars + 1
+    anchors = []
+    for values, extreme in ((high, 'max'), (low, 'min')):
+        series = pd.Series(np.asarray(values, dtype=np.float64))
+        rolling = getattr(series.rolling(window=window), extreme)().to_numpy()
+        center = series.shift(confirm_bars).to_numpy()
+        pivots = pd.Series(np.where(rolling == center, center, np.nan))
+        anchors.append(pivots.ffill().to_numpy())
+    return anchors[0], anchors[1]
+
+
+def fibonacci_levels(window_high, window_low, price):
+    """
+    由锚点和价格计算趋势方向与斐波那契水平
+    参数:
+        window_high/window_low/price: 标量或等长数组；锚点无效 (NaN 或高点不高于低点) 时各水平为 NaN
+    返回:
+        tuple: (valid, trend, levels)
+            valid: 锚点是否有效
+            trend: Fib_Trend 编码 (uptrend / downtrend / neutral，见 signal_labels)
+            levels: {列名: 水平价格}，列名同 Fib_Ret_0.382 / Fib_Ext_1.272
+    """
+    window_high = np.asarray(window_high, dtype=np.float64)
+    window_low = np.asarray(window_low, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        valid = window_high > window_low
+    window_high = np.where(valid, window_high, np.nan)
+    window_low = np.where(valid, window_low, np.nan)
+    price_range = window_high - window_low
+
+    # 判断趋势方向 (无效行的位置为 NaN，比较结果为 False，保持 neutral)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        price_position = (np.asarray(price, dtype=np.float64) - window_low) / price_range
+        uptrend = price_position > 0.6
+        downtrend = price_position < 0.4
+    trend = signal_select('Fib_Trend', [uptrend, downtrend], ['uptrend', 'downtrend'], default='neutral')
+
+    levels = {}
+    # 回调水平 - 上升趋势：从高点向下回调；下降趋势/中性：从低点向上
+    for level in FIB_RETRACEMENT_LEVELS:
+        levels[f'Fib_Ret_{level:.3f}'] = np.where(uptrend, window_high - price_range * level,
+                                                  window_low + price_range * level)
+    # 扩展水平 - 上升趋势/中性：高点之上扩展；下降趋势：低点之下扩展
+    for level in FIB_EXTENSION_LEVELS:
+        levels[f'Fib_Ext_{level:.3f}'] = np.where(downtrend, window_low - price_range * (level - 1),
+                                                  window_high + price_range * (level - 1))
+    return valid, trend, levels
@@ -1,11 +1,10 @@
 """
 技术指标计算模块
-功能：加载原始K线数据，使用TA-Lib计算技术指标，并保存结果
-依赖：pandas, numpy, TA-Lib
+功能：加载原始K线数据，计算技术指标，并保存结果
+依赖：pandas, numpy, TA-Lib (可选，未安装时使用纯NumPy实现，见 indicator_backend)
 """
 import pandas as pd
 import numpy as np
-import talib
 import os
 import sys
 from pathlib import Path
@@ -21,7 +20,16 @@ try:
     from config import DATA_DIR, RAW_DATA_FILENAME, INDICATORS_FILENAME, \
         MA_SHORT_TERM, MA_LONG_TERM, MACD_FAST, MACD_SLOW, MACD_SIGNAL, \
         RSI_PERIOD, BB_PERIOD, BB_STD_DEV, ATR_PERIOD, \
-        get_filenames, get_indicator_params
+        CSV_EXPORT_STAGES, get_filenames, get_indicator_params
+    from frame_storage import save_frame, load_frame, frame_exists, find_frame
+    from partitioned_store import write_dataset
+    from result_cache import get_result_cache, result_key, frame_digest
+    from indicator_graph import IndicatorGraph
+    from indicator_backend import get_indicator_backend
+    from signal_labels import signal_code, signal_select, signal_mask, decode_signals, \
+        FIB_VOLUME_SUFFIXES, SIGNAL_DTYPE
+    from swing_detector import swing_anchors, confirm_bars_for, fibonacci_levels, \
+        FIB_RETRACEMENT_LEVELS, FIB_EXTENSION_LEVELS
 
     print("✅ 成功导入 config 模块")
 
@@ -83,9 +91,46 @@ def calculate_indicators(raw_filename=None, indicators_filename=None, timeframe_
     print(f"开始计算技术指标 - {timeframe_name or '日线'}")
     print("=" * 50)
 
-    # 获取针对当前时间周期优化的参数
+    # 1. 确定文件路径
+    if raw_filename:
+        raw_data_path = DATA_DIR / raw_filename
+    else:
+        raw_data_path = DATA_DIR / RAW_DATA_FILENAME
+
+    if not frame_exists(raw_data_path):
+        print(f"❌ 错误: 原始数据文件不存在 - {raw_data_path}")
+        return None
+
+    try:
+        # 列式存储直接得到带类型的 open_time 索引和浮点列 (旧版本CSV同样兼容)
+        df = load_frame(raw_data_path)
+        print(f"✅ 成功加载原始数据, 共 {len(df)} 条记录")
+    except Exception as e:
+        print(f"❌ 加载数据失败: {e}")
+        return None
+
+    # 2. 计算技术指标和信号
+    df = calculate_indicators_frame(df, timeframe_name)
+    if df is None:
+        return None
+
+    # 3. 保存结果
+    if indicators_filename:
+        indicators_path = DATA_DIR / indicators_filename
+    else:
+        indicators_path = DATA_DIR / INDICATORS_FILENAME
+
+    indicators_path = save_indicators(df, indicators_path)
+
+    print(f"✅ 技术指标计算完成! 文件保存至: {indicators_path}")
+
+    return indicators_path
+
+
+def get_timeframe_params(timeframe_name=None):
+    """获取针对时间周期优化的指标参数 (激进模式下再缩短主要指标周期)"""
     if timeframe_name:
-        params = get_indicator_params(timeframe_name)
+        params = dict(get_indicator_params(timeframe_name))
         print(f"📊 使用{timeframe_name}优化参数: {params['description']}")
     else:
         # 使用默认参数
@@ -100,7 +145,6 @@ def calculate_indicators(raw_filename=None, indicators_filename=None, timeframe_
             'BB_STD_DEV': BB_STD_DEV
         }
 
-    # ===== 在calculate_indicators函数中启用激进模式 =====
     # 应用激进模式参数覆盖
     if AGGRESSIVE_MODE_ENABLED:
         print("🚀 应用激进模式参数优化")
@@ -110,58 +154,60 @@ def calculate_indicators(raw_filename=None, indicators_filename=None, timeframe_
         params['MACD_FAST'] = max(8, int(params.get('MACD_FAST', MACD_FAST) * 0.7))
         params['MACD_SLOW'] = max(18, int(params.get('MACD_SLOW', MACD_SLOW) * 0.7))
         params['RSI_PERIOD'] = max(7, int(params.get('RSI_PERIOD', RSI_PERIOD) * 0.7))
+    return params
 
-    # 1. 确定文件路径
-    if raw_filename:
-        raw_data_path = DATA_DIR / raw_filename
-    else:
-        raw_data_path = DATA_DIR / RAW_DATA_FILENAME
-
-    if not raw_data_path.exists():
-        print(f"❌ 错误: 原始数据文件不存在 - {raw_data_path}")
-        return None
 
-    try:
-        # 读取CSV文件，正确处理中文列名
-        df = pd.read_csv(raw_data_path, encoding='utf-8-sig')
-
-        # 检查必要的列是否存在
-        required_columns = ['开盘价', '最高价', '最低价', '收盘价', '成交量']
-        missing_cols = [col for col in required_columns if col not in df.columns]
-        if missing_cols:
-            print(f"❌ 错误: 数据文件缺少必要的列 - {missing_cols}")
-            return None
+def calculate_indicators_frame(raw_df, timeframe_name=None, columns=None):
+    """
+    在内存中计算技术指标 (不读写文件，raw_df 不会被修改)
+    参数:
+        raw_df: 原始数据层 DataFrame (open_time 索引)，也兼容旧版本CSV读出的 open_time 列
+        timeframe_name: 时间周期名称
+        columns: 只需要的指标/信号列 (如 report_generator.REPORT_COLUMNS)，只计算这些列依赖的指标；
+                 None 表示全部
+    返回:
+        DataFrame: 原始数据 + 技术指标 + 信号分析 (指定 columns 时为原始数据 + 这些列)；缺少必要的列时返回 None
+    说明：相同的K线数据、实际参数 (激进模式缩放之后) 和请求列直接返回缓存的结果 (见 result_cache)
+    """
+    params = get_timeframe_params(timeframe_name)
 
-        print(f"✅ 成功加载原始数据, 共 {len(df)} 条记录")
-    except Exception as e:
-        print(f"❌ 加载数据失败: {e}")
+    # 检查必要的列是否存在
+    required_columns = ['开盘价', '最高价', '最低价', '收盘价', '成交量']
+    missing_cols = [col for col in required_columns if col not in raw_df.columns]
+    if missing_cols:
+        print(f"❌ 错误: 数据缺少必要的列 - {missing_cols}")
         return None
 
-    # 2. 转换数据类型
-    df = convert_data_types(df)
-
-    # 3. 计算技术指标
-    df = compute_ta_indicators(df, params)
-
-    # 4. 添加信号分析
-    df = add_signal_analysis(df, params)
-
-    # 5. 保存结果
-    if indicators_filename:
-        indicators_path = DATA_DIR / indicators_filename
+    cache = get_result_cache()
+    key = None
+    if cache is not None:
+        key = result_key('indicators', frame_digest(raw_df), params, AGGRESSIVE_MODE_ENABLED,
+                         sorted(set(columns)) if columns is not None else None, get_indicator_backend().name)
+        cached = cache.get_frame(key)
+        if cached is not None:
+            print("⚡ K线数据和参数未变化，复用缓存的技术指标结果")
+            return cached
+
+    # 1. 转换数据类型 (后续步骤会原地添加列，先复制一份)
+    df = convert_data_types(raw_df.copy())
+
+    if columns is None:
+        # 2. 计算技术指标
+        df = compute_ta_indicators(df, params)
+
+        # 3. 添加信号分析
+        df = add_signal_analysis(df, params)
     else:
-        indicators_path = DATA_DIR / INDICATORS_FILENAME
-
-    save_indicators(df, indicators_path)
-
-    print(f"✅ 技术指标计算完成! 文件保存至: {indicators_path}")
-
-    return indicators_path
+        # 只运行请求列依赖的子图 (信号列由依赖图中的信号分析节点生成)
+        df = compute_ta_indicators(df, params, columns)
+    if key is not None:
+        cache.put_frame(key, df)
+    return df
 
 
 def convert_data_types(df):
     """
-    转换数据类型为适合TA-Lib计算
+    转换数据类型为适合指标计算
     """
     # 转换时间列为datetime类型
     if 'open_time' in df.columns:
@@ -183,16 +229,13 @@ def convert_data_types(df):
     return df
 
 
-# ===== 修改compute_ta_indicators函数 =====
-def compute_ta_indicators(df, params=None):
+def indicator_periods(params=None):
     """
-    使用TA-Lib计算技术指标
-    参数:
-        df: 数据框
-        params: 技术指标参数字典
+    由指标参数字典得到 compute_ta_indicators 实际使用的各指标周期 (含各指标的缩放规则)
+    说明：批量计算和实时逐根计算 (streaming_indicators) 共用，保证两者使用相同的周期
+    返回:
+        dict: 各指标周期，未定义的可选指标为 None
     """
-    print("🔧 计算技术指标中...")
-
     # 使用传入的参数或默认参数
     if params is None:
         params = {
@@ -206,165 +249,211 @@ def compute_ta_indicators(df, params=None):
             'BB_STD_DEV': BB_STD_DEV
         }
 
-    # 提取价格序列
-    close = df['收盘价'].values
-    high = df['最高价'].values
-    low = df['最低价'].values
-    volume = df['成交量'].values
-
-    # 1. 移动平均线系统 - 使用更短周期
-    ma_short = max(5, int(params.get('MA_SHORT_TERM', MA_SHORT_TERM) * 0.7))  # 缩短30%
-    ma_medium = params.get('MA_MEDIUM_TERM', params.get('MA_LONG_TERM', MA_LONG_TERM))
-    ma_long = max(10, int(params.get('MA_LONG_TERM', MA_LONG_TERM) * 0.8))  # 缩短20%
+    macd_signal = params.get('MACD_SIGNAL', MACD_SIGNAL)
+    return {
+        # 移动平均线系统 - 使用更短周期 (短期缩短30%，长期缩短20%)
+        'ma_short': max(5, int(params.get('MA_SHORT_TERM', MA_SHORT_TERM) * 0.7)),
+        'ma_medium': params.get('MA_MEDIUM_TERM', params.get('MA_LONG_TERM', MA_LONG_TERM)),
+        'ma_long': max(10, int(params.get('MA_LONG_TERM', MA_LONG_TERM) * 0.8)),
+        'ma_extra_long': params.get('MA_EXTRA_LONG'),
+        # MACD - 使用更灵敏的参数 (缩短30%)
+        'macd_fast': max(8, int(params.get('MACD_FAST', MACD_FAST) * 0.7)),
+        'macd_slow': max(18, int(params.get('MACD_SLOW', MACD_SLOW) * 0.7)),
+        'macd_signal': macd_signal,
+        'macd_long_fast': params.get('MACD_LONG_FAST'),
+        'macd_long_slow': params.get('MACD_LONG_SLOW'),
+        'macd_long_signal': params.get('MACD_LONG_SIGNAL', macd_signal),
+        # RSI - 使用更短周期 (缩短30%)
+        'rsi_period': max(7, int(params.get('RSI_PERIOD', RSI_PERIOD) * 0.7)),
+        'rsi_secondary': params.get('RSI_SECONDARY'),
+        'rsi_long': params.get('RSI_LONG'),
+        'rsi_extra_long': params.get('RSI_EXTRA_LONG'),
+        # 布林带 - 放宽波动范围 (标准差放宽50%)
+        'bb_period': params.get('BB_PERIOD', BB_PERIOD),
+        'bb_std_dev': min(3.0, params.get('BB_STD_DEV', BB_STD_DEV) * 1.5),
+        'bb_long_period': params.get('BB_LONG_PERIOD'),
+        # 随机指标、ATR、ADX
+        'stoch_fastk': params.get('STOCH_FASTK', 14),
+        'stoch_slowk': params.get('STOCH_SLOWK', 3),
+        'stoch_slowd': params.get('STOCH_SLOWD', 3),
+        'atr_period': params.get('ATR_PERIOD', ATR_PERIOD),
+        'atr_long_period': params.get('ATR_LONG_PERIOD'),
+        'adx_period': params.get('ADX_PERIOD', 14),
+        # 斐波那契回看周期
+        'fib_lookback': params.get('FIB_LOOKBACK_PERIOD', 50),
+    }
+
+
+# add_signal_analysis 读取的指标列 (MA3、Volume_Ratio、Fib_Price_Position、长期RSI/MACD 存在时才会用到)
+SIGNAL_INPUT_COLUMNS = [
+    '收盘价', 'MA3', 'MA20', 'MA50', 'MACD', 'MACD_Signal', 'MACD_Long', 'RSI', 'RSI_Long',
+    'BB_Upper', 'BB_Middle', 'BB_Lower', 'Stoch_SlowK', 'Stoch_SlowD', 'Volume_Ratio', 'Fib_Price_Position',
+]
+# add_signal_analysis 生成的信号列 (按生成顺序)
+SIGNAL_COLUMNS = [
+    'MA_Fast_Signal', 'MA_Signal', 'MACD_Signal_Analysis', 'MACD_Zero_Cross', 'RSI_Signal',
+    'BB_Width', 'BB_Squeeze', 'BB_Breakout_Strength', 'BB_Signal', 'Stoch_Signal', 'Fib_Key_Zone', '综合信号',
+]
+
+
+def build_indicator_graph(periods, n_rows, params=None, backend=None):
+    """
+    按指标周期构建指标依赖图 (节点声明顺序即 compute_ta_indicators 的输出列顺序)
+    参数:
+        periods: indicator_periods 返回的周期字典
+        n_rows: 数据行数 (超长周期指标只在数据量不少于周期时计算)
+        params: 技术指标参数字典 (传给信号分析节点)
+        backend: 指标计算后端 (indicator_backend.get_indicator_backend)，默认按 config.INDICATOR_BACKEND 选择
+    返回:
+        IndicatorGraph: 最后一个节点 'signals' 为 add_signal_analysis 的信号列
+    """
+    ta = backend or get_indicator_backend()
+    graph = IndicatorGraph()
+    close, high, low, volume = '收盘价', '最高价', '最低价', '成交量'
+    hlc = [high, low, close]
 
-    # 增加超短期均线 (3日)
-    df['MA3'] = talib.MA(close, timeperiod=3)
+    def ma_node(column, source, period):
+        graph.add(column, [source], [column], lambda d: ta.MA(d[source], timeperiod=period))
 
-    # 基础MA计算
-    df[f'MA{ma_short}'] = talib.MA(close, timeperiod=ma_short)
-    df[f'MA{ma_medium}'] = talib.MA(close, timeperiod=ma_medium)
+    def alias_node(column, source):
+        if column != source:
+            graph.add(column, [source], [column], lambda d: d[source])
 
-    # 长期MA (利用300条数据)
+    # 1. 移动平均线系统 (超短期MA3、短/中/长期、超长期)，并保留 MA20/MA50 兼容列名
+    ma_short, ma_medium, ma_long = periods['ma_short'], periods['ma_medium'], periods['ma_long']
+    ma_list = [3, ma_short, ma_medium]
     if ma_long != ma_medium:
-        df[f'MA{ma_long}'] = talib.MA(close, timeperiod=ma_long)
-
-    # 超长期MA (如果有定义)
-    ma_extra_long = params.get('MA_EXTRA_LONG')
-    if ma_extra_long and ma_extra_long <= len(df):
-        df[f'MA{ma_extra_long}'] = talib.MA(close, timeperiod=ma_extra_long)
-
-    # 为了保持向后兼容，也保留MA20和MA50列名
-    df['MA20'] = df[f'MA{ma_short}']
-    df['MA50'] = df[f'MA{ma_medium}']
-
-    # 新增长期MA列
+        ma_list.append(ma_long)
+    ma_extra_long = periods['ma_extra_long']
+    if ma_extra_long and ma_extra_long <= n_rows:
+        ma_list.append(ma_extra_long)
+    for period in dict.fromkeys(ma_list):
+        ma_node(f'MA{period}', close, period)
+    alias_node('MA20', f'MA{ma_short}')
+    alias_node('MA50', f'MA{ma_medium}')
     if ma_long > 50:
-        df['MA_LONG'] = df[f'MA{ma_long}']
-
-    # 2. MACD - 使用更灵敏的参数
-    macd_fast = max(8, int(params.get('MACD_FAST', MACD_FAST) * 0.7))  # 缩短30%
-    macd_slow = max(18, int(params.get('MACD_SLOW', MACD_SLOW) * 0.7))  # 缩短30%
-    macd_signal = params.get('MACD_SIGNAL', MACD_SIGNAL)
-    macd, macd_signal_line, macd_hist = talib.MACD(
-        close,
-        fastperiod=macd_fast,
-        slowperiod=macd_slow,
-        signalperiod=macd_signal
-    )
-    df['MACD'] = macd
-    df['MACD_Signal'] = macd_signal_line
-    df['MACD_Hist'] = macd_hist
-
-    # 长期MACD (如果定义)
-    macd_long_fast = params.get('MACD_LONG_FAST')
-    macd_long_slow = params.get('MACD_LONG_SLOW')
-    if macd_long_fast and macd_long_slow:
-        macd_long_signal = params.get('MACD_LONG_SIGNAL', macd_signal)
-        macd_long, macd_long_signal_line, macd_long_hist = talib.MACD(
-            close,
-            fastperiod=macd_long_fast,
-            slowperiod=macd_long_slow,
-            signalperiod=macd_long_signal
-        )
-        df['MACD_Long'] = macd_long
-        df['MACD_Long_Signal'] = macd_long_signal_line
-        df['MACD_Long_Hist'] = macd_long_hist
-
-    # 3. RSI - 使用更短周期
-    rsi_period = max(7, int(params.get('RSI_PERIOD', RSI_PERIOD) * 0.7))  # 缩短30%
-    df['RSI'] = talib.RSI(close, timeperiod=rsi_period)
-
-    # 辅助RSI (如果定义)
-    rsi_secondary = params.get('RSI_SECONDARY')
-    if rsi_secondary and rsi_secondary != rsi_period:
-        df['RSI_Secondary'] = talib.RSI(close, timeperiod=rsi_secondary)
-
-    # 长期RSI (如果定义)
-    rsi_long = params.get('RSI_LONG')
-    if rsi_long and rsi_long != rsi_period:
-        df['RSI_Long'] = talib.RSI(close, timeperiod=rsi_long)
-
-    # 超长期RSI (如果定义)
-    rsi_extra_long = params.get('RSI_EXTRA_LONG')
-    if rsi_extra_long and rsi_extra_long <= len(df):
-        df['RSI_Extra_Long'] = talib.RSI(close, timeperiod=rsi_extra_long)
-
-    # 4. 布林带 - 放宽波动范围
-    bb_period = params.get('BB_PERIOD', BB_PERIOD)
-    bb_std_dev = min(3.0, params.get('BB_STD_DEV', BB_STD_DEV) * 1.5)  # 放宽50%
-    upper, middle, lower = talib.BBANDS(
-        close,
-        timeperiod=bb_period,
-        nbdevup=bb_std_dev,
-        nbdevdn=bb_std_dev
-    )
-    df['BB_Upper'] = upper
-    df['BB_Middle'] = middle
-    df['BB_Lower'] = lower
-
-    # 5. 添加成交量指标 - 量价确认
-    df['Volume_MA20'] = talib.MA(volume, timeperiod=20)
-    df['Volume_Ratio'] = volume / df['Volume_MA20']
-
-    # 长期布林带 (如果定义)
-    bb_long_period = params.get('BB_LONG_PERIOD')
-    if bb_long_period and bb_long_period <= len(df):
-        upper_long, middle_long, lower_long = talib.BBANDS(
-            close,
-            timeperiod=bb_long_period,
-            nbdevup=bb_std_dev,
-            nbdevdn=bb_std_dev
-        )
-        df['BB_Long_Upper'] = upper_long
-        df['BB_Long_Middle'] = middle_long
-        df['BB_Long_Lower'] = lower_long
-
-    # 5. 随机指标
-    stoch_fastk = params.get('STOCH_FASTK', 14)
-    stoch_slowk = params.get('STOCH_SLOWK', 3)
-    stoch_slowd = params.get('STOCH_SLOWD', 3)
-    slowk, slowd = talib.STOCH(
-        high, low, close,
-        fastk_period=stoch_fastk,
-        slowk_period=stoch_slowk,
-        slowk_matype=0,
-        slowd_period=stoch_slowd,
-        slowd_matype=0
-    )
-    df['Stoch_SlowK'] = slowk
-    df['Stoch_SlowD'] = slowd
-
-    # 6. 成交量指标
-    df['OBV'] = talib.OBV(close, volume)
-
-    # 7. 多重ATR系统（平均真实波幅）(300条数据优化版)
-    # 主ATR
-    atr_period = params.get('ATR_PERIOD', ATR_PERIOD)
-    df['ATR'] = talib.ATR(high, low, close, timeperiod=atr_period)
-
-    # 长期ATR (如果定义)
-    atr_long_period = params.get('ATR_LONG_PERIOD')
+        alias_node('MA_LONG', f'MA{ma_long}')
+
+    # 2. MACD 及长期MACD
+    graph.add('MACD', [close], ['MACD', 'MACD_Signal', 'MACD_Hist'],
+              lambda d: ta.MACD(d[close], fastperiod=periods['macd_fast'], slowperiod=periods['macd_slow'],
+                                   signalperiod=periods['macd_signal']))
+    if periods['macd_long_fast'] and periods['macd_long_slow']:
+        graph.add('MACD_Long', [close], ['MACD_Long', 'MACD_Long_Signal', 'MACD_Long_Hist'],
+                  lambda d: ta.MACD(d[close], fastperiod=periods['macd_long_fast'],
+                                       slowperiod=periods['macd_long_slow'],
+                                       signalperiod=periods['macd_long_signal']))
+
+    # 3. RSI 及辅助/长期/超长期RSI
+    rsi_period = periods['rsi_period']
+    rsi_list = [('RSI', rsi_period)]
+    if periods['rsi_secondary'] and periods['rsi_secondary'] != rsi_period:
+        rsi_list.append(('RSI_Secondary', periods['rsi_secondary']))
+    if periods['rsi_long'] and periods['rsi_long'] != rsi_period:
+        rsi_list.append(('RSI_Long', periods['rsi_long']))
+    if periods['rsi_extra_long'] and periods['rsi_extra_long'] <= n_rows:
+        rsi_list.append(('RSI_Extra_Long', periods['rsi_extra_long']))
+    for column, period in rsi_list:
+        graph.add(column, [close], [column], lambda d, period=period: ta.RSI(d[close], timeperiod=period))
+
+    # 4. 布林带、成交量均线、长期布林带
+    bb_std_dev = periods['bb_std_dev']
+    graph.add('BBANDS', [close], ['BB_Upper', 'BB_Middle', 'BB_Lower'],
+              lambda d: ta.BBANDS(d[close], timeperiod=periods['bb_period'], nbdevup=bb_std_dev,
+                                     nbdevdn=bb_std_dev))
+    ma_node('Volume_MA20', volume, 20)
+    graph.add('Volume_Ratio', [volume, 'Volume_MA20'], ['Volume_Ratio'], lambda d: d[volume] / d['Volume_MA20'])
+    bb_long_period = periods['bb_long_period']
+    if bb_long_period and bb_long_period <= n_rows:
+        graph.add('BBANDS_Long', [close], ['BB_Long_Upper', 'BB_Long_Middle', 'BB_Long_Lower'],
+                  lambda d: ta.BBANDS(d[close], timeperiod=bb_long_period, nbdevup=bb_std_dev,
+                                         nbdevdn=bb_std_dev))
+
+    # 5. 随机指标、OBV
+    graph.add('STOCH', hlc, ['Stoch_SlowK', 'Stoch_SlowD'],
+              lambda d: ta.STOCH(d[high], d[low], d[close], fastk_period=periods['stoch_fastk'],
+                                    slowk_period=periods['stoch_slowk'], slowk_matype=0,
+                                    slowd_period=periods['stoch_slowd'], slowd_matype=0))
+    graph.add('OBV', [close, volume], ['OBV'], lambda d: ta.OBV(d[close], d[volume]))
+
+    # 6. ATR (长期ATR及其比率)、ADX
+    atr_period, atr_long_period = periods['atr_period'], periods['atr_long_period']
+    graph.add('ATR', hlc, ['ATR'], lambda d: ta.ATR(d[high], d[low], d[close], timeperiod=atr_period))
     if atr_long_period and atr_long_period != atr_period:
-        df['ATR_Long'] = talib.ATR(high, low, close, timeperiod=atr_long_period)
-
-        # ATR比率 (短期ATR / 长期ATR) - 波动率变化指标
-        df['ATR_Ratio'] = df['ATR'] / df['ATR_Long']
-
-    # 8. ADX（平均趋向指数）
-    adx_period = params.get('ADX_PERIOD', 14)
-    df['ADX'] = talib.ADX(high, low, close, timeperiod=adx_period)
-
-    # 9. 斐波那契水平计算
-    fib_lookback = params.get('FIB_LOOKBACK_PERIOD', 50)
-    df = calculate_fibonacci_levels(df, lookback_period=fib_lookback)
-
-    # 10. 斐波那契交易信号
-    df = add_fibonacci_signals(df)
+        def atr_long(d):
+            atr_long_values = ta.ATR(d[high], d[low], d[close], timeperiod=atr_long_period)
+            return atr_long_values, d['ATR'] / atr_long_values
+        graph.add('ATR_Long', hlc + ['ATR'], ['ATR_Long', 'ATR_Ratio'], atr_long)
+    graph.add('ADX', hlc, ['ADX'], lambda d: ta.ADX(d[high], d[low], d[close], timeperiod=periods['adx_period']))
+
+    # 7. 斐波那契：波段锚点 (内部中间结果) → 各水平 → 交易信号
+    confirm_bars = confirm_bars_for(periods['fib_lookback'])
+    graph.add('swing_anchors', [high, low], ['_Swing_High', '_Swing_Low'],
+              lambda d: swing_anchors(np.asarray(d[high], dtype=np.float64),
+                                      np.asarray(d[low], dtype=np.float64), confirm_bars))
+    level_columns = [f'Fib_Ret_{level:.3f}' for level in FIB_RETRACEMENT_LEVELS] + \
+                    [f'Fib_Ext_{level:.3f}' for level in FIB_EXTENSION_LEVELS]
+    graph.add('fibonacci_levels', ['_Swing_High', '_Swing_Low', close],
+              level_columns + ['Fib_Trend', 'Fib_High', 'Fib_Low'],
+              lambda d: fibonacci_level_columns(d['_Swing_High'], d['_Swing_Low'], d[close]))
+    graph.add('fibonacci_signals', [close, 'Fib_Trend', 'Fib_High', 'Fib_Low', 'Volume_Ratio'] + FIB_KEY_LEVELS,
+              ['Fib_Signal', 'Fib_Support_Level', 'Fib_Resistance_Level', 'Fib_Price_Position'],
+              lambda d: fibonacci_signal_columns(
+                  np.asarray(d[close], dtype=np.float64), np.asarray(d['Fib_Trend']),
+                  {col: np.asarray(d[col], dtype=np.float64) for col in FIB_KEY_LEVELS},
+                  np.asarray(d['Fib_High'], dtype=np.float64), np.asarray(d['Fib_Low'], dtype=np.float64),
+                  np.asarray(d['Volume_Ratio'], dtype=np.float64)))
+
+    # 8. 计算时间戳
+    graph.add('计算时间', [], ['计算时间'], lambda d: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+    # 9. 信号分析 (只由本节点的输入列构造数据框，结果与对完整指标数据调用 add_signal_analysis 相同)
+    def signals(d):
+        frame = add_signal_analysis(pd.DataFrame({col: d[col] for col in SIGNAL_INPUT_COLUMNS if col in d}), params)
+        return {col: frame[col].to_numpy() for col in SIGNAL_COLUMNS if col in frame.columns}
+    graph.add('signals', SIGNAL_INPUT_COLUMNS, SIGNAL_COLUMNS, signals)
+
+    return graph
+
+
+def compute_ta_indicators(df, params=None, columns=None, backend=None):
+    """
+    计算技术指标
+    参数:
+        df: 数据框
+        params: 技术指标参数字典
+        columns: 需要的列 (可包含 SIGNAL_COLUMNS 中的信号列)；None 表示全部技术指标列 (不含信号分析)，
+                 指定时只运行这些列依赖的指标节点 (见 build_indicator_graph)
+        backend: 指标计算后端，默认按 config.INDICATOR_BACKEND 选择 (TA-Lib 或纯NumPy实现)
+    """
+    graph = build_indicator_graph(indicator_periods(params), len(df), params, backend)
+    if columns is None:
+        print("🔧 计算技术指标中...")
+        columns = graph.columns(exclude=('signals',))
+    else:
+        nodes, _ = graph.resolve(columns)
+        print(f"🔧 按需计算技术指标: {len(columns)} 列，运行 {len(nodes)}/{len(graph)} 个指标节点")
+    return graph.compute(df, columns)
 
-    # 添加计算时间戳
-    df['计算时间'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    return df
+def fibonacci_level_columns(window_high, window_low, close):
+    """
+    由已确认的波段锚点计算斐波那契水平列
+    返回:
+        dict: Fib_Ret_* / Fib_Ext_* / Fib_Trend / Fib_High / Fib_Low
+    说明：锚点无效 (尚未确认或高点不高于低点) 的行保持最近的有效值；趋势保持 neutral
+    """
+    valid, trend, levels = fibonacci_levels(window_high, window_low, np.asarray(close, dtype=np.float64))
+    filled = pd.DataFrame({
+        **levels,
+        'Fib_High': np.where(valid, window_high, np.nan),
+        'Fib_Low': np.where(valid, window_low, np.nan),
+    }).ffill()
+    columns = {col: filled[col].to_numpy() for col in levels}
+    columns['Fib_Trend'] = trend
+    columns['Fib_High'] = filled['Fib_High'].to_numpy()
+    columns['Fib_Low'] = filled['Fib_Low'].to_numpy()
+    return columns
 
 
 def calculate_fibonacci_levels(df, lookback_period=50):
@@ -372,202 +461,122 @@ def calculate_fibonacci_levels(df, lookback_period=50):
     计算斐波那契回调和扩展水平
     参数:
         df: 数据框，包含高低价数据
-        lookback_period: 回看周期，用于确定高低点
+        lookback_period: 回看周期，用于确定波段高低点 (确认K线数为其一半)
     返回:
         df: 添加了斐波那契水平的数据框
+    说明：锚点为每根K线收盘时已确认的最近波段高点/低点 (见 swing_detector)，不使用未来数据，
+          最新一根K线的水平同样有效，与实时逐根计算的结果一致
     """
     print("🔢 计算斐波那契水平...")
 
-    # 斐波那契回调水平
-    fib_retracement_levels = [0.0, 0.236, 0.382, 0.5, 0.618, 0.786, 1.0]
-    # 斐波那契扩展水平 (移除1.618, 2.0, 2.618)
-    fib_extension_levels = [1.272, 1.414]
-
-    # 初始化斐波那契列
-    for level in fib_retracement_levels:
-        df[f'Fib_Ret_{level:.3f}'] = np.nan
-
-    for level in fib_extension_levels:
-        df[f'Fib_Ext_{level:.3f}'] = np.nan
-
-    # 添加趋势方向和关键点
-    df['Fib_Trend'] = 'neutral'
-    df['Fib_High'] = np.nan
-    df['Fib_Low'] = np.nan
-
-    # 计算滚动高低点
-    df['Rolling_High'] = df['最高价'].rolling(window=lookback_period, center=True).max()
-    df['Rolling_Low'] = df['最低价'].rolling(window=lookback_period, center=True).min()
-
-    for i in range(lookback_period, len(df) - lookback_period):
-        # 获取当前窗口的高低点
-        window_high = df['Rolling_High'].iloc[i]
-        window_low = df['Rolling_Low'].iloc[i]
-        current_price = df['收盘价'].iloc[i]
-
-        if pd.notna(window_high) and pd.notna(window_low) and window_high != window_low:
-            # 记录关键点
-            df.loc[df.index[i], 'Fib_High'] = window_high
-            df.loc[df.index[i], 'Fib_Low'] = window_low
-
-            # 判断趋势方向
-            price_range = window_high - window_low
-            price_position = (current_price - window_low) / price_range
-
-            if price_position > 0.6:
-                trend = 'uptrend'
-            elif price_position < 0.4:
-                trend = 'downtrend'
-            else:
-                trend = 'neutral'
-
-            df.loc[df.index[i], 'Fib_Trend'] = trend
-
-            # 计算斐波那契回调水平
-            for level in fib_retracement_levels:
-                if trend == 'uptrend':
-                    # 上升趋势：从低点向高点的回调
-                    fib_price = window_high - (window_high - window_low) * level
-                elif trend == 'downtrend':
-                    # 下降趋势：从高点向低点的回调
-                    fib_price = window_low + (window_high - window_low) * level
-                else:
-                    # 中性趋势：使用中点
-                    fib_price = window_low + (window_high - window_low) * level
-
-                df.loc[df.index[i], f'Fib_Ret_{level:.3f}'] = fib_price
-
-            # 计算斐波那契扩展水平
-            for level in fib_extension_levels:
-                if trend == 'uptrend':
-                    # 上升趋势扩展
-                    fib_price = window_high + (window_high - window_low) * (level - 1)
-                elif trend == 'downtrend':
-                    # 下降趋势扩展
-                    fib_price = window_low - (window_high - window_low) * (level - 1)
-                else:
-                    # 中性趋势扩展
-                    fib_price = window_high + (window_high - window_low) * (level - 1)
-
-                df.loc[df.index[i], f'Fib_Ext_{level:.3f}'] = fib_price
-
-    # 清理临时列
-    df.drop(['Rolling_High', 'Rolling_Low'], axis=1, inplace=True)
-
-    # 前向填充斐波那契水平（保持最近的有效值）
-    fib_columns = [col for col in df.columns if col.startswith('Fib_')]
-    for col in fib_columns:
-        if col not in ['Fib_Trend', 'Fib_High', 'Fib_Low']:
-            df[col] = df[col].ffill()  # 使用新的方法替代fillna(method='ffill')
-
-    # 填充趋势和关键点
-    df['Fib_Trend'] = df['Fib_Trend'].ffill()
-    df['Fib_High'] = df['Fib_High'].ffill()
-    df['Fib_Low'] = df['Fib_Low'].ffill()
-
-    print(f"✅ 斐波那契水平计算完成，添加了{len(fib_retracement_levels + fib_extension_levels) + 3}个斐波那契指标")
+    # 已确认的波段高低点
+    window_high, window_low = swing_anchors(df['最高价'].to_numpy(dtype=np.float64),
+                                            df['最低价'].to_numpy(dtype=np.float64),
+                                            confirm_bars_for(lookback_period))
+    for col, values in fibonacci_level_columns(window_high, window_low, df['收盘价']).items():
+        df[col] = values
+
+    print(f"✅ 斐波那契水平计算完成，添加了{len(FIB_RETRACEMENT_LEVELS + FIB_EXTENSION_LEVELS) + 3}个斐波那契指标")
 
     return df
 
+
+# 关键斐波那契水平
+FIB_KEY_LEVELS = ['Fib_Ret_0.382', 'Fib_Ret_0.500', 'Fib_Ret_0.618', 'Fib_Ext_1.272', 'Fib_Ext_1.414']
+
+
 def add_fibonacci_signals(df):
     """
     添加基于斐波那契水平的交易信号
+    说明：整列向量化计算，结果与逐行实现 (indicator_benchmark 中的参考实现) 完全一致
     """
     print("🎯 生成斐波那契交易信号...")
 
-    # 初始化信号列
-    df['Fib_Signal'] = 'neutral'
-    df['Fib_Support_Level'] = np.nan
-    df['Fib_Resistance_Level'] = np.nan
-    df['Fib_Price_Position'] = np.nan
-
-    # 关键斐波那契水平
-    key_retracement_levels = ['Fib_Ret_0.382', 'Fib_Ret_0.500', 'Fib_Ret_0.618']
-    key_extension_levels = ['Fib_Ext_1.272', 'Fib_Ext_1.414']
-
-    for i in range(len(df)):
-        current_price = df['收盘价'].iloc[i]
-        trend = df['Fib_Trend'].iloc[i]
-
-        if pd.notna(current_price) and trend != 'neutral':
-            # 找到最近的支撑和阻力水平
-            support_levels = []
-            resistance_levels = []
-
-            # 检查回调水平
-            for level_col in key_retracement_levels:
-                if level_col in df.columns:
-                    level_price = df[level_col].iloc[i]
-                    if pd.notna(level_price):
-                        if level_price < current_price:
-                            support_levels.append(level_price)
-                        elif level_price > current_price:
-                            resistance_levels.append(level_price)
-
-            # 检查扩展水平
-            for level_col in key_extension_levels:
-                if level_col in df.columns:
-                    level_price = df[level_col].iloc[i]
-                    if pd.notna(level_price):
-                        if trend == 'uptrend' and level_price > current_price:
-                            resistance_levels.append(level_price)
-                        elif trend == 'downtrend' and level_price < current_price:
-                            support_levels.append(level_price)
-
-            # 确定最近的支撑和阻力
-            if support_levels:
-                nearest_support = max(support_levels)  # 最近的支撑（最高的支撑位）
-                df.loc[df.index[i], 'Fib_Support_Level'] = nearest_support
-
-            if resistance_levels:
-                nearest_resistance = min(resistance_levels)  # 最近的阻力（最低的阻力位）
-                df.loc[df.index[i], 'Fib_Resistance_Level'] = nearest_resistance
-
-            # 计算价格在斐波那契区间的位置
-            fib_high = df['Fib_High'].iloc[i]
-            fib_low = df['Fib_Low'].iloc[i]
-            if pd.notna(fib_high) and pd.notna(fib_low) and fib_high != fib_low:
-                price_position = (current_price - fib_low) / (fib_high - fib_low)
-                df.loc[df.index[i], 'Fib_Price_Position'] = price_position
-
-                # 生成交易信号
-                tolerance = 0.02  # 2%的容差
-
-                # 检查是否接近关键斐波那契水平
-                if abs(price_position - 0.382) < tolerance:
-                    signal = 'fib_382_bounce' if trend == 'uptrend' else 'fib_382_reject'
-                elif abs(price_position - 0.5) < tolerance:
-                    signal = 'fib_50_bounce' if trend == 'uptrend' else 'fib_50_reject'
-                elif abs(price_position - 0.618) < tolerance:
-                    signal = 'fib_618_bounce' if trend == 'uptrend' else 'fib_618_reject'
-                elif price_position > 1.0:
-                    signal = 'fib_breakout_up'
-                elif price_position < 0.0:
-                    signal = 'fib_breakout_down'
-                elif 0.618 < price_position < 0.786:
-                    signal = 'fib_golden_zone'
-                else:
-                    signal = 'neutral'
-
-                # 增强信号检测 - 添加成交量确认
-                if signal != 'neutral' and 'Volume_Ratio' in df.columns:
-                    vol_ratio = df['Volume_Ratio'].iloc[i]
-                    if vol_ratio > 1.2:
-                        signal = signal + "_带量"
-                    elif vol_ratio < 0.8:
-                        signal = signal + "_缩量"
-
-                df.loc[df.index[i], 'Fib_Signal'] = signal
+    columns = fibonacci_signal_columns(
+        df['收盘价'].to_numpy(dtype=np.float64),
+        df['Fib_Trend'].to_numpy(),
+        {col: df[col].to_numpy(dtype=np.float64) for col in FIB_KEY_LEVELS if col in df.columns},
+        df['Fib_High'].to_numpy(dtype=np.float64),
+        df['Fib_Low'].to_numpy(dtype=np.float64),
+        df['Volume_Ratio'].to_numpy(dtype=np.float64) if 'Volume_Ratio' in df.columns else None,
+    )
+    for col, values in columns.items():
+        df[col] = values
 
     print("✅ 斐波那契交易信号生成完成")
     return df
 
+
+def fibonacci_signal_columns(current_price, trend, key_levels, fib_high, fib_low, vol_ratio=None):
+    """
+    斐波那契信号的数组计算 (批量和实时逐根计算共用)
+    参数:
+        current_price/trend/fib_high/fib_low/vol_ratio: 等长数组 (trend 为 Fib_Trend 编码)
+        key_levels: {列名: 数组}，Fib_Ret_* 为回调水平，Fib_Ext_* 为扩展水平
+    返回:
+        dict: Fib_Signal (编码，见 signal_labels) / Fib_Support_Level / Fib_Resistance_Level / Fib_Price_Position
+    """
+    uptrend = trend == signal_code('Fib_Trend', 'uptrend')
+    downtrend = trend == signal_code('Fib_Trend', 'downtrend')
+    active = ~np.isnan(current_price) & (trend != signal_code('Fib_Trend', 'neutral'))
+
+    # 找到最近的支撑和阻力水平：低于现价的水平中取最高，高于现价的水平中取最低 (NaN 比较结果为 False，自动排除)
+    supports, resistances = [], []
+    for level_col, level_price in key_levels.items():
+        if level_col.startswith('Fib_Ret'):
+            supports.append(np.where(level_price < current_price, level_price, np.nan))
+            resistances.append(np.where(level_price > current_price, level_price, np.nan))
+        else:
+            # 扩展水平：上升趋势只作阻力，下降趋势只作支撑
+            supports.append(np.where(downtrend & (level_price < current_price), level_price, np.nan))
+            resistances.append(np.where(uptrend & (level_price > current_price), level_price, np.nan))
+
+    no_levels = np.full(len(current_price), np.nan)
+    nearest_support = np.fmax.reduce(supports) if supports else no_levels
+    nearest_resistance = np.fmin.reduce(resistances) if resistances else no_levels
+
+    # 计算价格在斐波那契区间的位置
+    positioned = active & ~np.isnan(fib_high) & ~np.isnan(fib_low) & (fib_high != fib_low)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        price_position = np.where(positioned, (current_price - fib_low) / (fib_high - fib_low), np.nan)
+
+        # 生成交易信号 (按顺序优先匹配，编码为 signal_labels.FIB_SIGNAL_NAMES 中的位置)
+        tolerance = 0.02  # 2%的容差
+        bounce_or_reject = np.where(uptrend, 0, 1)
+        fib_code = np.select(
+            [
+                np.abs(price_position - 0.382) < tolerance,
+                np.abs(price_position - 0.5) < tolerance,
+                np.abs(price_position - 0.618) < tolerance,
+                price_position > 1.0,
+                price_position < 0.0,
+                (price_position > 0.618) & (price_position < 0.786),
+            ],
+            [1 + bounce_or_reject, 3 + bounce_or_reject, 5 + bounce_or_reject, 7, 8, 9],
+            default=0,
+        )
+
+    # 增强信号检测 - 添加成交量确认
+    volume_code = np.zeros(len(current_price), dtype=np.int64)
+    if vol_ratio is not None:
+        volume_code = np.select([vol_ratio > 1.2, vol_ratio < 0.8], [1, 2], default=0)
+    volume_code[fib_code == 0] = 0
+
+    return {
+        'Fib_Signal': (fib_code * len(FIB_VOLUME_SUFFIXES) + volume_code).astype(SIGNAL_DTYPE),
+        'Fib_Support_Level': np.where(active, nearest_support, np.nan),
+        'Fib_Resistance_Level': np.where(active, nearest_resistance, np.nan),
+        'Fib_Price_Position': price_position,
+    }
+
 def add_signal_analysis(df, params=None):
     """
     添加基于指标的交易信号分析
     参数:
         df: 数据框
         params: 技术指标参数字典
+    说明：信号列保存为整数编码 (int8)，综合信号的规则直接在编码上组合；
+          编码与中文标签的对应见 signal_labels，导出CSV和生成报告时才转换为标签
     """
     print("🔍 添加信号分析...")
 
@@ -584,27 +593,31 @@ def add_signal_analysis(df, params=None):
 
     # 1. 移动平均线交叉信号 - 增加超短期均线交叉
     if 'MA3' in df.columns:
-        df['MA_Fast_Signal'] = np.where(
-            df['MA3'] > df['MA20'],
-            '快速金叉',
-            np.where(df['MA3'] < df['MA20'], '快速死叉', '中性')
+        df['MA_Fast_Signal'] = signal_select(
+            'MA_Fast_Signal',
+            [df['MA3'] > df['MA20'], df['MA3'] < df['MA20']],
+            ['快速金叉', '快速死叉'],
+            default='中性'
         )
 
     # 保持原有MA信号
-    df['MA_Signal'] = np.where(
-        df['MA20'] > df['MA50'],
-        '金叉',
-        np.where(df['MA20'] < df['MA50'], '死叉', '中性')
+    df['MA_Signal'] = signal_select(
+        'MA_Signal',
+        [df['MA20'] > df['MA50'], df['MA20'] < df['MA50']],
+        ['金叉', '死叉'],
+        default='中性'
     )
 
     # 2. MACD信号 - 增加零轴交叉检测
-    df['MACD_Signal_Analysis'] = np.where(
-        df['MACD'] > df['MACD_Signal'],
-        '看涨',
-        np.where(df['MACD'] < df['MACD_Signal'], '看跌', '中性')
+    df['MACD_Signal_Analysis'] = signal_select(
+        'MACD_Signal_Analysis',
+        [df['MACD'] > df['MACD_Signal'], df['MACD'] < df['MACD_Signal']],
+        ['看涨', '看跌'],
+        default='中性'
     )
 
-    df['MACD_Zero_Cross'] = np.select(
+    df['MACD_Zero_Cross'] = signal_select(
+        'MACD_Zero_Cross',
         [
             (df['MACD'] > 0) & (df['MACD'].shift(1) <= 0),
             (df['MACD'] < 0) & (df['MACD'].shift(1) >= 0)
@@ -614,7 +627,8 @@ def add_signal_analysis(df, params=None):
     )
 
     # 3. RSI信号 - 使用更激进的阈值
-    df['RSI_Signal'] = np.select(
+    df['RSI_Signal'] = signal_select(
+        'RSI_Signal',
         [
             df['RSI'] >= rsi_overbought,
             df['RSI'] <= rsi_oversold,
@@ -634,14 +648,18 @@ def add_signal_analysis(df, params=None):
 
     # 增加成交量确认的突破信号
     if 'Volume_Ratio' in df.columns:
-        df['BB_Breakout_Strength'] = np.where(
-            (df['收盘价'] > df['BB_Upper']) & (df['Volume_Ratio'] > 1.5),
-            '带量突破上轨',
-            np.where((df['收盘价'] < df['BB_Lower']) & (df['Volume_Ratio'] > 1.5),
-                    '带量突破下轨', '')
+        df['BB_Breakout_Strength'] = signal_select(
+            'BB_Breakout_Strength',
+            [
+                (df['收盘价'] > df['BB_Upper']) & (df['Volume_Ratio'] > 1.5),
+                (df['收盘价'] < df['BB_Lower']) & (df['Volume_Ratio'] > 1.5)
+            ],
+            ['带量突破上轨', '带量突破下轨'],
+            default=''
         )
 
-    df['BB_Signal'] = np.select(
+    df['BB_Signal'] = signal_select(
+        'BB_Signal',
         [
             (df['收盘价'] > df['BB_Upper']) & df['BB_Squeeze'],           # 挤压后突破上轨
             (df['收盘价'] < df['BB_Lower']) & df['BB_Squeeze'],           # 挤压后突破下轨
@@ -655,7 +673,8 @@ def add_signal_analysis(df, params=None):
     )
 
     # 5. 随机指标信号
-    df['Stoch_Signal'] = np.select(
+    df['Stoch_Signal'] = signal_select(
+        'Stoch_Signal',
         [
             (df['Stoch_SlowK'] > 80) & (df['Stoch_SlowD'] > 80),
             (df['Stoch_SlowK'] < 20) & (df['Stoch_SlowD'] < 20),
@@ -668,7 +687,8 @@ def add_signal_analysis(df, params=None):
 
     # 5.5. 斐波那契信号增强
     if 'Fib_Price_Position' in df.columns:
-        df['Fib_Key_Zone'] = np.select(
+        df['Fib_Key_Zone'] = signal_select(
+            'Fib_Key_Zone',
             [
                 (df['Fib_Price_Position'] >= 0.35) & (df['Fib_Price_Position'] <= 0.40),
                 (df['Fib_Price_Position'] >= 0.58) & (df['Fib_Price_Position'] <= 0.62),
@@ -679,6 +699,15 @@ def add_signal_analysis(df, params=None):
         )
 
     # 6. 增强综合信号强度 - 300条数据多层次确认
+    # 各信号列的编码只比较一次，下面的规则在布尔数组上组合
+    ma_golden, ma_death = signal_mask(df, 'MA_Signal', '金叉'), signal_mask(df, 'MA_Signal', '死叉')
+    macd_bullish = signal_mask(df, 'MACD_Signal_Analysis', '看涨')
+    macd_bearish = signal_mask(df, 'MACD_Signal_Analysis', '看跌')
+    rsi_bullish = signal_mask(df, 'RSI_Signal', '强买入', '看涨区域')
+    rsi_bearish = signal_mask(df, 'RSI_Signal', '强卖出', '看跌区域')
+    bb_bullish = signal_mask(df, 'BB_Signal', '强力突破上轨', '突破上轨', '强势上轨区域')
+    bb_bearish = signal_mask(df, 'BB_Signal', '强力突破下轨', '突破下轨', '弱势下轨区域')
+
     # 检查是否有长期指标
     has_long_indicators = 'RSI_Long' in df.columns or 'MACD_Long' in df.columns
 
@@ -686,98 +715,80 @@ def add_signal_analysis(df, params=None):
         # 使用多重时间框架确认的增强信号
         conditions = [
             # 超强看涨信号 (新增)
-            (df.get('MA_Fast_Signal', '') == '快速金叉') &
-            (df.get('MACD_Zero_Cross', '') == '零轴上穿') &
+            signal_mask(df, 'MA_Fast_Signal', '快速金叉') &
+            signal_mask(df, 'MACD_Zero_Cross', '零轴上穿') &
             (df.get('Volume_Ratio', 1) > 1.5) &
-            (df.get('Fib_Key_Zone', '') == '关键支撑区'),
+            signal_mask(df, 'Fib_Key_Zone', '关键支撑区'),
 
             # 超强看跌信号 (新增)
-            (df.get('MA_Fast_Signal', '') == '快速死叉') &
-            (df.get('MACD_Zero_Cross', '') == '零轴下穿') &
+            signal_mask(df, 'MA_Fast_Signal', '快速死叉') &
+            signal_mask(df, 'MACD_Zero_Cross', '零轴下穿') &
             (df.get('Volume_Ratio', 1) > 1.5) &
-            (df.get('Fib_Key_Zone', '') == '强势区'),
+            signal_mask(df, 'Fib_Key_Zone', '强势区'),
 
             # 超强信号 - 所有时间框架一致 + 激进指标
-            (df['MA_Signal'] == '金叉') & (df['MACD_Signal_Analysis'] == '看涨') &
-            (df['RSI_Signal'].isin(['强买入', '看涨区域'])) &
-            (df['BB_Signal'].isin(['强力突破上轨', '突破上轨', '强势上轨区域'])) &
+            ma_golden & macd_bullish & rsi_bullish & bb_bullish &
             (df.get('RSI_Long', 50) < 70),  # 长期RSI未超买
 
-            (df['MA_Signal'] == '死叉') & (df['MACD_Signal_Analysis'] == '看跌') &
-            (df['RSI_Signal'].isin(['强卖出', '看跌区域'])) &
-            (df['BB_Signal'].isin(['强力突破下轨', '突破下轨', '弱势下轨区域'])) &
+            ma_death & macd_bearish & rsi_bearish & bb_bearish &
             (df.get('RSI_Long', 50) > 30),  # 长期RSI未超卖
 
             # 极强信号 - 多个激进指标同时触发
-            (df['MA_Signal'] == '金叉') & (df['MACD_Signal_Analysis'] == '看涨') &
-            (df['RSI_Signal'].isin(['强买入', '看涨区域'])) &
-            (df['BB_Signal'].isin(['强力突破上轨', '突破上轨', '强势上轨区域'])),
-
-            (df['MA_Signal'] == '死叉') & (df['MACD_Signal_Analysis'] == '看跌') &
-            (df['RSI_Signal'].isin(['强卖出', '看跌区域'])) &
-            (df['BB_Signal'].isin(['强力突破下轨', '突破下轨', '弱势下轨区域'])),
+            ma_golden & macd_bullish & rsi_bullish & bb_bullish,
+            ma_death & macd_bearish & rsi_bearish & bb_bearish,
 
             # 强信号 - 部分激进指标触发
-            (df['MA_Signal'] == '金叉') & (df['MACD_Signal_Analysis'] == '看涨') &
-            (df['RSI_Signal'].isin(['强买入', '看涨区域'])),
-
-            (df['MA_Signal'] == '死叉') & (df['MACD_Signal_Analysis'] == '看跌') &
-            (df['RSI_Signal'].isin(['强卖出', '看跌区域'])),
+            ma_golden & macd_bullish & rsi_bullish,
+            ma_death & macd_bearish & rsi_bearish,
 
             # 中等信号 - 传统信号
-            (df['MA_Signal'] == '金叉') & (df['MACD_Signal_Analysis'] == '看涨'),
-            (df['MA_Signal'] == '死叉') & (df['MACD_Signal_Analysis'] == '看跌'),
+            ma_golden & macd_bullish,
+            ma_death & macd_bearish,
         ]
         choices = ['🔥超强看涨', '🔥超强看跌', '超强看涨', '超强看跌', '极强看涨', '极强看跌', '强烈看涨', '强烈看跌', '看涨', '看跌']
     else:
         # 原有的信号逻辑
         conditions = [
             # 极强信号 - 多个激进指标同时触发
-            (df['MA_Signal'] == '金叉') & (df['MACD_Signal_Analysis'] == '看涨') &
-            (df['RSI_Signal'].isin(['强买入', '看涨区域'])) &
-            (df['BB_Signal'].isin(['强力突破上轨', '突破上轨', '强势上轨区域'])),
-
-            (df['MA_Signal'] == '死叉') & (df['MACD_Signal_Analysis'] == '看跌') &
-            (df['RSI_Signal'].isin(['强卖出', '看跌区域'])) &
-            (df['BB_Signal'].isin(['强力突破下轨', '突破下轨', '弱势下轨区域'])),
+            ma_golden & macd_bullish & rsi_bullish & bb_bullish,
+            ma_death & macd_bearish & rsi_bearish & bb_bearish,
 
             # 强信号 - 部分激进指标触发
-            (df['MA_Signal'] == '金叉') & (df['MACD_Signal_Analysis'] == '看涨') &
-            (df['RSI_Signal'].isin(['强买入', '看涨区域'])),
-
-            (df['MA_Signal'] == '死叉') & (df['MACD_Signal_Analysis'] == '看跌') &
-            (df['RSI_Signal'].isin(['强卖出', '看跌区域'])),
+            ma_golden & macd_bullish & rsi_bullish,
+            ma_death & macd_bearish & rsi_bearish,
 
             # 中等信号 - 传统信号
-            (df['MA_Signal'] == '金叉') & (df['MACD_Signal_Analysis'] == '看涨'),
-            (df['MA_Signal'] == '死叉') & (df['MACD_Signal_Analysis'] == '看跌'),
+            ma_golden & macd_bullish,
+            ma_death & macd_bearish,
         ]
         choices = ['极强看涨', '极强看跌', '强烈看涨', '强烈看跌', '看涨', '看跌']
 
-    df['综合信号'] = np.select(conditions, choices, default='中性')
+    df['综合信号'] = signal_select('综合信号', conditions, choices, default='中性')
 
     return df
 
 
-def save_indicators(df, file_path):
+def save_indicators(df, file_path, symbol=None, interval=None):
     """
-    保存技术指标数据到CSV文件
+    保存技术指标数据 (存储格式见 config.STORAGE_FORMAT，CSV导出见 config.CSV_EXPORT_STAGES)
+    参数:
+        symbol/interval: 同时给出时，数据还会合并进分区数据集 indicators/{symbol}/{interval}
+    返回:
+        Path: 实际保存的文件路径
     """
-    # 确保目录存在
-    file_path.parent.mkdir(parents=True, exist_ok=True)
-
-    # 保存数据，使用utf-8-sig编码支持Excel中文
-    df.to_csv(file_path, encoding='utf-8-sig')
+    saved_path = save_frame(df, file_path, csv_export='indicators' in CSV_EXPORT_STAGES)
+    if symbol and interval:
+        write_dataset('indicators', df, symbol, interval)
 
     # 打印文件信息
-    print(f"💾 指标数据已保存: {file_path}")
+    print(f"💾 指标数据已保存: {saved_path}")
     print(f"📊 包含 {len(df.columns)} 列技术指标和分析信号")
+    return saved_path
 
 
 def get_latest_indicators_path():
     """获取最新的技术指标文件路径"""
-    indicators_path = DATA_DIR / INDICATORS_FILENAME
-    return indicators_path if indicators_path.exists() else None
+    return find_frame(DATA_DIR / INDICATORS_FILENAME)
 
 
 if __name__ == "__main__":
@@ -791,7 +802,7 @@ if __name__ == "__main__":
 
         if result_path:
             # 加载并预览结果
-            df = pd.read_csv(result_path, encoding='utf-8-sig')
+            df = decode_signals(load_frame(result_path))
             print("\n技术指标数据预览:")
             # 显示最后5行的重要列
             preview_cols = ['开盘价', '收盘价', 'MA20', 'MA50', 'RSI', 'MACD', '综合信号']
@@ -0,0 +1,60 @@
+"""
+纯NumPy指标后端与 TA-Lib 的一致性测试
+说明：逐个函数、逐组参数 (indicator_backend.CHECK_CASES) 在不同长度的校验K线上对比两个后端，
+      预热期 NaN 位置必须相同，数值相对误差不超过 1e-9；未安装 TA-Lib 时跳过对比测试
+用法：python -m pytest tests/test_indicator_backend.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicator_backend  # noqa: E402
+from indicator_backend import CHECK_CASES, NumpyBackend, _as_tuple, _check_series  # noqa: E402
+
+SIZES = (10, 40, 300, 5_000)
+RTOL = 1e-9
+
+CASES = [pytest.param(func, inputs, kwargs, id=f"{func}-{i}")
+         for func, inputs, cases in CHECK_CASES for i, kwargs in enumerate(cases)]
+
+
+@pytest.fixture(scope='module')
+def series():
+    return {size: _check_series(size) for size in SIZES}
+
+
+@pytest.mark.parametrize('size', SIZES)
+@pytest.mark.parametrize('func,inputs,kwargs', CASES)
+def test_numpy_backend_matches_talib(series, size, func, inputs, kwargs):
+    pytest.importorskip('talib')
+    args = [series[size][key] for key in inputs]
+    expected = _as_tuple(getattr(indicator_backend.TalibBackend(), func)(*args, **kwargs))
+    actual = _as_tuple(getattr(NumpyBackend(), func)(*args, **kwargs))
+    assert len(actual) == len(expected)
+    for want, got in zip(expected, actual):
+        np.testing.assert_array_equal(np.isnan(got), np.isnan(want), err_msg="预热期 NaN 位置不一致")
+        valid = ~np.isnan(want)
+        if valid.any():
+            error = np.abs(got[valid] - want[valid]) / np.maximum(np.abs(want[valid]), 1.0)
+            assert error.max() <= RTOL
+
+
+def test_numpy_backend_rejects_nan():
+    close = np.array([1.0, 2.0, np.nan, 4.0, 5.0])
+    with pytest.raises(ValueError):
+        NumpyBackend().RSI(close, timeperiod=2)
+    with pytest.raises(ValueError):
+        NumpyBackend().OBV(np.arange(5.0), close)
+
+
+def test_numpy_backend_rejects_unsupported_matype():
+    close = np.arange(1.0, 21.0)
+    with pytest.raises(ValueError):
+        NumpyBackend().MA(close, timeperiod=5, matype=1)
+    with pytest.raises(ValueError):
+        NumpyBackend().BBANDS(close, timeperiod=5, matype=1)
@@ -0,0 +1,149 @@
+"""
+K线增量存储测试
+说明：用模拟的币安客户端 (按当前时间生成K线) 检查增量更新的行为，不访问网络
+用法：python -m pytest tests/test_kline_store.py
+"""
+
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import KLINES_MAX_LIMIT, interval_to_milliseconds  # noqa: E402
+import kline_integrity  # noqa: E402
+from kline_parser import empty_columns  # noqa: E402
+from kline_store import KlineStore  # noqa: E402
+
+INTERVAL = '5m'
+STEP_MS = interval_to_milliseconds(INTERVAL)
+
+
+def make_kline(open_time):
+    price = str(100.0 + (open_time // STEP_MS) % 50)
+    return [open_time, price, price, price, price, '1.0', open_time + STEP_MS - 1, '100.0', 10, '0.5', '50.0', '0']
+
+
+class FakeClient:
+    """按当前时间生成K线的 client.klines (与币安相同：给出 startTime 时从该时间起最多返回 limit 条)"""
+
+    def __init__(self, missing=()):
+        self.requests = []
+        self.missing = set(missing)  # 模拟交易所停机：这些 open_time 永远不返回
+
+    def klines(self, symbol, interval, startTime=None, endTime=None, limit=500):
+        self.requests.append({'startTime': startTime, 'endTime': endTime, 'limit': limit})
+        current = int(time.time() * 1000) // STEP_MS * STEP_MS
+        last = current if endTime is None else min(current, endTime // STEP_MS * STEP_MS)
+        if startTime is None:
+            first = last - (limit - 1) * STEP_MS
+        else:
+            first = -(-startTime // STEP_MS) * STEP_MS
+            last = min(last, first + (limit - 1) * STEP_MS)
+        return [make_kline(open_time) for open_time in range(first, last + 1, STEP_MS) if open_time not in self.missing]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return KlineStore('TESTUSDT', INTERVAL, store_dir=tmp_path)
+
+
+@pytest.mark.parametrize('behind', [288, 150, KLINES_MAX_LIMIT - 2])
+def test_update_catches_up_in_one_call(store, behind):
+    """存储落后 behind 根K线 (多于 limit 条) 时，一次 update 就补齐到最后一根已收盘K线"""
+    last_closed = (int(time.time() * 1000) // STEP_MS - 1) * STEP_MS
+    seed_end = last_closed - behind * STEP_MS
+    store.ingest([make_kline(seed_end - i * STEP_MS) for i in reversed(range(300))], closed=True)
+
+    added = store.update(client=FakeClient(), limit=200)
+
+    # 期间跨过K线边界时最后一根已收盘K线会再往后一根
+    last_closed = (int(time.time() * 1000) // STEP_MS - 1) * STEP_MS
+    assert added == (last_closed - seed_end) // STEP_MS
+    assert store.last_closed_open_time == last_closed
+    closed = store.load(include_open=False)
+    assert closed.index[-1].value // 1_000_000 == last_closed
+    assert closed.index.to_series().diff().dropna().nunique() == 1
+
+
+def test_update_requests_only_limit_when_up_to_date(store):
+    last_closed = (int(time.time() * 1000) // STEP_MS - 1) * STEP_MS
+    store.ingest([make_kline(last_closed - i * STEP_MS) for i in reversed(range(300))], closed=True)
+    client = FakeClient()
+
+    assert store.update(client=client, limit=200) == 0
+    assert client.requests[-1]['limit'] == 200
+
+
+@pytest.fixture
+def gap_requests(monkeypatch):
+    """替换缺口补齐请求 (不访问网络)：模拟币安端同样没有这些K线，记录每次请求的缺口"""
+    requests = []
+
+    def fetch_gap_columns(gaps, interval, symbol=None, client=None):
+        requests.append(list(gaps))
+        return [empty_columns() for _ in gaps]
+
+    monkeypatch.setattr(kline_integrity, 'fetch_gap_columns', fetch_gap_columns)
+    return requests
+
+
+def seed_with_outage(store, outage_bars=5, behind=50):
+    """存储落后 behind 根K线，其中有 outage_bars 根是币安端也没有的 (交易所停机)"""
+    last_closed = (int(time.time() * 1000) // STEP_MS - 1) * STEP_MS
+    seed_end = last_closed - behind * STEP_MS
+    store.ingest([make_kline(seed_end - i * STEP_MS) for i in reversed(range(300))], closed=True)
+    missing = [seed_end + (10 + i) * STEP_MS for i in range(outage_bars)]
+    client = FakeClient(missing)
+    store.update(client=client, limit=200)
+    return client, missing
+
+
+def test_load_tail_skips_exchange_gaps(store, gap_requests):
+    _, missing = seed_with_outage(store)
+    assert gap_requests == [[(missing[0], missing[-1])]]
+    assert store.state['known_gaps'] == [[missing[0], missing[-1]]]
+    assert len(store.data) == store.state['closed_count'] + len(missing)  # 缺口写入占位记录
+
+    closed = store.load(include_open=False)
+    assert closed.notna().all().all()
+    assert not set(closed.index.values.astype('datetime64[ms]').astype('int64')) & set(missing)
+    tail = store.load(tail=100, include_open=False)
+    assert len(tail) == 100
+    pd.testing.assert_frame_equal(tail, closed.iloc[-100:])
+
+
+def test_migrates_legacy_csv(tmp_path):
+    open_times = [(1_700_000_000_000 // STEP_MS + i) * STEP_MS for i in range(20)]
+    legacy = pd.DataFrame({'open_time': pd.to_datetime(open_times, unit='ms').strftime('%Y-%m-%d %H:%M:%S')})
+    for column in ['开盘价', '最高价', '最低价', '收盘价', '成交量', '成交额', '成交笔数', '主动买入量', '主动买入额']:
+        legacy[column] = 1.0
+    legacy.to_csv(tmp_path / f"TESTUSDT_{INTERVAL}.csv", index=False, encoding='utf-8')
+    state = {'last_closed_open_time': open_times[-1], 'closed_count': 20, 'open_kline': None}
+    (tmp_path / f"TESTUSDT_{INTERVAL}_state.json").write_text(json.dumps(state), encoding='utf-8')
+
+    store = KlineStore('TESTUSDT', INTERVAL, store_dir=tmp_path)
+
+    assert store.data_path.suffix == '.klines'
+    assert len(store.data) == 20
+    assert store.last_closed_open_time == open_times[-1]
+    assert (store.load().index.values.astype('datetime64[ms]').astype('int64') == open_times).all()
+
+
+def test_fetch_klines_frame_does_not_rerequest_known_gaps(tmp_path, monkeypatch, gap_requests):
+    """增量模式每次运行都会检查尾部，但已记录的交易所缺口不会再次请求"""
+    import binance_client
+    import kline_store
+    monkeypatch.setattr(kline_store, 'get_kline_store_dir', lambda: tmp_path)
+    client, missing = seed_with_outage(KlineStore('TESTUSDT', INTERVAL))
+    assert len(gap_requests) == 1
+
+    for _ in range(2):
+        df = binance_client.fetch_klines_frame(INTERVAL, 200, incremental=True, symbol='TESTUSDT', client=client)
+        assert len(df) == 200
+        assert df.notna().all().all()
+    assert len(gap_requests) == 1
@@ -0,0 +1,97 @@
+"""
+参数扫描与 TA-Lib 逐组计算的一致性测试
+说明：每个指标族分别用 TA-Lib 后端 (逐个周期调用) 和纯NumPy后端 (分块求解) 扫描，
+      与逐组调用 TA-Lib 的结果对比；未安装 TA-Lib 时跳过
+用法：python -m pytest tests/test_parameter_sweep.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+talib = pytest.importorskip('talib')
+
+from indicator_backend import NumpyBackend, TalibBackend  # noqa: E402
+from indicator_benchmark import synthetic_frame  # noqa: E402
+from parameter_sweep import (SweepSeries, iter_sweep, parameter_grid, sweep_bbands, sweep_ema,  # noqa: E402
+                             sweep_ma, sweep_macd, sweep_rsi)
+
+RTOL = 1e-9
+BACKENDS = [pytest.param(TalibBackend(), id='talib'), pytest.param(NumpyBackend(), id='numpy')]
+
+
+@pytest.fixture(scope='module')
+def close():
+    return synthetic_frame(3_000)['收盘价'].to_numpy(dtype=np.float64)
+
+
+def assert_close(actual, expected):
+    actual, expected = np.asarray(actual), np.asarray(expected)
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected), err_msg="预热期 NaN 位置不一致")
+    valid = ~np.isnan(expected)
+    error = np.abs(actual[valid] - expected[valid]) / np.maximum(np.abs(expected[valid]), 1.0)
+    assert error.max() <= RTOL
+
+
+def test_sweep_ma(close):
+    periods = [3, 5, 5, 20, 200]
+    assert_close(sweep_ma(close, periods), [talib.MA(close, timeperiod=p) for p in periods])
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_sweep_ema(close, backend):
+    periods = [3, 12, 12, 26, 100]
+    assert_close(sweep_ema(close, periods, backend=backend), [talib.EMA(close, timeperiod=p) for p in periods])
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_sweep_rsi(close, backend):
+    periods = [2, 7, 14, 14, 30]
+    assert_close(sweep_rsi(close, periods, backend=backend), [talib.RSI(close, timeperiod=p) for p in periods])
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_sweep_bbands(close, backend):
+    grid = parameter_grid(periods=[5, 20, 50], nbdev=[1.0, 2.0, 2.5])
+    result = sweep_bbands(close, **grid, backend=backend)
+    for p, d, upper, middle, lower in zip(grid['periods'], grid['nbdev'], result['upper'], result['middle'],
+                                          result['lower']):
+        expected = talib.BBANDS(close, timeperiod=int(p), nbdevup=float(d), nbdevdn=float(d))
+        assert_close([upper, middle, lower], expected)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_sweep_bbands_keeps_small_variance_on_high_prices(backend):
+    """价格高、序列长时全序列平方和的累积和会吞掉窗口内的小方差 (价格不变的一段标准差应为 0)"""
+    rng = np.random.default_rng(0)
+    close = 60_000.0 + np.cumsum(rng.normal(0.0, 1.0, 1_000_000))
+    close[500_000:500_050] = close[500_000]
+    result = sweep_bbands(close, [20], 1.0, backend=backend)
+    stddev = result['upper'][0] - result['middle'][0]
+    upper, middle, _ = talib.BBANDS(close, timeperiod=20, nbdevup=1.0, nbdevdn=1.0)
+    expected = upper - middle
+    np.testing.assert_array_equal(stddev == 0.0, expected == 0.0)
+    valid = ~np.isnan(expected) & (expected > 0.0)
+    assert (np.abs(stddev[valid] - expected[valid]) / expected[valid]).max() <= 1e-6
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_sweep_macd(close, backend):
+    grid = parameter_grid(fast=[5, 12], slow=[13, 26], signal=[5, 9])
+    result = sweep_macd(close, **grid, backend=backend)
+    for row, (f, s, g) in enumerate(zip(grid['fast'], grid['slow'], grid['signal'])):
+        expected = talib.MACD(close, fastperiod=int(f), slowperiod=int(s), signalperiod=int(g))
+        assert_close([result['macd'][row], result['signal'][row], result['hist'][row]], expected)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_iter_sweep_passes_backend(close, backend):
+    series = SweepSeries(close)
+    periods = np.arange(5, 40)
+    expected = sweep_rsi(series, periods, backend=backend)
+    for rows, rsi in iter_sweep(sweep_rsi, series, periods, chunk_rows=8, backend=backend):
+        np.testing.assert_array_equal(rsi, expected[rows])